@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Batch calibration: run many stitch2d_pipeline jobs (e.g. every stage of an
+end-of-line lot) from one manifest, in one invocation.
+
+    python stitch2d_batch.py lot42.yaml --workers 8 --out-root lot42_runs
+
+Every zone parse (steps 1-5) from every job goes onto one shared process pool.
+Each job is stitched, finalized and written in this process as soon as its own
+zones are ready, while the pool keeps parsing the zones of the jobs behind it, so
+throughput scales with cores rather than with the size of any one job. At most
+--max-pending jobs have zones parsed or in flight at a time, which bounds memory.
+
+Manifest formats (by extension):
+
+  .json / .yaml / .yml   {"defaults": {...}, "jobs": [{...}, ...]} or a bare list of jobs
+  .csv                   one job per row; header row names the fields; zones are
+                         separated by ';' (or whitespace if there is no ';'); empty
+                         cells are omitted
+
+Job fields are the stitch2d_pipeline options with '_' for '-' (rows, cols, zones,
+out_cal, out_dat, plot, solver, fill_method, user_unit, debug_artifacts, ...),
+plus an optional name. "defaults" apply to every job. Relative zone paths are
+resolved against the manifest's directory. Each job's outputs, manifest.json and
+pipeline.log go into a run directory under OUT_ROOT/<name>/ (or under the job's
+own out_dir). YAML manifests need PyYAML.
+
+A summary table is printed and batch_summary.json is written to OUT_ROOT; the
+exit status is 1 if any job failed.
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import argparse
+import threading
+import contextlib
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+import stitch2d_pipeline as pipeline
+
+BATCH_SUMMARY_VERSION = 1
+DEFAULT_OUT_ROOT = 'stitch2d_batch'
+# Characters of pipeline output kept in the summary for a failed job
+LOG_TAIL_CHARS = 2000
+# Pipeline options that make no sense per job in a batch (the batch owns the pool)
+UNSUPPORTED_FIELDS = ('jobs', 'clear_cache', 'no_cache', 'cache_dir', 'cache_max_mb')
+_TRUE = ('true', 'yes', 'on')
+_FALSE = ('false', 'no', 'off')
+
+
+def _split_zones(value):
+    """Zone list from one string: ';'-separated, or whitespace-separated if there is no ';'."""
+    zones = value.split(';') if ';' in value else value.split()
+    return [z.strip() for z in zones if z.strip()]
+
+
+def _csv_value(field, value):
+    value = value.strip()
+    if field == 'zones':
+        return _split_zones(value)
+    if value.lower() in _TRUE:
+        return True
+    if value.lower() in _FALSE:
+        return False
+    return value
+
+
+def load_manifest(path):
+    """Return the job dicts of a JSON, YAML or CSV manifest, with defaults applied."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='') as f:
+        if ext == '.csv':
+            data = [{k.strip(): _csv_value(k.strip(), v) for k, v in row.items() if v and v.strip()}
+                    for row in csv.DictReader(f)]
+        elif ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f'{path}: YAML manifests need PyYAML (pip install pyyaml); '
+                                 f'JSON and CSV manifests work without it')
+            data = yaml.safe_load(f)
+        elif ext == '.json':
+            data = json.load(f)
+        else:
+            raise ValueError(f'{path}: unknown manifest format {ext!r}; expected .json, .yaml, .yml or .csv')
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get('defaults') or {}
+        data = data.get('jobs')
+    if not isinstance(data, list) or not data:
+        raise ValueError(f'{path}: manifest has no jobs')
+    return [{**defaults, **job} for job in data]
+
+
+class BatchJob:
+    """One manifest entry: parsed pipeline arguments plus scheduling state."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.futures = []
+        self.submitted = None
+        self.ready = None
+        self.result = None
+        self.error = None
+        self.log = ''
+        self.finish_s = None
+
+
+def make_jobs(entries, manifest_dir, out_root):
+    """BatchJobs for the manifest entries; raises ValueError naming the first bad entry."""
+    jobs = []
+    names = set()
+    for idx, entry in enumerate(entries):
+        entry = dict(entry)
+        name = str(entry.pop('name', None) or f'job{idx + 1}')
+        label = f'job {idx + 1} ({name})'
+        if name in names:
+            raise ValueError(f'{label}: duplicate job name')
+        names.add(name)
+        unsupported = [k for k in entry if k in UNSUPPORTED_FIELDS]
+        if unsupported:
+            raise ValueError(f'{label}: {", ".join(unsupported)} cannot be set per job in a batch')
+        zones = entry.get('zones')
+        if isinstance(zones, str):
+            zones = _split_zones(zones)
+        if zones:
+            entry['zones'] = [os.path.join(manifest_dir, z) for z in zones]
+        stderr = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(stderr):
+                args = pipeline.parse_args(pipeline.job_argv(entry))
+        except SystemExit:
+            raise ValueError(f'{label}: ' + (stderr.getvalue().strip().splitlines() or ['invalid job'])[-1])
+        if len(args.zones) != args.rows * args.cols:
+            raise ValueError(f'{label}: expected {args.rows * args.cols} zone files, got {len(args.zones)}')
+        missing = [z for z in args.zones if not os.path.exists(z)]
+        if missing:
+            raise ValueError(f'{label}: missing zone files: {", ".join(missing)}')
+        args.out_dir = args.out_dir or os.path.join(out_root, name)
+        jobs.append(BatchJob(name, args))
+    return jobs
+
+
+def _parse_zone(zone, cache, fill_method, keep_meta, handoff_path=None):
+    """
+    process_single_zone on a pool worker, returning (result, its printed output).
+    With handoff_path the result comes back as an export_zone_result descriptor.
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        result = pipeline.process_single_zone(zone, cache=cache, fill_method=fill_method, keep_meta=keep_meta)
+        if handoff_path is not None:
+            result = pipeline.export_zone_result(result, handoff_path)
+    return result, log.getvalue()
+
+
+def _finish_job(job):
+    """Stitch, finalize and write one job whose zones are parsed (runs in this process)."""
+    t0 = time.perf_counter()
+    log = io.StringIO()
+    try:
+        zone_results = []
+        for future in job.futures:
+            result, zone_log = future.result()
+            if job.args.zone_handoff == 'shared':
+                result = pipeline.receive_zone_result(result)
+            zone_results.append(result)
+            log.write(zone_log)
+        with contextlib.redirect_stdout(log):
+            job.result = pipeline.run(job.args, zone_results=zone_results)
+        with open(os.path.join(job.result['run_dir'], 'pipeline.log'), 'w') as f:
+            f.write(log.getvalue())
+    except Exception as e:
+        job.error = f'{type(e).__name__}: {e}'
+        job.log = log.getvalue()[-LOG_TAIL_CHARS:]
+    job.futures = []  # drop the parsed zones
+    job.finish_s = time.perf_counter() - t0
+
+
+def run_batch(jobs, workers=0, cache=None, max_pending=None, progress=None):
+    """
+    Run every job: zone parses on one pool of workers processes (0 = one per CPU),
+    each job finished here as soon as its zones are ready. Jobs are finished in the
+    order their zones complete; at most max_pending (default 2 * workers) jobs are
+    parsed ahead. progress(job), if given, is called after each job. Parsed zones
+    come back through a pipeline.ZoneHandoff unless a job sets --zone-handoff pickle.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    max_pending = max(1, max_pending or 2 * workers)
+    ready = queue.Queue()
+    backlog = iter(jobs)
+
+    def submit(pool, job):
+        job.submitted = time.perf_counter()
+        remaining = [len(job.args.zones)]
+        lock = threading.Lock()
+
+        def zone_done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                job.ready = time.perf_counter()
+                ready.put(job)
+        shared = job.args.zone_handoff == 'shared'
+        job.futures = [pool.submit(_parse_zone, zone, cache, job.args.fill_method, job.args.keep_meta,
+                                   handoff.path() if shared else None)
+                       for zone in job.args.zones]
+        for future in job.futures:
+            future.add_done_callback(zone_done)
+
+    with pipeline.ZoneHandoff() as handoff, ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in range(min(max_pending, len(jobs))):
+            submit(pool, next(backlog))
+        for _ in jobs:
+            job = ready.get()
+            nxt = next(backlog, None)
+            if nxt is not None:
+                submit(pool, nxt)  # keep the pool busy while this job is finished
+            _finish_job(job)
+            if progress is not None:
+                progress(job)
+    return jobs
+
+
+def job_summary(job):
+    args = job.args
+    entry = {
+        'name': job.name,
+        'layout': f'{args.rows}x{args.cols}',
+        'zones': len(args.zones),
+        'solver': args.solver,
+        'status': 'error' if job.error else 'ok',
+        'parse_s': job.ready - job.submitted if job.ready else None,
+        'finish_s': job.finish_s,
+    }
+    if job.error:
+        entry.update(error=job.error, log=job.log)
+    else:
+        entry.update(run_dir=job.result['run_dir'], stats=job.result['stats'])
+    return entry
+
+
+def print_summary_table(summaries, out=sys.stdout):
+    print(f"\n{'job':<20} {'layout':>6} {'status':>6} {'parse s':>8} {'finish s':>8} "
+          f"{'Ax1 rms':>8} {'Ax2 rms':>8} {'Vec rms':>8} {'ortho':>8}  run dir", file=out)
+    for s in summaries:
+        if s['status'] == 'ok':
+            st = s['stats']
+            cols = (f"{st['rmsAx1']:>8.3f} {st['rmsAx2']:>8.3f} {st['rmsVector']:>8.3f} "
+                    f"{st['orthogonality_arcsec']:>8.3f}  {s['run_dir']}")
+        else:
+            cols = f'{"-":>8} {"-":>8} {"-":>8} {"-":>8}  {s["error"]}'
+        parse = f"{s['parse_s']:>8.2f}" if s['parse_s'] is not None else f'{"-":>8}'
+        print(f"{s['name']:<20} {s['layout']:>6} {s['status']:>6} {parse} {s['finish_s']:>8.2f} {cols}", file=out)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Calibrate many stages from one job manifest with a shared worker pool.')
+    p.add_argument('manifest', help='Job manifest (.json, .yaml/.yml or .csv)')
+    p.add_argument('--workers', type=int, default=0, help='Zone parsing processes shared by all jobs (0 = one per CPU)')
+    p.add_argument('--max-pending', type=int, default=None,
+                   help='Jobs parsed ahead of the one being finished (default 2 x workers); bounds memory')
+    p.add_argument('--out-root', default=DEFAULT_OUT_ROOT,
+                   help='Jobs without out_dir get a run directory under OUT_ROOT/<name>/; the summary goes here too')
+    p.add_argument('--no-cache', action='store_true', help='Bypass the parsed zone cache (always re-parse zone files)')
+    p.add_argument('--cache-dir', default=pipeline.DEFAULT_CACHE_DIR,
+                   help='Parsed zone cache directory (env STITCH2D_CACHE_DIR)')
+    p.add_argument('--cache-max-mb', type=float, default=pipeline.DEFAULT_CACHE_MAX_MB,
+                   help='Parsed zone cache size cap in MB (LRU eviction)')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        entries = load_manifest(args.manifest)
+        jobs = make_jobs(entries, os.path.dirname(os.path.abspath(args.manifest)), args.out_root)
+    except (OSError, ValueError) as e:
+        print(f'ERROR: {e}', file=sys.stderr)
+        return 1
+    cache = None if args.no_cache else pipeline.ZoneCache(args.cache_dir,
+                                                          max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    num_zones = sum(len(job.args.zones) for job in jobs)
+    print(f'Batch: {len(jobs)} job(s), {num_zones} zone(s) from {args.manifest}')
+
+    def progress(job):
+        status = f'FAILED ({job.error})' if job.error else 'ok'
+        print(f'  [{job.name}] {status} in {job.finish_s:.2f}s', flush=True)
+
+    t0 = time.perf_counter()
+    run_batch(jobs, workers=args.workers, cache=cache, max_pending=args.max_pending, progress=progress)
+    elapsed = time.perf_counter() - t0
+
+    summaries = [job_summary(job) for job in jobs]
+    print_summary_table(summaries)
+    failed = sum(s['status'] != 'ok' for s in summaries)
+    print(f'\n{len(jobs) - failed}/{len(jobs)} job(s) ok in {elapsed:.2f}s ({num_zones / elapsed:.1f} zones/s)')
+
+    summary = {
+        'version': BATCH_SUMMARY_VERSION,
+        'manifest': os.path.abspath(args.manifest),
+        'elapsed_s': elapsed,
+        'jobs': summaries,
+    }
+
+    def dump(path):
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+    print(f'Summary written: {pipeline.ArtifactManager(args.out_root).write("batch_summary.json", "summary", dump)}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for stitch2d_pipeline.
+
+Zone reader: compares the single-pass read_zone_file against the previous
+three-read path (step1 readlines + step2 readlines + np.loadtxt) on synthetic
+zone files of increasing size.
+
+    python stitch2d_bench.py reader --points 36 300 700
+
+Stitching: times apply_stitching_corrections for column and row seams between
+two synthetic zones, next to the time it takes to read one such zone file.
+
+    python stitch2d_bench.py stitch --points 200 500 1000
+
+Scaling suite: generates synthetic zone files (smooth stage error field plus
+per-zone mounting offset/slope and noise, with configurable overlap) and times
+process_single_zone and apply_stitching_corrections per zone size, and
+stitch_and_calibrate plus each writer per layout. Results can be saved as a
+baseline; later runs compare against it and exit non-zero on a regression.
+
+    python stitch2d_bench.py suite --save-baseline bench_baseline.json
+    python stitch2d_bench.py suite --baseline bench_baseline.json
+    python stitch2d_bench.py suite --full --baseline bench_baseline.json
+
+Baselines are machine specific: record one per machine, and re-record after an
+intentional performance change.
+
+Startup: runs `import stitch2d_pipeline`, `stitch2d_pipeline.py --help` and a small
+complete-grid job in fresh interpreters under `python -X importtime`, reports wall
+and import time per case with the slowest top-level imports, and exits non-zero if
+a case's import time exceeds the budget or it loads a heavy module (matplotlib,
+scipy) that only optional features need.
+
+    python stitch2d_bench.py importtime --budget-ms 300
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+import stitch2d_pipeline as pipeline
+
+
+ERROR_FIELDS = ('random', 'smooth')
+
+
+def stage_error_field(x, y, travel):
+    """
+    Smooth, position-dependent stage error (mm) shared by every zone: a few microns
+    of bow and waviness, so overlapping zones agree once mounting errors are removed.
+    """
+    u = x / travel
+    v = y / travel
+    ax1 = 0.002 * np.sin(2 * np.pi * v) + 0.001 * u * v + 0.0005 * np.cos(3 * np.pi * u)
+    ax2 = 0.002 * np.cos(2 * np.pi * u) - 0.001 * v ** 2 + 0.0005 * np.sin(3 * np.pi * v)
+    return ax1, ax2
+
+
+def write_zone_file(path, num_ax1, num_ax2, pitch=10.0, seed=0, x0=0.0, y0=0.0,
+                    field='random', noise=0.001, travel=None, comment='benchmark'):
+    """
+    Write a zone file in the CZn.dat layout.
+
+    field='random' is white noise of scale noise. field='smooth' samples
+    stage_error_field at the absolute positions (x0/y0 is the zone origin), adds a
+    random per-zone mounting offset and slope, then noise.
+    """
+    rng = np.random.default_rng(seed)
+    ax1_loc, ax2_loc = np.meshgrid(np.arange(1, num_ax1 + 1), np.arange(1, num_ax2 + 1))
+    ax1_pos = x0 + (ax1_loc - 1) * pitch
+    ax2_pos = y0 + (ax2_loc - 1) * pitch
+    if field == 'random':
+        err = rng.normal(scale=noise, size=(2,) + ax1_loc.shape)
+    elif field == 'smooth':
+        travel = travel or max(num_ax1, num_ax2) * pitch
+        err = np.array(stage_error_field(ax1_pos, ax2_pos, travel))
+        offset = rng.normal(scale=0.002, size=2)
+        slope = rng.normal(scale=2e-6, size=2)  # mm/mm, i.e. ~2 um/m of mounting tilt
+        err[0] += offset[0] + slope[0] * (ax2_pos - y0)
+        err[1] += offset[1] + slope[1] * (ax1_pos - x0)
+        err += rng.normal(scale=noise, size=err.shape)
+    else:
+        raise ValueError(f'Unknown error field {field!r}; expected one of {ERROR_FIELDS}')
+    s = np.column_stack([ax1_loc.ravel(), ax2_loc.ravel(), ax1_pos.ravel(), ax2_pos.ravel(),
+                         err[0].ravel(), err[1].ravel()])
+    with open(path, 'w') as f:
+        f.write('%SerialNumber: BENCH-0\n')
+        f.write('%Ax1Name: Y; Ax1Num: 1; Ax1Sign: 1; Ax1Slave: 0\n')
+        f.write('%Ax2Name: X; Ax2Num: 3; Ax2Sign: 1; Ax2Slave: 0\n')
+        f.write('%UserUnits: MM\n')
+        f.write(f'%Operator: BENCH; Model: Synthetic; AirTemp: 20.00; MatTemp: 20.00; expandCoef: 0.0; Comment: {comment}\n')
+        f.write('% Ax1TestLoc Ax2TestLoc Ax1CmdPos Ax2CmdPos Ax1RelErr Ax2RelErr\n')
+        f.write('%\n')
+        np.savetxt(f, s, fmt=['%.1f', '%.1f', '%.6f', '%.6f', '%.6f', '%.6f'], delimiter='\t')
+
+
+def write_layout(out_dir, rows, cols, points, overlap=0.2, pitch=10.0, field='smooth', noise=0.0002, seed=0):
+    """
+    Write rows x cols square zones of points x points into out_dir and return their
+    paths in row-major order (the --zones order). Neighbouring zones share about
+    overlap of their width, rounded to whole grid points.
+    """
+    step = max(1, int(round((points - 1) * (1.0 - overlap)))) * pitch
+    travel = step * (max(rows, cols) - 1) + (points - 1) * pitch
+    paths = []
+    for i in range(rows):
+        for j in range(cols):
+            k = i * cols + j
+            path = os.path.join(out_dir, f'BENCH-CZ{k + 1}.dat')
+            write_zone_file(path, points, points, pitch=pitch, seed=seed + k, x0=j * step, y0=i * step,
+                            field=field, noise=noise, travel=travel, comment=f'Zone{k + 1}')
+            paths.append(path)
+    return paths
+
+
+def legacy_read(input_file):
+    """The pre-single-pass read path: header readlines, body readlines, then np.loadtxt."""
+    with open(input_file, 'r') as fid:
+        lines = fid.readlines()
+    config = pipeline._parse_header_lines(lines[:pipeline.HEADER_LINES], input_file)
+
+    with open(input_file, 'r') as f:
+        lines = f.readlines()
+    data_start = 0
+    for i, line in enumerate(lines):
+        if pipeline._is_data_line(line):
+            data_start = i
+            break
+    s = np.loadtxt(input_file, skiprows=data_start)
+    return config, s
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def bench_reader(points, repeat):
+    print(f"{'points/zone':>12} {'legacy (s)':>12} {'single-pass (s)':>16} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in points:
+            path = os.path.join(tmp, f'zone_{n}.dat')
+            write_zone_file(path, n, n)
+            cfg_old, s_old = legacy_read(path)
+            cfg_new, s_new = pipeline.read_zone_file(path)
+            if cfg_old != cfg_new or not np.array_equal(s_old, s_new):
+                raise RuntimeError(f'read_zone_file disagrees with legacy path for {n}x{n}')
+            t_old = best_of(lambda: legacy_read(path), repeat)
+            t_new = best_of(lambda: pipeline.read_zone_file(path), repeat)
+            print(f'{n*n:>12} {t_old:>12.4f} {t_new:>16.4f} {t_old/t_new:>7.2f}x')
+
+
+def make_zone(num_ax1, num_ax2, x0=0.0, y0=0.0, pitch=10.0, seed=0):
+    """In-memory Zone as returned by process_single_zone (without meta)."""
+    rng = np.random.default_rng(seed)
+    shape = (num_ax2, num_ax1)
+    return pipeline.Zone(x0 + pitch * np.arange(num_ax1), y0 + pitch * np.arange(num_ax2),
+                         rng.normal(scale=1.0, size=shape), rng.normal(scale=1.0, size=shape))
+
+
+def bench_stitch(points, repeat, overlap=0.2):
+    print(f"{'points/zone':>12} {'read (s)':>10} {'column (s)':>11} {'row (s)':>10} {'column inplace (s)':>19}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in points:
+            path = os.path.join(tmp, f'zone_{n}.dat')
+            write_zone_file(path, n, n)
+            t_read = best_of(lambda: pipeline.read_zone_file(path), repeat)
+
+            shift = 10.0 * n * (1.0 - overlap)
+            master = make_zone(n, n, seed=1)
+            right = make_zone(n, n, x0=shift, seed=2)
+            above = make_zone(n, n, y0=shift, seed=3)
+            with contextlib.redirect_stdout(None):
+                t_col = best_of(lambda: pipeline.apply_stitching_corrections(master, right, 'column', -1), repeat)
+                t_row = best_of(lambda: pipeline.apply_stitching_corrections(master, above, 'row', -1), repeat)
+                t_inp = best_of(lambda: pipeline.apply_stitching_corrections(master, right, 'column', -1, inplace=True), repeat)
+            print(f'{n*n:>12} {t_read:>10.4f} {t_col:>11.4f} {t_row:>10.4f} {t_inp:>19.4f}')
+
+
+BASELINE_FORMAT_VERSION = 1
+SUITE_POINTS = [36, 300]
+SUITE_LAYOUTS = ['1x2', '2x2', '4x4']
+FULL_POINTS = [36, 300, 700, 1000, 2000]
+FULL_LAYOUTS = ['1x2', '2x2', '4x4', '10x10', '20x20']
+WRITER_STAGES = ('write_cal', 'write_accuracy', 'write_cal_start2d')
+
+
+def _parse_layout(layout):
+    rows, cols = (int(n) for n in layout.lower().split('x'))
+    return rows, cols
+
+
+def bench_layout(tmp, layout, points, repeat, overlap):
+    """Best-of-repeat stitch_and_calibrate wall time plus each writer's time from that run."""
+    rows, cols = _parse_layout(layout)
+    zone_dir = os.path.join(tmp, f'layout_{layout}_{points}')
+    os.makedirs(zone_dir)
+    zones = write_layout(zone_dir, rows, cols, points, overlap=overlap)
+    best = None
+    cwd = os.getcwd()
+    os.chdir(zone_dir)  # output files are written relative to the working directory
+    try:
+        for _ in range(repeat):
+            profiler = pipeline.StageProfiler(trace_memory=False)
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(None):
+                pipeline.stitch_and_calibrate(zones, rows, cols, 'bench.cal', 'bench.dat', profiler=profiler)
+            elapsed = time.perf_counter() - t0
+            if best is None or elapsed < best[0]:
+                best = (elapsed, profiler.report()['stages'])
+    finally:
+        os.chdir(cwd)
+    elapsed, stages = best
+    results = {f'stitch_and_calibrate/{layout}@{points}': elapsed}
+    for stage in WRITER_STAGES:
+        results[f'{stage}/{layout}@{points}'] = stages[stage]['wall_s']
+    return results
+
+
+def run_suite(points, layouts, layout_points, repeat, overlap=0.2):
+    """Return {case: best seconds}; case names are stable so results compare across runs."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in points:
+            path = os.path.join(tmp, f'zone_{n}.dat')
+            write_zone_file(path, n, n, field='smooth', noise=0.0002)
+            with contextlib.redirect_stdout(None):
+                results[f'process_single_zone/{n}x{n}'] = best_of(lambda: pipeline.process_single_zone(path), repeat)
+            shift = 10.0 * int(round((n - 1) * (1.0 - overlap)))
+            master = make_zone(n, n, seed=1)
+            right = make_zone(n, n, x0=shift, seed=2)
+            with contextlib.redirect_stdout(None):
+                results[f'apply_stitching_corrections/{n}x{n}'] = best_of(
+                    lambda: pipeline.apply_stitching_corrections(master, right, 'column', -1), repeat)
+            print(f'  zone {n}x{n} done', file=sys.stderr)
+        for layout in layouts:
+            results.update(bench_layout(tmp, layout, layout_points, repeat, overlap))
+            print(f'  layout {layout}@{layout_points} done', file=sys.stderr)
+    return results
+
+
+def load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_FORMAT_VERSION:
+        raise ValueError(f'{path}: unsupported baseline version {baseline.get("version")!r}')
+    return baseline
+
+
+def save_baseline(path, results):
+    baseline = {
+        'version': BASELINE_FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+        },
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, baseline, tolerance, min_delta):
+    """
+    Print current vs baseline per case and return the regressed cases: slower by more
+    than tolerance (fraction) and by more than min_delta seconds (ignores timer noise
+    on sub-millisecond cases).
+    """
+    base = baseline['results']
+    regressions = []
+    print(f"{'case':<44} {'baseline (s)':>12} {'now (s)':>10} {'ratio':>7}")
+    for case, now in results.items():
+        if case not in base:
+            print(f'{case:<44} {"-":>12} {now:>10.4f} {"new":>7}')
+            continue
+        ratio = now / base[case] if base[case] > 0 else float('inf')
+        regressed = ratio > 1.0 + tolerance and now - base[case] > min_delta
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{case:<44} {base[case]:>12.4f} {now:>10.4f} {ratio:>6.2f}x{flag}')
+        if regressed:
+            regressions.append((case, base[case], now, ratio))
+    missing = sorted(set(base) - set(results))
+    if missing:
+        print(f'Not run this time (in baseline): {", ".join(missing)}')
+    return regressions
+
+
+def bench_suite(args):
+    points = FULL_POINTS if args.full else args.points
+    layouts = FULL_LAYOUTS if args.full else args.layouts
+    results = run_suite(points, layouts, args.layout_points, args.repeat, overlap=args.overlap)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f'Baseline written: {args.save_baseline} ({len(results)} cases)')
+    if not args.baseline:
+        print(f"{'case':<44} {'now (s)':>10}")
+        for case, now in results.items():
+            print(f'{case:<44} {now:>10.4f}')
+        return 0
+
+    regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance, args.min_delta)
+    if regressions:
+        print(f'\nPERFORMANCE REGRESSION: {len(regressions)} case(s) slower than {args.baseline} '
+              f'by more than {args.tolerance:.0%}:', file=sys.stderr)
+        for case, base, now, ratio in regressions:
+            print(f'  {case}: {base:.4f}s -> {now:.4f}s ({ratio:.2f}x)', file=sys.stderr)
+        return 1
+    print(f'\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})')
+    return 0
+
+
+PIPELINE_SCRIPT = str(Path(__file__).parent / 'stitch2d_pipeline.py')
+STARTUP_CASES = ('import', 'help', 'job')
+# Only needed for plots, griddata hole filling, .mat dumps and the global solver
+HEAVY_MODULES = ('matplotlib', 'scipy')
+STARTUP_BUDGET_MS = 300.0
+
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output into [(module, depth, self_us, cumulative_us)]
+    in report order; depth 0 entries are the top-level imports.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cum_us)))
+    return entries
+
+
+def startup_argv(case, zones, out_dir):
+    """Interpreter command line for one startup case."""
+    if case == 'import':
+        return [sys.executable, '-X', 'importtime', '-c', 'import stitch2d_pipeline']
+    if case == 'help':
+        return [sys.executable, '-X', 'importtime', PIPELINE_SCRIPT, '--help']
+    return [sys.executable, '-X', 'importtime', PIPELINE_SCRIPT, '--rows', '1', '--cols', str(len(zones)),
+            '--zones', *zones, '--no-cache', '--out-dir', out_dir]
+
+
+def bench_startup_case(argv, repeat, cwd):
+    """Best-of-repeat wall time of a fresh interpreter, with the import entries of that run."""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run(argv, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        elapsed = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise RuntimeError(f'{" ".join(argv)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}')
+        if best is None or elapsed < best[0]:
+            best = (elapsed, parse_importtime(proc.stderr))
+    return best
+
+
+def bench_importtime(args):
+    violations = []
+    with tempfile.TemporaryDirectory() as tmp:
+        zones = write_layout(tmp, 1, 2, args.points)
+        for case in args.cases:
+            wall, entries = bench_startup_case(startup_argv(case, zones, os.path.join(tmp, 'runs')),
+                                               args.repeat, cwd=str(Path(__file__).parent))
+            import_ms = sum(cum for _, depth, _, cum in entries if depth == 0) / 1000.0
+            heavy = sorted({name for name, _, _, _ in entries
+                            if name.split('.')[0] in HEAVY_MODULES and '.' not in name})
+            print(f'{case}: wall {wall * 1000.0:.1f} ms, imports {import_ms:.1f} ms'
+                  + (f', heavy modules: {", ".join(heavy)}' if heavy else ''))
+            top = sorted((e for e in entries if e[1] == 0), key=lambda e: e[3], reverse=True)[:args.top]
+            for name, _, _, cum in top:
+                print(f'    {cum / 1000.0:>8.1f} ms  {name}')
+            if import_ms > args.budget_ms:
+                violations.append(f'{case}: imports took {import_ms:.1f} ms (budget {args.budget_ms:.0f} ms)')
+            if heavy:
+                violations.append(f'{case}: loaded {", ".join(heavy)} at startup')
+    if violations:
+        print('\nSTARTUP BUDGET EXCEEDED:', file=sys.stderr)
+        for v in violations:
+            print(f'  {v}', file=sys.stderr)
+        return 1
+    print(f'\nAll startup cases within {args.budget_ms:.0f} ms and free of {", ".join(HEAVY_MODULES)}')
+    return 0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='stitch2d_pipeline benchmarks.')
+    sub = p.add_subparsers(dest='bench', required=True)
+    r = sub.add_parser('reader', help='Single-pass zone reader vs legacy triple read')
+    r.add_argument('--points', type=int, nargs='+', default=[36, 300, 700],
+                   help='Points per axis of the synthetic square zones')
+    r.add_argument('--repeat', type=int, default=3, help='Timed repetitions (best is reported)')
+    st = sub.add_parser('stitch', help='apply_stitching_corrections vs reading one zone')
+    st.add_argument('--points', type=int, nargs='+', default=[200, 500, 1000],
+                    help='Points per axis of the synthetic square zones')
+    st.add_argument('--repeat', type=int, default=3, help='Timed repetitions (best is reported)')
+    su = sub.add_parser('suite', help='Scaling suite over zone sizes and layouts, with baseline comparison')
+    su.add_argument('--points', type=int, nargs='+', default=SUITE_POINTS,
+                    help='Points per axis for the per-zone cases (process_single_zone, apply_stitching_corrections)')
+    su.add_argument('--layouts', nargs='+', default=SUITE_LAYOUTS,
+                    help='ROWSxCOLS layouts for the stitch_and_calibrate and writer cases')
+    su.add_argument('--layout-points', type=int, default=36, help='Points per axis of each zone in the layouts')
+    su.add_argument('--overlap', type=float, default=0.2, help='Fraction of a zone shared with its neighbour')
+    su.add_argument('--full', action='store_true',
+                    help=f'Full sweep: points {FULL_POINTS}, layouts {FULL_LAYOUTS} (slow)')
+    su.add_argument('--repeat', type=int, default=3, help='Timed repetitions (best is reported)')
+    su.add_argument('--baseline', default=None, help='Baseline JSON to compare against; exit 1 on regression')
+    su.add_argument('--save-baseline', default=None, help='Write this run as a baseline JSON')
+    su.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown as a fraction of the baseline')
+    su.add_argument('--min-delta', type=float, default=0.005,
+                    help='Slowdowns smaller than this many seconds are never regressions')
+    it = sub.add_parser('importtime', help='Cold-start import time per CLI case, with a budget check')
+    it.add_argument('--cases', nargs='+', choices=STARTUP_CASES, default=list(STARTUP_CASES),
+                    help='import: import the module; help: --help; job: a 1x2 complete-grid run')
+    it.add_argument('--points', type=int, default=36, help='Points per axis of the job case zones')
+    it.add_argument('--repeat', type=int, default=3, help='Timed repetitions (best is reported)')
+    it.add_argument('--top', type=int, default=5, help='Slowest top-level imports listed per case')
+    it.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                    help='Maximum total import time per case; exit 1 if exceeded')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.bench == 'reader':
+        bench_reader(args.points, args.repeat)
+    elif args.bench == 'stitch':
+        bench_stitch(args.points, args.repeat)
+    elif args.bench == 'suite':
+        return bench_suite(args)
+    elif args.bench == 'importtime':
+        return bench_importtime(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo uncertainty for stitched 2D calibrations.
+
+Perturbs every zone's measured Ax1Err/Ax2Err grid with Gaussian measurement noise
+and propagates N realizations through per-zone slope removal (steps 4-5), the chain
+stitch, accumulation and finalize, all batched along a leading realization axis, so
+N realizations cost a few vectorized passes instead of N pipeline runs. Reports
+confidence intervals for pkAx1, pkAx2, rmsVector and orthogonality_arcsec and, per
+grid cell, the mean and standard deviation of the calibrated Ax1/Ax2/vector errors.
+
+    python stitch2d_montecarlo.py --rows 2 --cols 2 --zones CZ1.dat CZ2.dat CZ3.dat CZ4.dat \\
+        --realizations 1000 --sigma-um 0.05 --summary mc_summary.json --cells mc_cells.npz
+
+The batched path mirrors calibrate(solver='chain'): zone (0, 0) is the first
+master, every seam fits the same overlap lines and offsets, and finalize removes the
+same global slopes and zero-references at the origin, with the pipeline's own
+batched line fits (stitch2d_regression). Reductions run over the stacked arrays, so
+a zero-noise realization matches the nominal calibration to rounding (~1e-15 um).
+
+Summary intervals are empirical percentiles of the N realizations. Per-cell
+intervals are mean +/- z * std (normal approximation), which needs no per-cell
+sample storage; --cells writes mean, std, lo and hi planes for each error.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import contextlib
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+import stitch2d_pipeline as pipeline
+import stitch2d_regression as regression
+
+MC_FORMAT_VERSION = 1
+SUMMARY_STATS = ('pkAx1', 'pkAx2', 'rmsVector', 'orthogonality_arcsec')
+CELL_PLANES = ('Ax1Err', 'Ax2Err', 'VectorErr')
+# Realizations per chunk are capped so one chunk's zone stack stays near this many cells
+CHUNK_CELLS = 20_000_000
+
+
+class BatchedZone:
+    """A zone with a stack of error planes: Ax1Err/Ax2Err are (B, len(y), len(x))."""
+
+    __slots__ = ('x', 'y', 'Ax1Err', 'Ax2Err')
+
+    def __init__(self, x, y, Ax1Err, Ax2Err):
+        self.x = x
+        self.y = y
+        self.Ax1Err = Ax1Err
+        self.Ax2Err = Ax2Err
+
+    @property
+    def shape(self):
+        return (len(self.y), len(self.x))
+
+
+def process_zone_batch(x, y, ax1_err, ax2_err, y_meas_dir=-1):
+    """Steps 4-5 (step5_process_errors_multizone) on stacked step-3 grids, in place."""
+    ax1_coef = regression.polyfit1(y, np.mean(ax1_err, axis=2))
+    ax1_err -= regression.polyval1(ax1_coef, y)[:, :, None]
+    ax2_err -= regression.polyval1(y_meas_dir * ax1_coef, x)[:, None, :]
+    return BatchedZone(x, y, ax1_err, ax2_err)
+
+
+def stitch_batch(master, slave, stitch_type, y_meas_dir=-1):
+    """apply_stitching_corrections on stacked planes (slave corrected in place)."""
+    if stitch_type == 'column':
+        m_range, s_range = pipeline.ZONE_GEOMETRIES.overlap(master, slave, 'column')
+        if len(m_range) == 0:
+            return slave
+        m_idx = (slice(None), slice(None), m_range)
+        s_idx = (slice(None), slice(None), s_range)
+        diff = (regression.polyfit1(master.y, np.mean(master.Ax1Err[m_idx], axis=2))
+                - regression.polyfit1(slave.y, np.mean(slave.Ax1Err[s_idx], axis=2)))
+        slave.Ax1Err += regression.polyval1(diff, slave.y)[:, :, None]
+        slave.Ax2Err += regression.polyval1(y_meas_dir * diff, slave.x)[:, None, :]
+    else:
+        m_range, s_range = pipeline.ZONE_GEOMETRIES.overlap(master, slave, 'row')
+        if len(m_range) == 0 or len(s_range) == 0:
+            return slave
+        m_idx = (slice(None), m_range, slice(None))
+        s_idx = (slice(None), s_range, slice(None))
+        diff = (regression.polyfit1(master.x, np.mean(master.Ax2Err[m_idx], axis=1))
+                - regression.polyfit1(slave.x, np.mean(slave.Ax2Err[s_idx], axis=1)))
+        slave.Ax2Err += regression.polyval1(diff, slave.x)[:, None, :]
+    for name in ('Ax1Err', 'Ax2Err'):
+        offset = np.mean(getattr(master, name)[m_idx], axis=(1, 2)) - np.mean(getattr(slave, name)[s_idx], axis=(1, 2))
+        getattr(slave, name)[...] += offset[:, None, None]
+    return slave
+
+
+def finalize_batch(acc_ax1, acc_ax2, count, x_row, y_col, y_meas_dir=-1):
+    """
+    finalize_grid on stacked accumulation sums (B, H, W) with a shared count grid:
+    returns the calibrated (Ax1Err, Ax2Err, VectorErr) stacks and the summary stats
+    per realization.
+    """
+    valid = count > 0
+    n_rows = count.shape[0]
+    safe = np.where(valid, count, 1.0)
+    ax1 = np.where(valid, acc_ax1 / safe, 0.0)
+    ax2 = np.where(valid, acc_ax2 / safe, 0.0)
+
+    ax1_coef = regression.polyfit1(y_col, np.mean(ax1, axis=2))
+    ax2_coef = regression.polyfit1(x_row, np.sum(ax2, axis=1) / n_rows)
+    ax1_line = regression.polyval1(ax1_coef, y_col)
+    ax2_line = regression.polyval1(y_meas_dir * ax1_coef, x_row)
+    orthog = ax1_coef[:, 0] - y_meas_dir * ax2_coef[:, 0]
+    orthog_arcsec = np.arctan(orthog / 1000) * 180 / np.pi * 3600
+
+    col_valid = np.any(valid, axis=0)
+    row_valid = np.any(valid, axis=1)
+    ax1[:, :, col_valid] -= ax1_line[:, :, None]
+    ax2[:, row_valid, :] -= ax2_line[:, None, :]
+    if valid[0, 0]:
+        ax1 -= ax1[:, :1, :1]
+        ax2 -= ax2[:, :1, :1]
+    vec = np.sqrt(ax1 ** 2 + ax2 ** 2)
+
+    stats = {'orthogonality_arcsec': orthog_arcsec}
+    for name, plane in (('Ax1', ax1), ('Ax2', ax2), ('Vector', vec)):
+        values = plane[:, valid]
+        stats[f'pk{name}'] = np.max(values, axis=1) - np.min(values, axis=1)
+        stats[f'rms{name}'] = np.sqrt(np.mean(values ** 2, axis=1))
+    return (ax1, ax2, vec), stats
+
+
+def load_grids(zone_files, cache=None, fill_method='structured'):
+    """Step-3 grids of every zone: [(x, y, Ax1Err, Ax2Err)] plus the first zone's config."""
+    grids = []
+    config = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = pipeline.preprocess_zones(zone_files, cache=cache, fill_method=fill_method, keep_meta='full')
+        for zone, meta in results:
+            grid = meta['grid_data']
+            config = config or meta['config']
+            grids.append((zone.x, zone.y, np.asarray(grid['Ax1Err'], dtype=float),
+                          np.asarray(grid['Ax2Err'], dtype=float)))
+    return grids, config
+
+
+def run_realizations(grids, rows, cols, batch, noise, y_meas_dir=-1):
+    """
+    Propagate one chunk of batch realizations. noise(shape) returns the (ax1, ax2)
+    perturbations, each of that shape ((batch,) + one zone's grid shape).
+    Returns (planes, stats, count).
+    """
+    zones = []
+    for x, y, ax1, ax2 in grids:
+        n1, n2 = noise((batch,) + ax1.shape)
+        zones.append(process_zone_batch(x, y, ax1[None] + n1, ax2[None] + n2, y_meas_dir))
+
+    inc_ax1 = zones[0].x[1] - zones[0].x[0] if len(zones[0].x) > 1 else 1.0
+    inc_ax2 = zones[0].y[1] - zones[0].y[0] if len(zones[0].y) > 1 else 1.0
+    min_x, min_y, shape = pipeline.grid_extent(zones, inc_ax1, inc_ax2)
+    acc_ax1 = np.zeros((batch,) + shape)
+    acc_ax2 = np.zeros((batch,) + shape)
+    acc_x = np.zeros(shape)
+    acc_y = np.zeros(shape)
+    count = np.zeros(shape)
+    for i in range(rows):
+        for j in range(cols):
+            zone = zones[i * cols + j]
+            master = pipeline.chain_master(i, j)
+            if master is not None:
+                stitch_batch(zones[master[0][0] * cols + master[0][1]], zone, master[1], y_meas_dir)
+            r_ax2, r_ax1 = pipeline.zone_slot(zone, min_x, min_y, inc_ax1, inc_ax2)
+            acc_ax1[:, r_ax2, r_ax1] += zone.Ax1Err
+            acc_ax2[:, r_ax2, r_ax1] += zone.Ax2Err
+            acc_x[r_ax2, r_ax1] += zone.x[None, :]
+            acc_y[r_ax2, r_ax1] += zone.y[:, None]
+            count[r_ax2, r_ax1] += 1.0
+    safe = np.where(count > 0, count, 1.0)
+    x_row = np.where(count[0] > 0, acc_x[0] / safe[0], 0.0)
+    y_col = np.where(count[:, 0] > 0, acc_y[:, 0] / safe[:, 0], 0.0)
+    planes, stats = finalize_batch(acc_ax1, acc_ax2, count, x_row, y_col, y_meas_dir)
+    return planes, stats, count
+
+
+def monte_carlo(zone_files, rows, cols, realizations=1000, sigma_ax1=0.05, sigma_ax2=None, seed=0,
+                confidence=0.95, chunk=None, cache=None, fill_method='structured'):
+    """
+    Run the Monte Carlo study and return {'summary': {stat: {...}}, 'cells': {plane: {...}},
+    'valid_mask', 'realizations', ...}. sigma_ax1/sigma_ax2 are the per-cell 1-sigma
+    measurement noise in um (sigma_ax2 defaults to sigma_ax1).
+    """
+    if len(zone_files) != rows * cols:
+        raise ValueError(f'Expected {rows*cols} zone files, got {len(zone_files)}')
+    if realizations < 2:
+        raise ValueError('Need at least 2 realizations')
+    sigma_ax2 = sigma_ax1 if sigma_ax2 is None else sigma_ax2
+    grids, _ = load_grids(zone_files, cache=cache, fill_method=fill_method)
+    cells_per_realization = sum(ax1.size for _, _, ax1, _ in grids)
+    chunk = chunk or max(1, CHUNK_CELLS // cells_per_realization)
+    rng = np.random.default_rng(seed)
+
+    def noise(shape):
+        return rng.standard_normal(shape) * sigma_ax1, rng.standard_normal(shape) * sigma_ax2
+
+    samples = {name: [] for name in SUMMARY_STATS}
+    cell_sum = cell_sq = None
+    done = 0
+    while done < realizations:
+        batch = min(chunk, realizations - done)
+        planes, stats, count = run_realizations(grids, rows, cols, batch, noise)
+        for name in SUMMARY_STATS:
+            samples[name].append(stats[name])
+        sums = [np.sum(p, axis=0) for p in planes]
+        sqs = [np.sum(p ** 2, axis=0) for p in planes]
+        cell_sum = sums if cell_sum is None else [a + b for a, b in zip(cell_sum, sums)]
+        cell_sq = sqs if cell_sq is None else [a + b for a, b in zip(cell_sq, sqs)]
+        done += batch
+
+    lo_q, hi_q = 50 * (1 - confidence), 50 * (1 + confidence)
+    summary = {}
+    for name in SUMMARY_STATS:
+        values = np.concatenate(samples[name])
+        summary[name] = {
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values, ddof=1)),
+            'lo': float(np.percentile(values, lo_q)),
+            'hi': float(np.percentile(values, hi_q)),
+        }
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    cells = {}
+    for name, total, total_sq in zip(CELL_PLANES, cell_sum, cell_sq):
+        mean = total / realizations
+        std = np.sqrt(np.maximum(total_sq - realizations * mean ** 2, 0.0) / (realizations - 1))
+        cells[name] = {'mean': mean, 'std': std, 'lo': mean - z * std, 'hi': mean + z * std}
+    return {
+        'realizations': realizations,
+        'sigma_ax1_um': sigma_ax1,
+        'sigma_ax2_um': sigma_ax2,
+        'seed': seed,
+        'confidence': confidence,
+        'summary': summary,
+        'cells': cells,
+        'valid_mask': count > 0,
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Monte Carlo uncertainty of a stitched 2D calibration.')
+    p.add_argument('--rows', type=int, required=True, help='Number of zone rows (Axis 2 direction)')
+    p.add_argument('--cols', type=int, required=True, help='Number of zone columns (Axis 1 direction)')
+    p.add_argument('--zones', nargs='+', required=True, help='Zone data files in row-major order (len = rows*cols)')
+    p.add_argument('--realizations', type=int, default=1000, help='Number of perturbed realizations')
+    p.add_argument('--sigma-um', type=float, default=0.05, help='1-sigma per-cell measurement noise (um)')
+    p.add_argument('--sigma-ax2-um', type=float, default=None, help='Ax2 noise if different from --sigma-um')
+    p.add_argument('--seed', type=int, default=0, help='Random seed')
+    p.add_argument('--confidence', type=float, default=0.95, help='Confidence level of the intervals')
+    p.add_argument('--chunk', type=int, default=None,
+                   help='Realizations per vectorized pass (default: as many as fit in ~20M cells per zone stack)')
+    p.add_argument('--summary', default=None, help='Write the summary statistics to this JSON file')
+    p.add_argument('--cells', default=None, help='Write per-cell mean/std/lo/hi planes to this .npz file')
+    p.add_argument('--fill-method', choices=pipeline.FILL_METHODS, default='structured',
+                   help='How missing grid cells in incomplete zones are filled')
+    p.add_argument('--no-cache', action='store_true', help='Bypass the parsed zone cache (always re-parse zone files)')
+    p.add_argument('--cache-dir', default=pipeline.DEFAULT_CACHE_DIR, help='Parsed zone cache directory')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    missing = [z for z in args.zones if not os.path.exists(z)]
+    if missing:
+        print('ERROR: Missing zone files:')
+        for z in missing:
+            print(f'  - {z}')
+        return 1
+    cache = None if args.no_cache else pipeline.ZoneCache(args.cache_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        nominal = pipeline.calibrate(args.zones, args.rows, args.cols, cache=cache, fill_method=args.fill_method)
+    t0 = time.perf_counter()
+    result = monte_carlo(args.zones, args.rows, args.cols, realizations=args.realizations, sigma_ax1=args.sigma_um,
+                         sigma_ax2=args.sigma_ax2_um, seed=args.seed, confidence=args.confidence, chunk=args.chunk,
+                         cache=cache, fill_method=args.fill_method)
+    elapsed = time.perf_counter() - t0
+
+    print(f'{args.realizations} realizations, sigma Ax1={result["sigma_ax1_um"]:g} um, '
+          f'Ax2={result["sigma_ax2_um"]:g} um ({elapsed:.2f}s)')
+    print(f"{'statistic':<22} {'nominal':>10} {'mean':>10} {'std':>10} "
+          f"{f'{args.confidence:.0%} lo':>10} {f'{args.confidence:.0%} hi':>10}")
+    for name, s in result['summary'].items():
+        s['nominal'] = float(nominal.stats[name])
+        print(f"{name:<22} {s['nominal']:>10.4f} {s['mean']:>10.4f} {s['std']:>10.4f} {s['lo']:>10.4f} {s['hi']:>10.4f}")
+    valid = result['valid_mask']
+    for name in CELL_PLANES:
+        std = result['cells'][name]['std'][valid]
+        print(f'{name} per-cell std: median {np.median(std):.4f} um, max {np.max(std):.4f} um')
+
+    if args.summary:
+        def dump(path):
+            with open(path, 'w') as f:
+                json.dump({'version': MC_FORMAT_VERSION,
+                           'zones': [os.path.abspath(z) for z in args.zones], 'rows': args.rows, 'cols': args.cols,
+                           **{k: v for k, v in result.items() if k not in ('cells', 'valid_mask')},
+                           'elapsed_s': elapsed}, f, indent=2)
+        print(f'Summary written: {pipeline.ArtifactManager().write(args.summary, "mc_summary", dump)}')
+    if args.cells:
+        planes = {f'{name}_{key}': value for name, cell in result['cells'].items() for key, value in cell.items()}
+        path = pipeline.ArtifactManager().write(args.cells, 'mc_cells', lambda path: np.savez(
+            path, X=nominal.X, Y=nominal.Y, valid_mask=valid, **planes))
+        print(f'Per-cell intervals written: {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,37 +1,57 @@
 #!/usr/bin/env python3
+import io
 import os
 import sys
+import json
+import shutil
+import hashlib
 import argparse
+import importlib.util
+import tempfile
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from copy import deepcopy
+from itertools import islice
 
 import numpy as np
-try:
-    import matplotlib.pyplot as plt
-    HAS_MPL = True
-except Exception:
-    HAS_MPL = False
 
-import scipy.io as sio
-from scipy.interpolate import griddata
+import stitch2d_regression as regression
+
+# matplotlib and scipy are imported where they are used (plots, griddata hole
+# filling, .mat debug dumps, the global solver) so `--help` and plain complete-grid
+# runs do not pay for them at startup. See `stitch2d_bench.py importtime`.
+HAS_MPL = importlib.util.find_spec('matplotlib') is not None
 
 
 # -----------------------------
 # Single-zone pipeline helpers
 # -----------------------------
 
+# The header parser only ever inspects the first five lines of a zone file
+# (serial number, Ax1, Ax2, user units, operator/model).
+HEADER_LINES = 5
+
+
 def step1_parse_header(input_file):
     """
     Parse data file header and extract system configuration.
     Preserves logic from step1_parse_header.py
     """
-    config = {}
     try:
         with open(input_file, 'r') as fid:
-            lines = fid.readlines()
+            lines = list(islice(fid, HEADER_LINES))
     except FileNotFoundError:
         raise FileNotFoundError(f'Could not find file {input_file}')
 
+    return _parse_header_lines(lines, input_file)
+
+
+def _parse_header_lines(lines, input_file):
+    """Build the config dict from the leading lines of a zone file."""
+    config = {}
     line_idx = 0
 
     # Serial number (first line)
@@ -151,7 +171,7 @@ def step1_parse_header(input_file):
             config['comment'] = ''
 
     # File date
-    if os.path.exists(input_file):
+    if _is_path(input_file) and os.path.exists(input_file):
         file_stat = os.stat(input_file)
         config['fileDate'] = datetime.fromtimestamp(file_stat.st_mtime).strftime('%d-%b-%Y %H:%M:%S')
     else:
@@ -160,33 +180,530 @@ def step1_parse_header(input_file):
     return config
 
 
-def step2_load_data(input_file, config):
+def _is_data_line(line):
+    """True for the first line of the numeric body (same rule the old loader used)."""
+    line = line.strip()
+    if line and not line.startswith('%') and not line.startswith('#'):
+        try:
+            float(line.split()[0])
+            return True
+        except (ValueError, IndexError):
+            return False
+    return False
+
+
+def _is_path(source):
+    return isinstance(source, (str, bytes, os.PathLike))
+
+
+def _read_zone_handle(fid, input_file):
+    """Header lines by readline, then rewind to the first data line and loadtxt the rest."""
+    head = []
+    data_pos = None
+    while data_pos is None or len(head) < HEADER_LINES:
+        pos = fid.tell()
+        line = fid.readline()
+        if not line:
+            break
+        head.append(line)
+        if data_pos is None and _is_data_line(line):
+            data_pos = pos
+    if data_pos is None:
+        raise ValueError(f'No numeric data found in {input_file}')
+    fid.seek(data_pos)
+    s = np.loadtxt(fid, ndmin=2)
+    return _parse_header_lines(head[:HEADER_LINES], input_file), s
+
+
+def read_zone_file(input_file):
     """
-    Load and sort raw measurement data from file.
-    Preserves logic from step2_load_data.py
+    Read a zone file in a single pass.
+    Returns (config, s) where config is the step1 header dict and s is the raw
+    numeric matrix (Ax1TestLoc Ax2TestLoc Ax1CmdPos Ax2CmdPos Ax1RelErr Ax2RelErr).
+
+    The file is opened once: header lines are read with readline, then the same
+    handle is rewound to the first data line and handed to numpy's C tokenizer,
+    which streams the body in chunks instead of materialising a list of lines.
+    input_file may also be an open file-like object (see read_zone_source).
     """
-    data_raw = {}
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
+    if not _is_path(input_file):
+        return read_zone_source(input_file)
+    try:
+        with open(input_file, 'r') as fid:
+            return _read_zone_handle(fid, input_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f'Could not find file {input_file}')
+
+
+def read_zone_source(source):
+    """
+    (config, s) for any zone source accepted by the library API:
+      - a path to a zone file
+      - a readable file-like object with zone file contents (text or bytes),
+        read from its current position
+      - a (config, s) pair, e.g. from an earlier read_zone_file
+      - a bare s matrix; the header then takes the step1 defaults (METRIC, calDivisor 1)
+    """
+    if _is_path(source):
+        return read_zone_file(source)
+    if hasattr(source, 'read'):
+        name = getattr(source, 'name', None)
+        if isinstance(source, io.TextIOBase) and source.seekable():
+            return _read_zone_handle(source, name)
+        text = source.read()
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        return _read_zone_handle(io.StringIO(text), name)
+    if isinstance(source, tuple) and len(source) == 2:
+        config, s = source
+        return dict(config), np.array(s, dtype=float, ndmin=2)
+    s = np.array(source, dtype=float, ndmin=2)
+    if s.shape[1] < 6:
+        raise ValueError(f'Zone matrix needs 6 columns (Ax1TestLoc Ax2TestLoc Ax1CmdPos Ax2CmdPos '
+                         f'Ax1RelErr Ax2RelErr), got shape {s.shape}')
+    return _parse_header_lines([], None), s
+
+
+def _source_label(source, zone_idx):
+    """Printable name of a zone source."""
+    if _is_path(source):
+        return os.fsdecode(source)
+    name = getattr(source, 'name', None)
+    return name if isinstance(name, str) else f'<zone {zone_idx + 1} in memory>'
+
+
+# -----------------------------
+# Parsed zone cache
+# -----------------------------
+
+DEFAULT_CACHE_DIR = os.environ.get('STITCH2D_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'stitch2d'))
+DEFAULT_CACHE_MAX_MB = 1024
+# Bump when read_zone_file output changes so stale entries are never reused
+CACHE_FORMAT_VERSION = 1
+# A .tmp file older than this is left over from a killed run, not a write in progress
+CACHE_STALE_TMP_SECONDS = 3600
+
+
+class ZoneCache:
+    """
+    Binary sidecar cache for parsed zone files.
+
+    Each entry is an uncompressed .npz holding the raw matrix s and the header
+    config (as JSON). Entries are keyed by the resolved path, size and mtime of the
+    source file, so an edited or re-measured zone is re-parsed automatically
+    (calDivisor is a header field and s is stored unscaled, so it needs no key of
+    its own). Total size is capped; the least recently used entries are evicted
+    first, along with partial writes (.tmp) left behind by interrupted runs.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def key(self, zone_file):
+        st = os.stat(zone_file)
+        ident = f'{CACHE_FORMAT_VERSION}|{os.path.realpath(zone_file)}|{st.st_size}|{st.st_mtime_ns}'
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
 
-    data_start = 0
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if line and not line.startswith('%') and not line.startswith('#'):
+    def _entry_path(self, zone_file):
+        return os.path.join(self.cache_dir, self.key(zone_file) + '.npz')
+
+    def load(self, zone_file):
+        """Return (config, s) from the cache, or None on a miss or unreadable entry."""
+        path = self._entry_path(zone_file)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                s = entry['s']
+                config = json.loads(str(entry['config']))
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return config, s
+
+    def store(self, zone_file, config, s):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(zone_file)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, s=s, config=np.array(json.dumps(config)))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f'Warning: could not write zone cache entry ({e})')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def read(self, zone_file):
+        """read_zone_file with the cache in front of it."""
+        hit = self.load(zone_file)
+        if hit is not None:
+            return hit
+        config, s = read_zone_file(zone_file)
+        self.store(zone_file, config, s)
+        return config, s
+
+    def _entries(self, suffix='.npz'):
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(suffix):
+                continue
+            path = os.path.join(self.cache_dir, name)
             try:
-                float(line.split()[0])
-                data_start = i
-                break
-            except (ValueError, IndexError):
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # evicted by a concurrent run
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _remove_tmp(self, min_age=0.0):
+        """Remove .tmp files (partial writes) older than min_age seconds; return the count."""
+        removed = 0
+        now = time.time()
+        for mtime, _, path in self._entries('.tmp'):
+            if now - mtime < min_age:
                 continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes, and stale .tmp files."""
+        self._remove_tmp(CACHE_STALE_TMP_SECONDS)
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        removed = self._remove_tmp()
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+# ----------------------
+# Stage profiling
+# ----------------------
+
+PROFILE_FORMAT_VERSION = 1
+
 
-    s = np.loadtxt(input_file, skiprows=data_start)
+class StageProfiler:
+    """
+    Wall time, CPU time and tracemalloc peak per pipeline stage (and zone).
+
+    Use as `with profiler.stage('grid', zone=3): ...`. Stages may nest; each
+    record's peak_bytes is the traced peak above the allocation level at stage
+    entry, including nested stages. CPU time is process-wide, so stages run on
+    worker threads are best read as wall time. tracemalloc slows allocation-heavy
+    code noticeably; trace_memory=False records times only.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._frames = []
+        self._started_tracing = False
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    @contextmanager
+    def stage(self, name, zone=None):
+        tracing = self.trace_memory
+        if tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._frames:
+                self._frames[-1]['peak'] = max(self._frames[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame = {'start': current, 'peak': current}
+            self._frames.append(frame)
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                'stage': name,
+                'zone': zone,
+                'wall_s': time.perf_counter() - wall0,
+                'cpu_s': time.process_time() - cpu0,
+                'peak_bytes': None,
+            }
+            if tracing:
+                frame = self._frames.pop()
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = peak - frame['start']
+                if self._frames:
+                    self._frames[-1]['peak'] = max(self._frames[-1]['peak'], peak)
+            self.records.append(record)
+
+    def extend(self, records, zone=None):
+        """Merge records produced elsewhere (e.g. by a worker process), tagging them with zone."""
+        for record in records:
+            self.records.append({**record, 'zone': zone if zone is not None else record.get('zone')})
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self, **run_info):
+        """JSON-serializable report: every record plus per-stage totals."""
+        stages = {}
+        for record in self.records:
+            total = stages.setdefault(record['stage'], {'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': None})
+            total['count'] += 1
+            total['wall_s'] += record['wall_s']
+            total['cpu_s'] += record['cpu_s']
+            if record['peak_bytes'] is not None:
+                total['peak_bytes'] = max(total['peak_bytes'] or 0, record['peak_bytes'])
+        return {
+            'version': PROFILE_FORMAT_VERSION,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'trace_memory': self.trace_memory,
+            'run': run_info,
+            'total': {
+                'wall_s': time.perf_counter() - self._t0,
+                'cpu_s': time.process_time() - self._cpu0,
+            },
+            'stages': stages,
+            'records': self.records,
+        }
 
-    sort_indices = np.lexsort((s[:, 0], s[:, 1]))
-    s = s[sort_indices]
+    def write(self, path, **run_info):
+        with open(path, 'w') as f:
+            json.dump(self.report(**run_info), f, indent=2)
 
-    data_raw['Ax1TestLoc'] = s[:, 0].astype(int)
-    data_raw['Ax2TestLoc'] = s[:, 1].astype(int)
+
+class _NullProfiler:
+    """Stand-in used when profiling is off; stages cost one no-op context manager."""
+
+    enabled = False
+    records = ()
+
+    def stage(self, name, zone=None):
+        return nullcontext()
+
+    def extend(self, records, zone=None):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def place_samples(ax1_loc, ax2_loc, num_ax1=None, num_ax2=None):
+    """
+    Map 1-based Ax1TestLoc/Ax2TestLoc indices straight to row-major grid slots.
+    Returns (flat_index, count): flat_index[k] is the slot of sample k in a
+    (num_ax2, num_ax1) grid and count holds the number of samples per cell
+    (0 = hole, >1 = duplicate).
+    """
+    ax1_loc = np.asarray(ax1_loc, dtype=np.intp)
+    ax2_loc = np.asarray(ax2_loc, dtype=np.intp)
+    if num_ax1 is None:
+        num_ax1 = int(np.max(ax1_loc))
+    if num_ax2 is None:
+        num_ax2 = int(np.max(ax2_loc))
+    if np.min(ax1_loc) < 1 or np.min(ax2_loc) < 1 or np.max(ax1_loc) > num_ax1 or np.max(ax2_loc) > num_ax2:
+        raise ValueError('TestLoc indices must lie in 1..NumAx1Points / 1..NumAx2Points')
+    flat_index = (ax2_loc - 1) * num_ax1 + (ax1_loc - 1)
+    count = np.bincount(flat_index, minlength=num_ax1 * num_ax2).reshape(num_ax2, num_ax1)
+    return flat_index, count
+
+
+def _row_major_order(flat_index, count):
+    """
+    Permutation that puts samples in (Ax2TestLoc, Ax1TestLoc) order, i.e. the order
+    np.lexsort((Ax1TestLoc, Ax2TestLoc)) gives. Without duplicates every sample owns a
+    distinct slot, so the permutation is a single O(n) scatter; duplicated cells need
+    a stable sort to keep their file order.
+    """
+    if count.size and np.max(count) > 1:
+        return np.argsort(flat_index, kind='stable')
+    dest = (np.cumsum(count.ravel()) - 1)[flat_index]
+    order = np.empty_like(flat_index)
+    order[dest] = np.arange(flat_index.size)
+    return order
+
+
+class ZoneGeometry:
+    """
+    Everything step2 derives from a zone's TestLoc columns alone: the sample order,
+    grid slots, hole/duplicate masks and, per axis, the sample that supplies each
+    grid line's position. Zones measured on the same lattice share one instance
+    (see GeometryRegistry); its arrays are read-only.
+    """
+
+    __slots__ = ('ax1_loc_raw', 'ax2_loc_raw', 'order', 'ax1_loc', 'ax2_loc', 'grid_index', 'count',
+                 'hole_mask', 'duplicate_mask', 'line_samples')
+
+    def __init__(self, ax1_loc_raw, ax2_loc_raw):
+        flat_index, count = place_samples(ax1_loc_raw, ax2_loc_raw)
+        order = _row_major_order(flat_index, count)
+        # Files written in row-major order need no reordering at all
+        self.order = None if np.array_equal(order, np.arange(order.size)) else order
+        self.ax1_loc_raw = np.array(ax1_loc_raw)
+        self.ax2_loc_raw = np.array(ax2_loc_raw)
+        self.ax1_loc = self.ax1_loc_raw.astype(int) if self.order is None else self.ax1_loc_raw[order].astype(int)
+        self.ax2_loc = self.ax2_loc_raw.astype(int) if self.order is None else self.ax2_loc_raw[order].astype(int)
+        self.grid_index = flat_index if self.order is None else flat_index[order]
+        self.count = count
+        self.hole_mask = count == 0
+        self.duplicate_mask = count > 1
+        # Sample written last into each slot (as a scatter of the sorted samples would leave it)
+        slot_sample = np.full(count.size, -1)
+        slot_sample[self.grid_index] = np.arange(self.grid_index.size)
+        slot_sample = slot_sample.reshape(count.shape)
+        self.line_samples = (_first_line_samples(slot_sample, self.hole_mask),
+                             _first_line_samples(slot_sample.T, self.hole_mask.T))
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+
+    def matches(self, ax1_loc_raw, ax2_loc_raw):
+        return np.array_equal(ax1_loc_raw, self.ax1_loc_raw) and np.array_equal(ax2_loc_raw, self.ax2_loc_raw)
+
+    def sorted_samples(self, s):
+        """The raw zone matrix in (Ax2TestLoc, Ax1TestLoc) order (s itself when already sorted)."""
+        return s if self.order is None else s[self.order]
+
+
+def _first_line_samples(slot_sample, hole_mask):
+    """Per grid column of slot_sample: the sample in its first measured cell, -1 if none."""
+    first = np.argmax(~hole_mask, axis=0)
+    samples = slot_sample[first, np.arange(slot_sample.shape[1])]
+    samples.flags.writeable = False
+    return samples
+
+
+class GeometryRegistry:
+    """
+    Zone lattices seen so far, and the seam overlaps computed for them.
+
+    A multizone layout is usually measured with one point count and pitch, so every
+    zone after the first finds its ZoneGeometry here (one comparison of the TestLoc
+    columns) instead of re-deriving order, slots and masks. Seam overlaps are keyed
+    by the exact coordinate vectors involved, so all seams between the same zone
+    columns (or rows) share one pair of index arrays. Both caches are bounded and
+    safe to share between threads (stitch_wavefront); a miss is computed outside
+    the lock, so two threads may both build the same entry.
+    """
+
+    def __init__(self, max_geometries=8, max_overlaps=256):
+        self.max_geometries = max_geometries
+        self.max_overlaps = max_overlaps
+        self._geometries = []
+        self._overlaps = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, ax1_loc_raw, ax2_loc_raw):
+        """ZoneGeometry for these TestLoc columns, built on first sight."""
+        with self._lock:
+            for k, geometry in enumerate(self._geometries):
+                if geometry.matches(ax1_loc_raw, ax2_loc_raw):
+                    self._geometries.insert(0, self._geometries.pop(k))
+                    return geometry
+        geometry = ZoneGeometry(ax1_loc_raw, ax2_loc_raw)
+        with self._lock:
+            self._geometries.insert(0, geometry)
+            del self._geometries[self.max_geometries:]
+        return geometry
+
+    def overlap(self, master, slave, stitch_type):
+        """(m_range, s_range) of a column or row seam (see _column_overlap/_row_overlap)."""
+        if stitch_type == 'column':
+            key = (stitch_type, master.x.tobytes(), slave.x.tobytes())
+        else:
+            key = (stitch_type, master.y.tobytes(), slave.y.tobytes())
+        ranges = self._overlaps.get(key)
+        if ranges is None:
+            ranges = _column_overlap(master, slave) if stitch_type == 'column' else _row_overlap(master, slave)
+            for r in ranges:
+                r.flags.writeable = False
+            with self._lock:
+                if len(self._overlaps) >= self.max_overlaps:
+                    self._overlaps.pop(next(iter(self._overlaps)))
+                self._overlaps[key] = ranges
+        return ranges
+
+    def clear(self):
+        with self._lock:
+            self._geometries.clear()
+            self._overlaps.clear()
+
+
+# Shared by every zone parsed or stitched in this process
+ZONE_GEOMETRIES = GeometryRegistry()
+
+
+def _axis_positions(pos_cmd, line_samples):
+    """
+    Commanded position of every grid column (Ax1) or row (Ax2), taken from the first
+    measured cell along that line (line_samples, see ZoneGeometry). Lines without
+    any sample are filled from a straight-line fit of the measured ones.
+    """
+    pos = np.where(line_samples >= 0, pos_cmd[line_samples], np.nan)
+    missing = np.isnan(pos)
+    if np.any(missing) and np.sum(~missing) > 1:
+        idx = np.arange(pos.size)
+        pos[missing] = regression.polyval1(regression.polyfit1(idx[~missing], pos[~missing]), idx[missing])
+    return pos
+
+
+def step2_load_data(input_file, config, s=None, geometries=None):
+    """
+    Load and sort raw measurement data from file.
+    Preserves logic from step2_load_data.py
+    If the raw matrix s was already read (see read_zone_file) the file is not touched.
+    Samples are ordered by placing each one at its TestLoc grid slot (see place_samples)
+    rather than by sorting; holes and duplicates are reported as masks. Everything that
+    depends on the TestLoc columns alone comes from the zone's ZoneGeometry, shared with
+    every other zone on the same lattice (geometries defaults to ZONE_GEOMETRIES); the
+    TestLoc, GridIndex and mask arrays are read-only.
+    """
+    data_raw = {}
+    if s is None:
+        _, s = read_zone_file(input_file)
+
+    geometry = (ZONE_GEOMETRIES if geometries is None else geometries).lookup(s[:, 0], s[:, 1])
+    s = geometry.sorted_samples(s)
+
+    data_raw['Ax1TestLoc'] = geometry.ax1_loc
+    data_raw['Ax2TestLoc'] = geometry.ax2_loc
     data_raw['Ax1PosCmd'] = s[:, 2] / config['calDivisor']
     data_raw['Ax2PosCmd'] = s[:, 3] / config['calDivisor']
     data_raw['Ax1RelErr'] = s[:, 4] / config['calDivisor']
@@ -195,34 +712,124 @@ def step2_load_data(input_file, config):
     data_raw['Ax1RelErr_um'] = (data_raw['Ax1RelErr'] - np.mean(data_raw['Ax1RelErr'])) * 1000
     data_raw['Ax2RelErr_um'] = (data_raw['Ax2RelErr'] - np.mean(data_raw['Ax2RelErr'])) * 1000
 
-    data_raw['NumAx1Points'] = int(np.max(data_raw['Ax1TestLoc']))
-    data_raw['NumAx2Points'] = int(np.max(data_raw['Ax2TestLoc']))
+    data_raw['NumAx2Points'], data_raw['NumAx1Points'] = geometry.count.shape
     data_raw['Ax1MoveDist'] = np.max(data_raw['Ax1PosCmd']) - np.min(data_raw['Ax1PosCmd'])
     data_raw['Ax2MoveDist'] = np.max(data_raw['Ax2PosCmd']) - np.min(data_raw['Ax2PosCmd'])
 
+    # Grid placement of every (sorted) sample plus hole/duplicate masks
+    data_raw['GridIndex'] = geometry.grid_index
+    data_raw['SampleCount'] = geometry.count
+    data_raw['HoleMask'] = geometry.hole_mask
+    data_raw['DuplicateMask'] = geometry.duplicate_mask
+
+    data_raw['Ax1Pos'] = _axis_positions(data_raw['Ax1PosCmd'], geometry.line_samples[0])
+    data_raw['Ax2Pos'] = _axis_positions(data_raw['Ax2PosCmd'], geometry.line_samples[1])
+
     if data_raw['NumAx1Points'] > 1:
-        data_raw['Ax1SampDist'] = data_raw['Ax1PosCmd'][1] - data_raw['Ax1PosCmd'][0]
+        data_raw['Ax1SampDist'] = data_raw['Ax1Pos'][1] - data_raw['Ax1Pos'][0]
     else:
         data_raw['Ax1SampDist'] = 0.0
 
     if data_raw['NumAx2Points'] > 1:
-        data_raw['Ax2SampDist'] = data_raw['Ax2PosCmd'][data_raw['NumAx1Points']] - data_raw['Ax2PosCmd'][0]
+        data_raw['Ax2SampDist'] = data_raw['Ax2Pos'][1] - data_raw['Ax2Pos'][0]
     else:
         data_raw['Ax2SampDist'] = 0.0
 
-    data_raw['Ax1Pos'] = data_raw['Ax1PosCmd'][:data_raw['NumAx1Points']]
-    data_raw['Ax2Pos'] = data_raw['Ax2PosCmd'][::data_raw['NumAx1Points']][:data_raw['NumAx2Points']]
-
     return data_raw
 
 
-def step3_create_grid(data_raw):
+def _place_values(grid_index, values, count):
+    """Scatter per-sample values onto the grid; duplicates are averaged, holes are NaN."""
+    if np.max(count) > 1:
+        sums = np.bincount(grid_index, weights=values, minlength=count.size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grid = sums / count.ravel()
+    else:
+        grid = np.full(count.size, np.nan)
+        grid[grid_index] = values
+    grid[count.ravel() == 0] = np.nan
+    return grid.reshape(count.shape)
+
+
+def _hole_line_weights(known, coords, line_of_hole, pos_of_hole):
+    """
+    For holes lying on rows of `known` (one row per hole line), find the nearest measured
+    neighbours on each side and the linear interpolation weight between them.
+    Returns (left, right, t, kind) with kind 2 = bracketed, 1 = one side only, 0 = none.
+    """
+    n = known.shape[1]
+    idx = np.arange(n)
+    left = np.maximum.accumulate(np.where(known, idx, -1), axis=1)[line_of_hole, pos_of_hole]
+    right = np.minimum.accumulate(np.where(known, idx, n)[:, ::-1], axis=1)[:, ::-1][line_of_hole, pos_of_hole]
+    has_l = left >= 0
+    has_r = right < n
+    kind = has_l.astype(int) + has_r.astype(int)
+    # One-sided holes copy their only neighbour (t = 0 on that side)
+    left = np.where(has_l, left, right)
+    right = np.where(has_r, right, left)
+    t = np.zeros(left.size)
+    both = has_l & has_r
+    span = coords[right[both]] - coords[left[both]]
+    t[both] = (coords[pos_of_hole[both]] - coords[left[both]]) / np.where(span == 0, 1.0, span)
+    left[kind == 0] = 0
+    right[kind == 0] = 0
+    return left, right, t, kind
+
+
+def fill_grid_holes(planes, hole_mask, ax1_pos, ax2_pos):
+    """
+    Fill missing cells of structured grids in place from their row/column neighbours.
+
+    Each hole is interpolated linearly between the nearest measured cells on its row
+    (along Ax1) and on its column (along Ax2); both estimates are averaged when both
+    bracket the hole. Holes at an edge take their nearest neighbour. Only rows and
+    columns that contain holes are visited, so the cost scales with the holes rather
+    than the zone size. All planes share hole_mask. Returns the mask of filled cells.
+    """
+    remaining = hole_mask.copy()
+    filled = np.zeros_like(hole_mask)
+    while np.any(remaining):
+        hr, hc = np.nonzero(remaining)
+        known = ~remaining
+        rows, row_of_hole = np.unique(hr, return_inverse=True)
+        cols, col_of_hole = np.unique(hc, return_inverse=True)
+        rl, rr, rt, rkind = _hole_line_weights(known[rows], ax1_pos, row_of_hole, hc)
+        cl, cr, ct, ckind = _hole_line_weights(known[:, cols].T, ax2_pos, col_of_hole, hr)
+        best = np.maximum(rkind, ckind)
+        use_row = (rkind == best) & (best > 0)
+        use_col = (ckind == best) & (best > 0)
+        done = best > 0
+        if not np.any(done):
+            raise ValueError('Cannot fill grid holes: no measured cells')
+        n_est = use_row.astype(float) + use_col.astype(float)
+        for plane in planes:
+            est = np.zeros(hr.size)
+            row_est = plane[hr, rl] + rt * (plane[hr, rr] - plane[hr, rl])
+            col_est = plane[cl, hc] + ct * (plane[cr, hc] - plane[cl, hc])
+            est[use_row] += row_est[use_row]
+            est[use_col] += col_est[use_col]
+            plane[hr[done], hc[done]] = est[done] / n_est[done]
+        remaining[hr[done], hc[done]] = False
+        filled[hr[done], hc[done]] = True
+    return filled
+
+
+FILL_METHODS = ('structured', 'griddata')
+
+
+def step3_create_grid(data_raw, fill_method='structured'):
     """
     Create 2D position and error matrices using direct grid reconstruction.
     Since measurement data is already on a complete rectangular grid,
     we can use direct reshape operations instead of interpolation.
     This eliminates interpolation artifacts and matches MATLAB behavior.
+    Incomplete grids keep every measured cell as placed by step2 and only the
+    holes are filled: fill_method='structured' interpolates along the grid rows and
+    columns (fill_grid_holes), 'griddata' uses scipy's Delaunay-based linear
+    interpolation over the measured cells. grid_data['FilledMask'] marks filled cells.
     """
+    if fill_method not in FILL_METHODS:
+        raise ValueError(f'Unknown fill_method {fill_method!r}; expected one of {FILL_METHODS}')
     grid_data = {}
     
     # Create position meshgrids (same as before)
@@ -234,33 +841,24 @@ def step3_create_grid(data_raw):
     # Get grid dimensions
     num_ax1_points = len(data_raw['Ax1Pos'])
     num_ax2_points = len(data_raw['Ax2Pos'])
-    
-    # Verify that data is on a complete rectangular grid
-    expected_points = num_ax1_points * num_ax2_points
-    actual_points = len(data_raw['Ax1RelErr_um'])
-    
-    if actual_points != expected_points:
-        print(f"Warning: Expected {expected_points} points but got {actual_points}. Using interpolation fallback.")
-        # Fallback to original interpolation method
-        maxAx1 = np.max(data_raw['Ax1PosCmd']) - np.min(data_raw['Ax1PosCmd'])
-        maxAx2 = np.max(data_raw['Ax2PosCmd']) - np.min(data_raw['Ax2PosCmd'])
-        if maxAx1 == 0:
-            maxAx1 = 1.0
-        if maxAx2 == 0:
-            maxAx2 = 1.0
-        
-        points = np.column_stack((data_raw['Ax1PosCmd'] / maxAx1, data_raw['Ax2PosCmd'] / maxAx2))
-        xi = np.column_stack((X.flatten() / maxAx1, Y.flatten() / maxAx2))
-        
-        ax1_err_flat = griddata(points, data_raw['Ax1RelErr_um'], xi, method='linear')
-        grid_data['Ax1Err'] = ax1_err_flat.reshape(X.shape)
-        
-        ax2_err_flat = griddata(points, data_raw['Ax2RelErr_um'], xi, method='linear')
-        grid_data['Ax2Err'] = ax2_err_flat.reshape(X.shape)
-        
-        grid_data['maxAx1'] = maxAx1
-        grid_data['maxAx2'] = maxAx2
-    else:
+
+    # Normalization factors (used by hole interpolation, kept for compatibility)
+    maxAx1 = np.max(data_raw['Ax1PosCmd']) - np.min(data_raw['Ax1PosCmd'])
+    maxAx2 = np.max(data_raw['Ax2PosCmd']) - np.min(data_raw['Ax2PosCmd'])
+    if maxAx1 == 0:
+        maxAx1 = 1.0
+    if maxAx2 == 0:
+        maxAx2 = 1.0
+    grid_data['maxAx1'] = maxAx1
+    grid_data['maxAx2'] = maxAx2
+
+    hole_mask = data_raw['HoleMask']
+    duplicate_mask = data_raw['DuplicateMask']
+    grid_data['HoleMask'] = hole_mask
+    grid_data['DuplicateMask'] = duplicate_mask
+    grid_data['FilledMask'] = np.zeros_like(hole_mask)
+
+    if not np.any(hole_mask) and not np.any(duplicate_mask):
         # Direct grid reconstruction - data is already gridded!
         print(f"Data is on complete {num_ax1_points}x{num_ax2_points} grid. Using direct reshape (no interpolation).")
         
@@ -269,17 +867,28 @@ def step3_create_grid(data_raw):
         # So reshape to (num_ax2_points, num_ax1_points) = (36 rows, 36 cols)
         grid_data['Ax1Err'] = data_raw['Ax1RelErr_um'].reshape(num_ax2_points, num_ax1_points)
         grid_data['Ax2Err'] = data_raw['Ax2RelErr_um'].reshape(num_ax2_points, num_ax1_points)
-        
-        # Store normalization factors for compatibility (though not used for direct reshape)
-        maxAx1 = np.max(data_raw['Ax1PosCmd']) - np.min(data_raw['Ax1PosCmd'])
-        maxAx2 = np.max(data_raw['Ax2PosCmd']) - np.min(data_raw['Ax2PosCmd'])
-        if maxAx1 == 0:
-            maxAx1 = 1.0
-        if maxAx2 == 0:
-            maxAx2 = 1.0
-        grid_data['maxAx1'] = maxAx1
-        grid_data['maxAx2'] = maxAx2
-    
+        return grid_data
+
+    num_holes = int(np.sum(hole_mask))
+    num_dups = int(np.sum(duplicate_mask))
+    print(f"Warning: {num_ax1_points}x{num_ax2_points} grid has {num_holes} missing and {num_dups} duplicated cells. "
+          f"Duplicates are averaged; missing cells are interpolated.")
+    grid_data['Ax1Err'] = _place_values(data_raw['GridIndex'], data_raw['Ax1RelErr_um'], data_raw['SampleCount'])
+    grid_data['Ax2Err'] = _place_values(data_raw['GridIndex'], data_raw['Ax2RelErr_um'], data_raw['SampleCount'])
+
+    if num_holes and fill_method == 'structured':
+        grid_data['FilledMask'] = fill_grid_holes([grid_data['Ax1Err'], grid_data['Ax2Err']], hole_mask,
+                                                  data_raw['Ax1Pos'], data_raw['Ax2Pos'])
+    elif num_holes:
+        # Interpolate only the missing cells from the measured ones
+        from scipy.interpolate import griddata
+        known = ~hole_mask
+        points = np.column_stack((X[known] / maxAx1, Y[known] / maxAx2))
+        xi = np.column_stack((X[hole_mask] / maxAx1, Y[hole_mask] / maxAx2))
+        grid_data['Ax1Err'][hole_mask] = griddata(points, grid_data['Ax1Err'][known], xi, method='linear')
+        grid_data['Ax2Err'][hole_mask] = griddata(points, grid_data['Ax2Err'][known], xi, method='linear')
+        grid_data['FilledMask'] = hole_mask & ~np.isnan(grid_data['Ax1Err'])
+
     return grid_data
 
 
@@ -294,14 +903,16 @@ def step4_calculate_slopes(grid_data):
     mean_ax1_err = np.mean(grid_data['Ax1Err'], axis=1)
     mean_ax2_err = np.mean(grid_data['Ax2Err'], axis=0)
 
-    slope_data['Ax1Coef'] = np.polyfit(grid_data['Y'][:, 0], mean_ax1_err, 1)
-    slope_data['Ax2Coef'] = np.polyfit(grid_data['X'][0, :], mean_ax2_err, 1)
+    y_basis = regression.basis(grid_data['Y'][:, 0])
+    x_basis = regression.basis(grid_data['X'][0, :])
+    slope_data['Ax1Coef'] = y_basis.fit(mean_ax1_err)
+    slope_data['Ax2Coef'] = x_basis.fit(mean_ax2_err)
 
-    slope_data['Ax1Line'] = np.polyval(slope_data['Ax1Coef'], grid_data['Y'][:, 0])
-    slope_data['Ax2Line'] = np.polyval(y_meas_dir * slope_data['Ax1Coef'], grid_data['X'][0, :])
+    slope_data['Ax1Line'] = y_basis.evaluate(slope_data['Ax1Coef'])
+    slope_data['Ax2Line'] = x_basis.evaluate(y_meas_dir * slope_data['Ax1Coef'])
 
     slope_data['Ax1Orthog'] = mean_ax1_err - slope_data['Ax1Line']
-    slope_data['Ax2Orthog'] = mean_ax2_err - np.polyval(slope_data['Ax2Coef'], grid_data['X'][0, :])
+    slope_data['Ax2Orthog'] = mean_ax2_err - x_basis.evaluate(slope_data['Ax2Coef'])
 
     orthog_slope = slope_data['Ax1Coef'][0] - y_meas_dir * slope_data['Ax2Coef'][0]
     slope_data['orthog'] = np.arctan(orthog_slope / 1000) * 180 / np.pi * 3600
@@ -323,13 +934,8 @@ def step5_process_errors(grid_data, slope_data):
     processed_data['Y'] = grid_data['Y'].copy()
     processed_data['SizeGrid'] = grid_data['SizeGrid']
 
-    processed_data['Ax1Err'] = grid_data['Ax1Err'].copy()
-    processed_data['Ax2Err'] = grid_data['Ax2Err'].copy()
-
-    for i in range(processed_data['SizeGrid'][1]):
-        processed_data['Ax1Err'][:, i] = processed_data['Ax1Err'][:, i] - slope_data['Ax1Line']
-    for i in range(processed_data['SizeGrid'][0]):
-        processed_data['Ax2Err'][i, :] = processed_data['Ax2Err'][i, :] - slope_data['Ax2Line']
+    processed_data['Ax1Err'] = grid_data['Ax1Err'] - slope_data['Ax1Line'][:, None]
+    processed_data['Ax2Err'] = grid_data['Ax2Err'] - slope_data['Ax2Line'][None, :]
 
     processed_data['Ax1Err'] = processed_data['Ax1Err'] - processed_data['Ax1Err'][0, 0]
     processed_data['Ax2Err'] = processed_data['Ax2Err'] - processed_data['Ax2Err'][0, 0]
@@ -364,10 +970,8 @@ def step5_process_errors_multizone(grid_data, slope_data):
     processed_data.update(slope_data)
     
     # Remove best-fit lines (slope errors) from error data
-    for i in range(processed_data['SizeGrid'][1]):
-        processed_data['Ax1Err'][:, i] = processed_data['Ax1Err'][:, i] - slope_data['Ax1Line']
-    for i in range(processed_data['SizeGrid'][0]):
-        processed_data['Ax2Err'][i, :] = processed_data['Ax2Err'][i, :] - slope_data['Ax2Line']
+    processed_data['Ax1Err'] -= slope_data['Ax1Line'][:, None]
+    processed_data['Ax2Err'] -= slope_data['Ax2Line'][None, :]
 
     # DO NOT apply zero-referencing here for multizone stitching
     # This will be applied later after stitching is complete
@@ -394,171 +998,412 @@ def step5_process_errors_multizone(grid_data, slope_data):
 # Multizone stitching helpers (ported)
 # -------------------------------------
 
-def apply_stitching_corrections(master, slave, stitch_type, y_meas_dir, diag=False, dump_dir=None):
-    """Apply stitching corrections to align a slave zone with the master zone (MATLAB-compatible)."""
-    slave_corrected = deepcopy(slave)
+class Zone:
+    """
+    One zone as seen by stitching and accumulation.
+
+    x/y are the 1-D Ax1 (column) and Ax2 (row) coordinate vectors, Ax1Err/Ax2Err the
+    error planes (len(y) x len(x)) and meta the single-zone pipeline outputs. The X/Y
+    meshgrids are only built when asked for, as read-only broadcast views of x/y.
+    zone['X'] etc. still work, for code written against the old zone dicts.
+    """
+
+    __slots__ = ('x', 'y', 'Ax1Err', 'Ax2Err', 'meta')
+
+    def __init__(self, x, y, Ax1Err, Ax2Err, meta=None):
+        self.x = x
+        self.y = y
+        self.Ax1Err = Ax1Err
+        self.Ax2Err = Ax2Err
+        self.meta = meta
+
+    @property
+    def shape(self):
+        return (len(self.y), len(self.x))
+
+    @property
+    def X(self):
+        return np.broadcast_to(self.x, self.shape)
+
+    @property
+    def Y(self):
+        return np.broadcast_to(self.y[:, None], self.shape)
+
+    def __getitem__(self, key):
+        if key not in ('X', 'Y', 'Ax1Err', 'Ax2Err'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def copy(self):
+        """Copy of the error planes; coordinate vectors and meta are shared (never modified)."""
+        return Zone(self.x, self.y, self.Ax1Err.copy(), self.Ax2Err.copy(), self.meta)
+
+
+def _print_overlap_means(label, master, slave, m_idx, s_idx):
+    ax1_m = float(np.mean(master.Ax1Err[m_idx]))
+    ax1_s = float(np.mean(slave.Ax1Err[s_idx]))
+    ax2_m = float(np.mean(master.Ax2Err[m_idx]))
+    ax2_s = float(np.mean(slave.Ax2Err[s_idx]))
+    print(f'      {label}:')
+    print(f'        Ax1 master={ax1_m:.6f}, slave={ax1_s:.6f} (diff={ax1_m-ax1_s:.6f})')
+    print(f'        Ax2 master={ax2_m:.6f}, slave={ax2_s:.6f} (diff={ax2_m-ax2_s:.6f})')
+
+
+def _column_overlap(master, slave):
+    """
+    Overlapping columns of a master and the slave to its right (+Ax1).
+    EXACT MATLAB overlap detection algorithm (from MultiZone2DCal.m lines 182-190):
+    k = number of leading slave columns with X < max(master X), then
+    mRange = ((Ax1size(2)-k+1): Ax1size(2)), sRange = (1:k).
+    Returned as index arrays rather than slices: the overlap means must reduce over
+    the same contiguous copies as the MATLAB port to stay bit-identical.
+    """
+    below = slave.x < np.max(master.x)
+    k = below.size if np.all(below) else int(np.argmin(below))
+    master_size = len(master.x)
+    return np.arange(master_size - k, master_size), np.arange(k)
+
+
+def _row_overlap(master, slave):
+    """
+    Overlapping rows of a master and the slave above it (+Ax2).
+    MATLAB algorithm: master_overlap_idx = find(master.Y(:,1) >= min(min(slave.Y)))
+                      slave_overlap_idx = find(slave.Y(:,1) <= max(max(master.Y)))
+    """
+    m_range = np.nonzero(master.y >= np.min(slave.y))[0]
+    s_range = np.nonzero(slave.y <= np.max(master.y))[0]
+    return m_range, s_range
+
 
+def _apply_seam_slopes(zone, stitch_type, master_coef, slave_coef, y_meas_dir):
+    """Slope part of a seam correction, in place: swap the slave's fitted line for the master's."""
     if stitch_type == 'column':
-        # EXACT MATLAB overlap detection algorithm (from MultiZone2DCal.m lines 182-190)
-        master_x = master['X'][0, :]
-        slave_x = slave['X'][0, :]
-        
-        # MATLAB: Find how many slave columns have X < max(master X)
-        max_master_x = np.max(master['X'])
-        k = 0
-        for col_idx in range(slave_x.shape[0]):
-            if slave_x[col_idx] < max_master_x:
-                k += 1
-            else:
-                break
-        
-        if k == 0:
+        # Ax1 slope correction (vs Y) broadcast across all slave columns
+        # (the master's and slave's lines are evaluated in one call)
+        lines = regression.polyval1(np.stack([slave_coef, master_coef]), zone.y)
+        zone.Ax1Err -= lines[0][:, None]
+        zone.Ax1Err += lines[1][:, None]
+        # Ax2 orthogonality correction (coupled to Ax1 slope, vs X) broadcast across all rows
+        lines = regression.polyval1(y_meas_dir * np.stack([slave_coef, master_coef]), zone.x)
+        zone.Ax2Err -= lines[0][None, :]
+        zone.Ax2Err += lines[1][None, :]
+    else:
+        # Ax2 slope correction (vs X) broadcast across all slave rows
+        lines = regression.polyval1(np.stack([slave_coef, master_coef]), zone.x)
+        zone.Ax2Err -= lines[0][None, :]
+        zone.Ax2Err += lines[1][None, :]
+
+
+def _fit_overlap_lines(master_t, master_values, slave_t, slave_values):
+    """Master and slave overlap lines ([slope, intercept] each); one batched fit when they share a grid."""
+    if np.array_equal(master_t, slave_t):
+        return tuple(regression.polyfit1(master_t, np.stack([master_values, slave_values])))
+    return regression.polyfit1(master_t, master_values), regression.polyfit1(slave_t, slave_values)
+
+
+def apply_stitching_corrections(master, slave, stitch_type, y_meas_dir, diag=False, dump_dir=None, inplace=False,
+                                corrections=None):
+    """
+    Apply stitching corrections to align a slave zone with the master zone (MATLAB-compatible).
+
+    Slope lines are evaluated once on the zone's axis vector and broadcast over the
+    error planes, so the work is a few whole-array passes per seam. With inplace=True
+    the slave's own Ax1Err/Ax2Err buffers are corrected and the slave is returned;
+    otherwise a Zone.copy() of the slave is corrected.
+    If corrections is a dict, it is filled with what was applied (stitch_type,
+    master_coef, slave_coef, offset), which replay_stitching_corrections can apply
+    again to the uncorrected slave with bit-identical results.
+    """
+    slave_corrected = slave if inplace else slave.copy()
+    ax1_err = slave_corrected.Ax1Err
+    ax2_err = slave_corrected.Ax2Err
+    if corrections is not None:
+        corrections.clear()
+        corrections['stitch_type'] = stitch_type
+
+    if stitch_type == 'column':
+        m_range, s_range = ZONE_GEOMETRIES.overlap(master, slave, 'column')
+        if len(m_range) == 0:
             print('    Warning: No overlap found for column stitching')
             return slave_corrected
-        
-        # MATLAB: mRange = ((Ax1size(2)-k+1): Ax1size(2))
-        #         sRange = (1:k)
-        # Convert to Python 0-based indexing:
-        master_size = master_x.shape[0] 
-        m_range = np.arange(master_size - k, master_size)  # Right k columns of master
-        s_range = np.arange(k)  # Left k columns of slave
-        
-        if len(m_range) == 0 or len(s_range) == 0:
-            print('    Warning: Empty overlap ranges')
-            return slave_corrected
-            
+        k = len(m_range)
+        m_idx = (slice(None), m_range)
+        s_idx = (slice(None), s_range)
         print(f'    Overlap: Master cols {m_range[0]}-{m_range[-1]}, Slave cols {s_range[0]}-{s_range[-1]} (k={k})')
 
-        # Mean Ax1 error across overlap columns (vector vs Y)
-        master_ax1_mean = np.mean(master['Ax1Err'][:, m_range], axis=1)
-        slave_ax1_mean = np.mean(slave['Ax1Err'][:, s_range], axis=1)
-
-        # Fit Ax1 straightness vs Y
-        master_coef_ax1 = np.polyfit(master['Y'][:, 0], master_ax1_mean, 1)
-        slave_coef_ax1 = np.polyfit(slave['Y'][:, 0], slave_ax1_mean, 1)
+        # Fit Ax1 straightness vs Y on the mean Ax1 error across overlap columns
+        y_vec = slave.y
+        master_coef_ax1, slave_coef_ax1 = _fit_overlap_lines(master.y, np.mean(master.Ax1Err[m_idx], axis=1),
+                                                             y_vec, np.mean(slave.Ax1Err[s_idx], axis=1))
         print(f'    Ax1 slope correction: Master={master_coef_ax1[0]:.6f}, Slave={slave_coef_ax1[0]:.6f} um/mm')
         if diag:
-            # Detailed diagnostics: overlap size and means
-            pre_ax1_master_mean = float(np.mean(master['Ax1Err'][:, m_range]))
-            pre_ax1_slave_mean = float(np.mean(slave['Ax1Err'][:, s_range]))
-            pre_ax2_master_mean = float(np.mean(master['Ax2Err'][:, m_range]))
-            pre_ax2_slave_mean = float(np.mean(slave['Ax2Err'][:, s_range]))
-            print(f'      Overlap size (cols): {len(m_range)}')
-            print(f'      Pre-correction overlap means:')
-            print(f'        Ax1 master={pre_ax1_master_mean:.6f}, slave={pre_ax1_slave_mean:.6f} (diff={pre_ax1_master_mean-pre_ax1_slave_mean:.6f})')
-            print(f'        Ax2 master={pre_ax2_master_mean:.6f}, slave={pre_ax2_slave_mean:.6f} (diff={pre_ax2_master_mean-pre_ax2_slave_mean:.6f})')
+            print(f'      Overlap size (cols): {k}')
+            _print_overlap_means('Pre-correction overlap means', master, slave, m_idx, s_idx)
             print(f'      Ax1 polyfit (slope, intercept): master=({master_coef_ax1[0]:.6f}, {master_coef_ax1[1]:.6f}), '
                   f'slave=({slave_coef_ax1[0]:.6f}, {slave_coef_ax1[1]:.6f})')
 
-        # Apply Ax1 slope corrections across all columns of slave
-        y_vec_slave = slave['Y'][:, 0]
-        for n in range(slave['X'].shape[1]):
-            slave_corrected['Ax1Err'][:, n] = (
-                slave_corrected['Ax1Err'][:, n]
-                - np.polyval(slave_coef_ax1, y_vec_slave)
-                + np.polyval(master_coef_ax1, y_vec_slave)
-            )
-
-        # Apply Ax2 orthogonality correction (coupled to Ax1 slope)
-        master_coef_ax2_orth = y_meas_dir * master_coef_ax1
-        slave_coef_ax2_orth = y_meas_dir * slave_coef_ax1
-        for n in range(slave['Y'].shape[0]):
-            slave_corrected['Ax2Err'][n, :] = (
-                slave_corrected['Ax2Err'][n, :]
-                - np.polyval(slave_coef_ax2_orth, slave['X'][n, :])
-                + np.polyval(master_coef_ax2_orth, slave['X'][n, :])
-            )
-
-        # Scalar offset corrections across overlap columns
-        ax1_correction = np.mean(master['Ax1Err'][:, m_range]) - np.mean(slave_corrected['Ax1Err'][:, s_range])
-        ax2_correction = np.mean(master['Ax2Err'][:, m_range]) - np.mean(slave_corrected['Ax2Err'][:, s_range])
-        if diag:
-            print(f'      Offsets to apply (pre-apply): Ax1={ax1_correction:.6f}, Ax2={ax2_correction:.6f}')
-        slave_corrected['Ax1Err'] += ax1_correction
-        slave_corrected['Ax2Err'] += ax2_correction
-        if diag:
-            post_ax1_master_mean = float(np.mean(master['Ax1Err'][:, m_range]))
-            post_ax1_slave_mean = float(np.mean(slave_corrected['Ax1Err'][:, s_range]))
-            post_ax2_master_mean = float(np.mean(master['Ax2Err'][:, m_range]))
-            post_ax2_slave_mean = float(np.mean(slave_corrected['Ax2Err'][:, s_range]))
-            print(f'      Post-apply overlap means:')
-            print(f'        Ax1 master={post_ax1_master_mean:.6f}, slave={post_ax1_slave_mean:.6f} (diff={post_ax1_master_mean-post_ax1_slave_mean:.6f})')
-            print(f'        Ax2 master={post_ax2_master_mean:.6f}, slave={post_ax2_slave_mean:.6f} (diff={post_ax2_master_mean-post_ax2_slave_mean:.6f})')
-        print(f'    Offset corrections: Ax1={ax1_correction:.3f}, Ax2={ax2_correction:.3f} um')
+        master_coef, slave_coef = master_coef_ax1, slave_coef_ax1
 
     else:  # row stitching
-        # MATLAB-compatible overlap detection for row stitching
-        master_y = master['Y'][:, 0]
-        slave_y = slave['Y'][:, 0]
-        
-        # MATLAB algorithm: master_overlap_idx = find(master.Y(:,1) >= min(min(slave.Y)))
-        #                   slave_overlap_idx = find(slave.Y(:,1) <= max(max(master.Y)))
-        min_slave_y = np.min(slave['Y'])
-        max_master_y = np.max(master['Y'])
-        
-        master_overlap_idx = np.where(master_y >= min_slave_y)[0]
-        slave_overlap_idx = np.where(slave_y <= max_master_y)[0]
-        
-        if len(master_overlap_idx) == 0 or len(slave_overlap_idx) == 0:
+        m_range, s_range = ZONE_GEOMETRIES.overlap(master, slave, 'row')
+        if len(m_range) == 0 or len(s_range) == 0:
             print('    Warning: No overlap found for row stitching')
             return slave_corrected
-        
-        m_range = master_overlap_idx
-        s_range = slave_overlap_idx
-        print(f'    Overlap: Master rows {m_range[0]}-{m_range[-1]}, Slave rows {s_range[0]}-{s_range[-1]}')
 
-        # Mean Ax2 error across overlap rows (vector vs X)
-        master_ax2_mean = np.mean(master['Ax2Err'][m_range, :], axis=0)
-        slave_ax2_mean = np.mean(slave['Ax2Err'][s_range, :], axis=0)
+        m_idx = (m_range, slice(None))
+        s_idx = (s_range, slice(None))
+        print(f'    Overlap: Master rows {m_range[0]}-{m_range[-1]}, Slave rows {s_range[0]}-{s_range[-1]}')
 
-        # Fit Ax2 straightness vs X
-        master_coef_ax2 = np.polyfit(master['X'][0, :], master_ax2_mean, 1)
-        slave_coef_ax2 = np.polyfit(slave['X'][0, :], slave_ax2_mean, 1)
+        # Fit Ax2 straightness vs X on the mean Ax2 error across overlap rows
+        x_vec = slave.x
+        master_coef_ax2, slave_coef_ax2 = _fit_overlap_lines(master.x, np.mean(master.Ax2Err[m_idx], axis=0),
+                                                             x_vec, np.mean(slave.Ax2Err[s_idx], axis=0))
         print(f'    Ax2 slope correction: Master={master_coef_ax2[0]:.6f}, Slave={slave_coef_ax2[0]:.6f} um/mm')
         if diag:
-            pre_ax1_master_mean = float(np.mean(master['Ax1Err'][m_range, :]))
-            pre_ax1_slave_mean = float(np.mean(slave['Ax1Err'][s_range, :]))
-            pre_ax2_master_mean = float(np.mean(master['Ax2Err'][m_range, :]))
-            pre_ax2_slave_mean = float(np.mean(slave['Ax2Err'][s_range, :]))
             print(f'      Overlap size (rows): {len(m_range)}')
-            print(f'      Pre-correction overlap means:')
-            print(f'        Ax1 master={pre_ax1_master_mean:.6f}, slave={pre_ax1_slave_mean:.6f} (diff={pre_ax1_master_mean-pre_ax1_slave_mean:.6f})')
-            print(f'        Ax2 master={pre_ax2_master_mean:.6f}, slave={pre_ax2_slave_mean:.6f} (diff={pre_ax2_master_mean-pre_ax2_slave_mean:.6f})')
+            _print_overlap_means('Pre-correction overlap means', master, slave, m_idx, s_idx)
             print(f'      Ax2 polyfit (slope, intercept): master=({master_coef_ax2[0]:.6f}, {master_coef_ax2[1]:.6f}), '
                   f'slave=({slave_coef_ax2[0]:.6f}, {slave_coef_ax2[1]:.6f})')
 
-        # Apply Ax2 slope corrections across all rows of slave
-        for n in range(slave['Y'].shape[0]):
-            slave_corrected['Ax2Err'][n, :] = (
-                slave_corrected['Ax2Err'][n, :]
-                - np.polyval(slave_coef_ax2, slave['X'][n, :])
-                + np.polyval(master_coef_ax2, slave['X'][n, :])
-            )
-
-        # Scalar offset corrections across overlap rows
-        ax1_correction = np.mean(master['Ax1Err'][m_range, :]) - np.mean(slave_corrected['Ax1Err'][s_range, :])
-        ax2_correction = np.mean(master['Ax2Err'][m_range, :]) - np.mean(slave_corrected['Ax2Err'][s_range, :])
-        if diag:
-            print(f'      Offsets to apply (pre-apply): Ax1={ax1_correction:.6f}, Ax2={ax2_correction:.6f}')
-        slave_corrected['Ax1Err'] += ax1_correction
-        slave_corrected['Ax2Err'] += ax2_correction
-        if diag:
-            post_ax1_master_mean = float(np.mean(master['Ax1Err'][m_range, :]))
-            post_ax1_slave_mean = float(np.mean(slave_corrected['Ax1Err'][s_range, :]))
-            post_ax2_master_mean = float(np.mean(master['Ax2Err'][m_range, :]))
-            post_ax2_slave_mean = float(np.mean(slave_corrected['Ax2Err'][s_range, :]))
-            print(f'      Post-apply overlap means:')
-            print(f'        Ax1 master={post_ax1_master_mean:.6f}, slave={post_ax1_slave_mean:.6f} (diff={post_ax1_master_mean-post_ax1_slave_mean:.6f})')
-            print(f'        Ax2 master={post_ax2_master_mean:.6f}, slave={post_ax2_slave_mean:.6f} (diff={post_ax2_master_mean-post_ax2_slave_mean:.6f})')
-        print(f'    Offset corrections: Ax1={ax1_correction:.3f}, Ax2={ax2_correction:.3f} um')
+        master_coef, slave_coef = master_coef_ax2, slave_coef_ax2
+
+    _apply_seam_slopes(slave_corrected, stitch_type, master_coef, slave_coef, y_meas_dir)
+
+    # Scalar offset corrections across the overlap
+    ax1_correction = np.mean(master.Ax1Err[m_idx]) - np.mean(ax1_err[s_idx])
+    ax2_correction = np.mean(master.Ax2Err[m_idx]) - np.mean(ax2_err[s_idx])
+    if diag:
+        print(f'      Offsets to apply (pre-apply): Ax1={ax1_correction:.6f}, Ax2={ax2_correction:.6f}')
+    ax1_err += ax1_correction
+    ax2_err += ax2_correction
+    if diag:
+        _print_overlap_means('Post-apply overlap means', master, slave_corrected, m_idx, s_idx)
+    print(f'    Offset corrections: Ax1={ax1_correction:.3f}, Ax2={ax2_correction:.3f} um')
+    if corrections is not None:
+        corrections.update(master_coef=master_coef.tolist(), slave_coef=slave_coef.tolist(),
+                           offset=[float(ax1_correction), float(ax2_correction)])
 
     return slave_corrected
 
 
+def replay_stitching_corrections(zone, corrections, y_meas_dir, inplace=False):
+    """
+    Apply a corrections record from apply_stitching_corrections to the same uncorrected
+    zone, without its master. An empty record (no overlap found) changes nothing.
+    """
+    corrected = zone if inplace else zone.copy()
+    if 'offset' in corrections:
+        _apply_seam_slopes(corrected, corrections['stitch_type'], np.array(corrections['master_coef']),
+                           np.array(corrections['slave_coef']), y_meas_dir)
+        corrected.Ax1Err += corrections['offset'][0]
+        corrected.Ax2Err += corrections['offset'][1]
+    return corrected
+
+
+def chain_master(i, j):
+    """((row, col) of the master, stitch type) of zone (i, j) in the chain solver; None for (0, 0)."""
+    if j > 0:
+        return (i, j - 1), 'column'
+    if i > 0:
+        return (i - 1, 0), 'row'
+    return None
+
+
+def chain_dependents(rows, cols, i, j):
+    """Zones (row, col) whose chain stitch depends on zone (i, j), including itself, in stitch order."""
+    if j > 0:
+        return [(i, c) for c in range(j, cols)]
+    return [(r, c) for r in range(i, rows) for c in range(cols)]
+
+
+def _stitch_row_chain(zones, i, cols, y_meas_dir, diag=False, dump_dir=None):
+    """Column-stitch zones (i, 1..cols-1) in place, each onto its left neighbour."""
+    for j in range(1, cols):
+        apply_stitching_corrections(zones[i * cols + j - 1], zones[i * cols + j], 'column', y_meas_dir,
+                                    diag=diag, dump_dir=dump_dir, inplace=True)
+
+
+def stitch_wavefront(zones, rows, cols, y_meas_dir, workers, diag=False, dump_dir=None):
+    """
+    Chained stitch of a row-major zone list (in place) with rows stitched concurrently.
+
+    Only zone (i, 0) depends on the previous row (row stitch onto (i-1, 0)); the rest
+    of row i chains off (i, 0). So the first column is stitched in order and each row's
+    column chain is handed to a thread pool as soon as its first zone is ready: latency
+    is ~rows + cols seams instead of rows * cols. Every seam sees exactly the same
+    master as in the row-major order, so results are identical.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for i in range(rows):
+            if i > 0:
+                apply_stitching_corrections(zones[(i - 1) * cols], zones[i * cols], 'row', y_meas_dir,
+                                            diag=diag, dump_dir=dump_dir, inplace=True)
+            futures.append(pool.submit(_stitch_row_chain, zones, i, cols, y_meas_dir, diag, dump_dir))
+        for f in futures:
+            f.result()
+    return zones
+
+
+STITCH_SOLVERS = ('chain', 'global')
+
+
+def _zone_seams(rows, cols):
+    """All neighbouring zone pairs (a, b, stitch_type) in a row-major rows x cols layout."""
+    seams = []
+    for i in range(rows):
+        for j in range(cols):
+            a = i * cols + j
+            if j + 1 < cols:
+                seams.append((a, a + 1, 'column'))
+            if i + 1 < rows:
+                seams.append((a, a + cols, 'row'))
+    return seams
+
+
+def _line_slope(x, y):
+    """Least-squares slope of y vs x (the degree-1 term np.polyfit would return)."""
+    return regression.basis(x).slope(y)
+
+
+def solve_global_stitch(zones, rows, cols, y_meas_dir):
+    """
+    Solve every zone's stitching correction at once from all pairwise overlaps.
+
+    Each zone z gets Ax1Err += p[z]*Y + c1[z] and Ax2Err += q[z]*X + c2[z]; zone 0 is
+    the reference (all zero), as in the chained stitch. Every horizontal and vertical
+    neighbour pair contributes the same observations the chain uses for a seam of that
+    type, but all seams (including vertical seams between non-first columns) enter one
+    least-squares system instead of being applied one after another:
+
+      column seam: p_b - p_a = Ax1 slope(a) - Ax1 slope(b) on the overlap-mean vs Y
+                   q_b - q_a = y_meas_dir * (p_b - p_a)       (orthogonality coupling)
+      row seam:    q_b - q_a = Ax2 slope(a) - Ax2 slope(b) on the overlap-mean vs X
+                   p_b - p_a = 0                              (no Ax1 slope change)
+      both:        overlap means of the slope-corrected errors agree (c1, c2)
+
+    Slopes are solved first, then offsets given the slopes, mirroring the chain. Each
+    stage is a sparse graph Laplacian system factorised once.
+    Returns dict of arrays p, q, c1, c2 (length rows*cols).
+    """
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import splu
+
+    n = len(zones)
+    eqs = []
+    for a, b, stitch_type in _zone_seams(rows, cols):
+        za, zb = zones[a], zones[b]
+        if stitch_type == 'column':
+            a_range, b_range = ZONE_GEOMETRIES.overlap(za, zb, 'column')
+            a_idx = (slice(None), a_range)
+            b_idx = (slice(None), b_range)
+        else:
+            a_range, b_range = ZONE_GEOMETRIES.overlap(za, zb, 'row')
+            a_idx = (a_range, slice(None))
+            b_idx = (b_range, slice(None))
+        if len(a_range) == 0 or len(b_range) == 0:
+            print(f'    Warning: No overlap between zones {a+1} and {b+1}; seam ignored')
+            continue
+        ya, yb = za.y, zb.y
+        xa, xb = za.x, zb.x
+        if stitch_type == 'column':
+            ax1_a = _line_slope(ya, np.mean(za.Ax1Err[a_idx], axis=1))
+            ax1_b = _line_slope(yb, np.mean(zb.Ax1Err[b_idx], axis=1))
+            p_rhs, q_rhs = ax1_a - ax1_b, None
+            y_mean = (np.mean(ya), np.mean(yb))
+            x_mean = (np.mean(xa[a_range]), np.mean(xb[b_range]))
+        else:
+            ax2_a = _line_slope(xa, np.mean(za.Ax2Err[a_idx], axis=0))
+            ax2_b = _line_slope(xb, np.mean(zb.Ax2Err[b_idx], axis=0))
+            p_rhs, q_rhs = 0.0, ax2_a - ax2_b
+            y_mean = (np.mean(ya[a_range]), np.mean(yb[b_range]))
+            x_mean = (np.mean(xa), np.mean(xb))
+        eqs.append({
+            'a': a, 'b': b, 'type': stitch_type, 'p_rhs': p_rhs, 'q_rhs': q_rhs,
+            'ax1': (np.mean(za.Ax1Err[a_idx]), np.mean(zb.Ax1Err[b_idx])),
+            'ax2': (np.mean(za.Ax2Err[a_idx]), np.mean(zb.Ax2Err[b_idx])),
+            'y': y_mean,
+            'x': x_mean,
+        })
+    if n > 1 and not eqs:
+        raise ValueError('Global stitch: no overlapping zones')
+
+    # Incidence matrix (one row per seam: +1 on b, -1 on a); zone 0 is the gauge
+    m = len(eqs)
+    seam_rows = np.repeat(np.arange(m), 2)
+    seam_cols = np.array([[e['a'], e['b']] for e in eqs], dtype=int).ravel()
+    D = sp.csr_matrix((np.tile([-1.0, 1.0], m), (seam_rows, seam_cols)), shape=(m, n))[:, 1:]
+    solution = {k: np.zeros(n) for k in ('p', 'q', 'c1', 'c2')}
+    if n == 1:
+        return solution
+    L = (D.T @ D).tocsc()
+    try:
+        lu = splu(L)
+    except RuntimeError:
+        raise ValueError('Global stitch: zone layout is not connected through overlaps')
+
+    def solve(rhs):
+        x = np.zeros(n)
+        x[1:] = lu.solve(D.T @ rhs)
+        return x
+
+    p = solve(np.array([e['p_rhs'] for e in eqs]))
+    q_rhs = [e['q_rhs'] if e['type'] == 'row' else y_meas_dir * (p[e['b']] - p[e['a']]) for e in eqs]
+    q = solve(np.array(q_rhs))
+    c1_rhs = [(e['ax1'][0] + p[e['a']] * e['y'][0]) - (e['ax1'][1] + p[e['b']] * e['y'][1]) for e in eqs]
+    c2_rhs = [(e['ax2'][0] + q[e['a']] * e['x'][0]) - (e['ax2'][1] + q[e['b']] * e['x'][1]) for e in eqs]
+    c1 = solve(np.array(c1_rhs))
+    c2 = solve(np.array(c2_rhs))
+
+    res1 = D @ c1[1:] - np.array(c1_rhs)
+    res2 = D @ c2[1:] - np.array(c2_rhs)
+    print(f'Global stitch: {n} zones, {m} seam(s); offset residual RMS Ax1={np.sqrt(np.mean(res1**2)):.4f}, '
+          f'Ax2={np.sqrt(np.mean(res2**2)):.4f} um')
+    solution.update(p=p, q=q, c1=c1, c2=c2)
+    return solution
+
+
+def apply_global_corrections(zones, solution):
+    """Apply solve_global_stitch corrections to the zones' error planes in place."""
+    for z, zone in enumerate(zones):
+        zone.Ax1Err += (solution['p'][z] * zone.y + solution['c1'][z])[:, None]
+        zone.Ax2Err += (solution['q'][z] * zone.x + solution['c2'][z])[None, :]
+    return zones
+
+
 # ----------------------
 # Output file writers
 # ----------------------
 
+# Rows formatted per chunk: bounds the formatted text held at once for large grids
+WRITER_CHUNK_ROWS = 1024
+
+
+def _format_rows(table, row_fmt):
+    """Format every row of a 2-D table with one %-format per row, in a single call."""
+    if not len(table):
+        return ''
+    return (row_fmt * len(table)) % tuple(table.ravel().tolist())
+
+
+def format_cal_body(Ax1cal, Ax2cal, chunk_rows=WRITER_CHUNK_ROWS):
+    """
+    Calibration table body shared by write_cal_file and write_cal_file_start2d:
+    Ax1cal/Ax2cal column pairs interleaved, tab-separated, '\n'-terminated rows.
+    Yields one string per chunk_rows rows, so the writers stream it to the file
+    (the text is several times the size of the grids it formats).
+    """
+    num_rows, num_cols = Ax1cal.shape
+    row_fmt = '\t'.join(['%.4f'] * (2 * num_cols)) + '\n'
+    for r in range(0, num_rows, chunk_rows):
+        rows = slice(r, min(r + chunk_rows, num_rows))
+        pairs = np.empty((rows.stop - rows.start, 2 * num_cols))
+        pairs[:, 0::2] = Ax1cal[rows]
+        pairs[:, 1::2] = Ax2cal[rows]
+        yield _format_rows(pairs, row_fmt)
+
+
 def write_cal_file(filename, Ax1cal, Ax2cal, grid_system, setup):
     pos_unit = 'METRIC' if setup.get('UserUnit', 'METRIC').upper().startswith('METRIC') else 'ENGLISH'
     cor_unit = f"{pos_unit}/1000"
@@ -579,11 +1424,8 @@ def write_cal_file(filename, Ax1cal, Ax2cal, grid_system, setup):
         f.write(f":START2D {ax2_num} {ax1_num} {out_axis3} {out_ax3_value} {dx:.3f} {dy:.3f} {num_cols}\n")
         f.write(f":START2D POSUNIT={pos_unit} CORUNIT={cor_unit} OFFSETROW = {offset_row:.3f} OFFSETCOL = {offset_col:.3f}\n")
         f.write("\n")
-        for i in range(num_rows):
-            line_parts = []
-            for j in range(num_cols):
-                line_parts.append(f"{Ax1cal[i, j]:.4f}\t{Ax2cal[i, j]:.4f}")
-            f.write("\t".join(line_parts) + "\n")
+        for chunk in format_cal_body(Ax1cal, Ax2cal):
+            f.write(chunk)
         f.write("\n:END\n")
 
 
@@ -605,8 +1447,8 @@ def write_cal_file_start2d(filename, Ax1cal, Ax2cal, grid_system, setup):
     ax2_samp = dy
 
     # Compute origin-based offsets (include surrounding-zero border like MATLAB)
-    X = np.array(grid_system['X'])
-    Y = np.array(grid_system['Y'])
+    X = grid_system['X']
+    Y = grid_system['Y']
     try:
         origin_x = float(X[0, 0])
         origin_y = float(Y[0, 0])
@@ -634,16 +1476,15 @@ def write_cal_file_start2d(filename, Ax1cal, Ax2cal, grid_system, setup):
         # Blank line per MATLAB
         f.write("\r\n")
         # Data rows: tab-separated pairs, no trailing tab
-        for i in range(num_rows):
-            tokens = []
-            for j in range(num_cols):
-                tokens.append(f"{Ax1cal[i, j]:.4f}")
-                tokens.append(f"{Ax2cal[i, j]:.4f}")
-            f.write("\t".join(tokens) + "\r\n")
+        for chunk in format_cal_body(Ax1cal, Ax2cal):
+            f.write(chunk.replace('\n', '\r\n'))
         f.write(":END\r\n")
 
 
-def write_accuracy_file(filename, X, Y, Ax1Err, Ax2Err, VectorErr, valid_mask, grid_system, setup):
+def write_accuracy_file(filename, X, Y, Ax1Err, Ax2Err, VectorErr, valid_mask, grid_system, setup,
+                        chunk_rows=WRITER_CHUNK_ROWS):
+    avgCount = grid_system['avgCount']
+    row_fmt = '%.6f\t%.6f\t%.6f\t%.6f\t%.6f\t%.0f\n'
     with open(filename, 'w', encoding='utf-8', newline='\n') as f:
         f.write('% Multi-Zone 2D Accuracy Calibration Results\n')
         f.write(f"% System: {grid_system['model']} (S/N: {grid_system['SN']})\n")
@@ -651,10 +1492,13 @@ def write_accuracy_file(filename, X, Y, Ax1Err, Ax2Err, VectorErr, valid_mask, g
         f.write(f"% Grid size: {X.shape[0]} x {X.shape[1]} points\n")
         f.write(f"% Units: {grid_system['UserUnit']}\n")
         f.write('% Ax1TestLoc Ax2TestLoc Ax1Err Ax2Err VectorErr AvgCount\n')
-        for i in range(X.shape[0]):
-            for j in range(X.shape[1]):
-                if valid_mask[i, j]:
-                    f.write(f'{X[i,j]:.6f}\t{Y[i,j]:.6f}\t{Ax1Err[i,j]:.6f}\t{Ax2Err[i,j]:.6f}\t{VectorErr[i,j]:.6f}\t{grid_system["avgCount"][i,j]:.0f}\n')
+        # Valid points in row-major order, formatted a block of grid rows at a time
+        for r in range(0, X.shape[0], chunk_rows):
+            rows = slice(r, min(r + chunk_rows, X.shape[0]))
+            valid = np.asarray(valid_mask[rows])
+            table = np.column_stack([np.asarray(a[rows])[valid]
+                                     for a in (X, Y, Ax1Err, Ax2Err, VectorErr, avgCount)])
+            f.write(_format_rows(table, row_fmt))
 
 
 # ----------------------
@@ -665,6 +1509,7 @@ def save_plots(plot_path, X, Y, Ax1Err, Ax2Err, VectorErr):
     if not HAS_MPL:
         print('Matplotlib not available; skipping plot generation.')
         return
+    import matplotlib.pyplot as plt
     fig, axes = plt.subplots(1, 3, figsize=(18, 5), constrained_layout=True)
     extent = [np.min(X), np.max(X), np.min(Y), np.max(Y)]
 
@@ -690,55 +1535,773 @@ def save_plots(plot_path, X, Y, Ax1Err, Ax2Err, VectorErr):
     print(f'Plot saved: {plot_path}')
 
 
+# ---------------------------------
+# Full-grid accumulation / finalize
+# ---------------------------------
+
+FINALIZE_TILE_ROWS = 256
+
+
+def _new_grid(shape, memmap_dir=None, name=None, dtype=np.float64):
+    """Zero-filled full-travel grid: in RAM, or an .npy-backed np.memmap in memmap_dir."""
+    if memmap_dir is None:
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(os.path.join(memmap_dir, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape)
+
+
+def _remove_grid_file(path):
+    """
+    Remove an out-of-core grid file once its memmaps are dropped. Windows refuses
+    while a mapping is still open anywhere; the file is then left for the removal
+    of its run directory (see _remove_run_dir).
+    """
+    try:
+        os.remove(path)
+    except PermissionError:
+        pass
+
+
+def _remove_run_dir(path):
+    """
+    Delete an out-of-core run directory. If files in it are still mapped (Windows
+    only; POSIX unlinks open files), retry at interpreter exit instead.
+    """
+    import atexit
+    try:
+        shutil.rmtree(path)
+    except OSError:
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+
+
+def zone_slot(zone, minX, minY, incAx1, incAx2):
+    """(row slice, column slice) of a zone inside the full grid."""
+    start_ax1 = int(round((zone.x[0] - minX) / incAx1))
+    start_ax2 = int(round((zone.y[0] - minY) / incAx2))
+    h, w = zone.shape
+    return slice(start_ax2, start_ax2 + h), slice(start_ax1, start_ax1 + w)
+
+
+def accumulate_zone(acc, zone, minX, minY, incAx1, incAx2, remove=False):
+    """
+    Add one corrected zone into the accumulation grids (X, Y, Ax1Err, Ax2Err sums and
+    avgCount); remove=True takes a previously added zone back out.
+    """
+    r_ax2, r_ax1 = zone_slot(zone, minX, minY, incAx1, incAx2)
+    if remove:
+        acc['X'][r_ax2, r_ax1] -= zone.X
+        acc['Y'][r_ax2, r_ax1] -= zone.Y
+        acc['Ax1Err'][r_ax2, r_ax1] -= zone.Ax1Err
+        acc['Ax2Err'][r_ax2, r_ax1] -= zone.Ax2Err
+        acc['avgCount'][r_ax2, r_ax1] -= 1.0
+        return
+    acc['X'][r_ax2, r_ax1] += zone.X
+    acc['Y'][r_ax2, r_ax1] += zone.Y
+    acc['Ax1Err'][r_ax2, r_ax1] += zone.Ax1Err
+    acc['Ax2Err'][r_ax2, r_ax1] += zone.Ax2Err
+    acc['avgCount'][r_ax2, r_ax1] += 1.0
+
+
+def _spill_zone(zone, spill_dir, zone_idx):
+    """
+    Write a stitched zone's error planes to spill_dir and return a Zone that reads
+    them back through np.memmap (meta is dropped).
+    """
+    planes = []
+    for name in ('Ax1Err', 'Ax2Err'):
+        path = os.path.join(spill_dir, f'zone{zone_idx}_{name}.npy')
+        np.save(path, getattr(zone, name))
+        planes.append(np.load(path, mmap_mode='r'))
+    return Zone(zone.x, zone.y, *planes)
+
+
+def finalize_grid(acc, ax1_sign, ax2_sign, y_meas_dir=-1, memmap_dir=None, tile_rows=None, before_slopes=None):
+    """
+    Average the accumulated zones, remove global slopes (match MATLAB step4_calculate_slopes
+    exactly), zero-reference at the origin and build the padded calibration tables.
+
+    The grid is processed in tiles of tile_rows rows (default: one tile), so memmap-backed
+    grids are streamed instead of loaded. Row means are exact per tile and column sums are
+    accumulated row by row like np.mean(axis=0), so the slope fits do not depend on the
+    tiling; with a single tile every result is bit-identical to the in-memory computation.
+    before_slopes(X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg) is called after averaging.
+    """
+    avgCount = acc['avgCount']
+    n_rows, n_cols = avgCount.shape
+    tile_rows = tile_rows or n_rows
+    tiles = [slice(r, min(r + tile_rows, n_rows)) for r in range(0, n_rows, tile_rows)]
+
+    avg = {name: _new_grid(avgCount.shape, memmap_dir, f'{name}_avg') for name in ('X', 'Y', 'Ax1Err', 'Ax2Err')}
+    valid_mask = _new_grid(avgCount.shape, memmap_dir, 'valid_mask', dtype=bool)
+
+    # Pass 1: average overlapped regions, collect the straightness means
+    # Ax1 straightness: average error in Ax1 direction vs Ax2 position (mean across each row)
+    # Ax2 straightness: average error in Ax2 direction vs Ax1 position (mean down each column)
+    Ax1_mean = np.empty(n_rows)
+    Ax2_sum = np.zeros(n_cols)
+    y_col = np.empty(n_rows)
+    col_valid = np.zeros(n_cols, dtype=bool)
+    row_valid = np.empty(n_rows, dtype=bool)
+    for t in tiles:
+        count = np.asarray(avgCount[t])
+        valid = count > 0
+        valid_mask[t] = valid
+        for name, grid in avg.items():
+            tile = np.zeros(count.shape)
+            tile[valid] = np.asarray(acc[name][t])[valid] / count[valid]
+            grid[t] = tile
+            if name == 'Ax1Err':
+                Ax1_mean[t] = np.mean(tile, axis=1)
+            elif name == 'Ax2Err':
+                for row in tile:
+                    Ax2_sum += row
+            elif name == 'Y':
+                y_col[t] = tile[:, 0]
+            elif name == 'X' and t.start == 0:
+                x_row = tile[0, :].copy()
+        col_valid |= np.any(valid, axis=0)
+        row_valid[t] = np.any(valid, axis=1)
+    Ax2_mean = Ax2_sum / n_rows
+
+    if before_slopes is not None:
+        before_slopes(avg['X'], avg['Y'], avg['Ax1Err'], avg['Ax2Err'])
+
+    # Fit linear slopes to the mean straightness errors (same as MATLAB)
+    # Ax1Coef: slope of Ax1 error vs Ax2 position (units: microns/mm)
+    Ax1Coef = regression.polyfit1(y_col, Ax1_mean)
+    # Ax2Coef: slope of Ax2 error vs Ax1 position (units: microns/mm)
+    x_basis = regression.basis(x_row)
+    Ax2Coef = x_basis.fit(Ax2_mean)
+    print(f'Debug: Global slope coefficients - Ax1: {Ax1Coef}, Ax2: {Ax2Coef}')
+    Ax1Line = regression.polyval1(Ax1Coef, y_col)
+    Ax2Line = x_basis.evaluate(y_meas_dir * Ax1Coef)
+    print(f'Debug: Slope lines at origin - Ax1Line[0]: {Ax1Line[0]:.6f}, Ax2Line[0]: {Ax2Line[0]:.6f}')
+
+    orthog = Ax1Coef[0] - y_meas_dir * Ax2Coef[0]
+    orthog_arcsec = np.arctan(orthog/1000) * 180/np.pi * 3600
+
+    # Zero-reference at origin if valid (origin value after slope removal)
+    zero_ref = bool(valid_mask[0, 0])
+    if zero_ref:
+        ax1_offset = avg['Ax1Err'][0, 0] - Ax1Line[0]
+        ax2_offset = avg['Ax2Err'][0, 0] - Ax2Line[0]
+        print(f'Debug: Zero-referencing offsets - Ax1: {ax1_offset:.6f}, Ax2: {ax2_offset:.6f}')
+
+    # Pass 2: remove slopes, zero-reference, vector error, stats and calibration tables
+    VectorErr = _new_grid(avgCount.shape, memmap_dir, 'VectorErr')
+    Ax1cal = _new_grid((n_rows + 2, n_cols + 2), memmap_dir, 'Ax1cal')
+    Ax2cal = _new_grid((n_rows + 2, n_cols + 2), memmap_dir, 'Ax2cal')
+    stats_acc = {name: [np.inf, -np.inf, 0.0] for name in ('Ax1', 'Ax2', 'Vector')}
+    num_valid = 0
+    for t in tiles:
+        ax1 = np.array(avg['Ax1Err'][t])
+        ax2 = np.array(avg['Ax2Err'][t])
+        ax1[:, col_valid] -= Ax1Line[t][:, None]
+        ax2[row_valid[t], :] -= Ax2Line[None, :]
+        if zero_ref:
+            ax1 = ax1 - ax1_offset
+            ax2 = ax2 - ax2_offset
+        vec = np.sqrt(ax1**2 + ax2**2)
+        avg['Ax1Err'][t] = ax1
+        avg['Ax2Err'][t] = ax2
+        VectorErr[t] = vec
+
+        valid = np.asarray(valid_mask[t])
+        num_valid += int(np.sum(valid))
+        for name, values in (('Ax1', ax1[valid]), ('Ax2', ax2[valid]), ('Vector', vec[valid])):
+            if values.size:
+                s = stats_acc[name]
+                s[0] = min(s[0], np.min(values))
+                s[1] = max(s[1], np.max(values))
+                s[2] += np.sum(values**2)
+
+        cal_rows = slice(t.start + 1, t.stop + 1)
+        Ax1cal[cal_rows, 1:-1] = -ax1_sign * np.round(ax1 * 10000) / 10000
+        Ax2cal[cal_rows, 1:-1] = -ax2_sign * np.round(ax2 * 10000) / 10000
+
+    if num_valid == 0:
+        raise ValueError('No valid grid points after stitching')
+    stats = {'orthogonality_arcsec': orthog_arcsec}
+    for name in ('Ax1', 'Ax2', 'Vector'):
+        lo, hi, sum_sq = stats_acc[name]
+        stats[f'pk{name}'] = float(hi - lo)
+    for name in ('Ax1', 'Ax2', 'Vector'):
+        stats[f'rms{name}'] = float(np.sqrt(stats_acc[name][2] / num_valid))
+
+    return {
+        'X': avg['X'],
+        'Y': avg['Y'],
+        'Ax1Err': avg['Ax1Err'],
+        'Ax2Err': avg['Ax2Err'],
+        'VectorErr': VectorErr,
+        'valid_mask': valid_mask,
+        'Ax1cal': Ax1cal,
+        'Ax2cal': Ax2cal,
+        'Ax1Coef': Ax1Coef,
+        'Ax2Coef': Ax2Coef,
+        'stats': stats,
+    }
+
+
+# ----------------------
+# Run artifacts
+# ----------------------
+
+MANIFEST_FORMAT_VERSION = 1
+
+
+def _current_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import: os.umask() can only be queried by setting it, which would race
+# with other threads creating files
+_UMASK = _current_umask()
+
+
+class ArtifactManager:
+    """
+    Where one run's output files go, and a record of them.
+
+    Every artifact is written to a temp file next to its final path and renamed into
+    place with os.replace, so readers never see a partial file and an interrupted run
+    leaves no truncated outputs. Artifacts and run directories get the usual umask
+    modes (0666/0777 & ~umask), not mkstemp's private 0600/0700. Relative names
+    resolve against run_dir.
+    ArtifactManager.create(root) makes a fresh per-run directory under root, so any
+    number of calibrations can share a host (or a working directory) without
+    overwriting each other. Debug artifacts (the .mat dumps) are only written when
+    debug=True. write_manifest() records every artifact with its size and sha256.
+    """
+
+    def __init__(self, run_dir='.', debug=False):
+        self.run_dir = run_dir
+        self.debug = debug
+        self.artifacts = []
+
+    @classmethod
+    def create(cls, root, debug=False):
+        os.makedirs(root, exist_ok=True)
+        run_dir = tempfile.mkdtemp(prefix=datetime.now().strftime('run_%Y%m%d_%H%M%S_'), dir=root)
+        os.chmod(run_dir, 0o777 & ~_UMASK)
+        return cls(run_dir, debug=debug)
+
+    def path(self, name):
+        return os.path.join(self.run_dir, name)
+
+    def write(self, name, kind, write_fn):
+        """
+        Produce artifact name by calling write_fn(tmp_path), then rename it into place.
+        The temp name keeps the extension, for writers that infer the format from it.
+        Returns the final path.
+        """
+        final = self.path(name)
+        directory = os.path.dirname(final) or '.'
+        os.makedirs(directory, exist_ok=True)
+        stem, ext = os.path.splitext(os.path.basename(final))
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{stem}.', suffix=f'.tmp{ext}', dir=directory)
+        os.close(fd)
+        try:
+            write_fn(tmp_path)
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, final)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.artifacts.append({'name': name, 'kind': kind, 'path': os.path.abspath(final)})
+        return final
+
+    def write_debug(self, name, write_fn):
+        """write() for debug artifacts; skipped (returns None) unless debug is on."""
+        if not self.debug:
+            return None
+        return self.write(name, 'debug', write_fn)
+
+    def manifest(self, **run_info):
+        artifacts = []
+        for artifact in self.artifacts:
+            entry = dict(artifact)
+            try:
+                entry['bytes'] = os.path.getsize(artifact['path'])
+                entry['sha256'] = _file_sha256(artifact['path'])
+            except OSError:
+                entry['bytes'] = None  # removed since it was written
+                entry['sha256'] = None
+            artifacts.append(entry)
+        return {
+            'version': MANIFEST_FORMAT_VERSION,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'run_dir': os.path.abspath(self.run_dir),
+            'run': run_info,
+            'artifacts': artifacts,
+        }
+
+    def write_manifest(self, name='manifest.json', **run_info):
+        manifest = self.manifest(**run_info)
+
+        def dump(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+        return self.write(name, 'manifest', dump)
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 # ----------------------
 # End-to-end pipeline
 # ----------------------
 
-def process_single_zone(zone_file):
-    """Run complete single-zone pipeline and return dicts; for stitching preserve absolute reference."""
-    config = step1_parse_header(zone_file)
-    data_raw = step2_load_data(zone_file, config)
-    grid_data = step3_create_grid(data_raw)
+META_POLICIES = ('none', 'summary', 'full')
+# Scalar per-zone results kept in meta['stats'] (keep_meta='summary')
+ZONE_STATS = ('pkAx1', 'pkAx2', 'maxVectorErr', 'rmsAx1', 'rmsAx2', 'rmsVector', 'Ax1amplitude', 'Ax2amplitude')
+
+
+def zone_meta(config, grid_data, slope_data, processed_data, keep_meta='summary'):
+    """
+    The meta dict a zone carries through the run. 'full' keeps grid_data, slope_data
+    and processed_data (several full grids per zone); 'summary' keeps the header
+    config and meta['stats'], the zone's scalar results; 'none' only the config,
+    which the writers need from the first zone.
+    """
+    if keep_meta not in META_POLICIES:
+        raise ValueError(f'Unknown keep_meta {keep_meta!r}; expected one of {META_POLICIES}')
+    if keep_meta == 'full':
+        return {'config': config, 'grid_data': grid_data, 'slope_data': slope_data,
+                'processed_data': processed_data}
+    meta = {'config': config}
+    if keep_meta == 'summary':
+        meta['stats'] = {name: float(processed_data[name]) for name in ZONE_STATS}
+        meta['stats']['orthog_arcsec'] = float(slope_data['orthog'])
+        meta['stats']['holes'] = int(np.sum(grid_data['HoleMask']))
+        meta['stats']['filled'] = int(np.sum(grid_data['FilledMask']))
+    return meta
+
+
+def process_single_zone(zone_file, cache=None, fill_method='structured', profile=False, keep_meta='summary'):
+    """
+    Run complete single-zone pipeline on any zone source (see read_zone_source) and return
+    (Zone, meta); for stitching preserve absolute reference.
+    keep_meta chooses what meta retains (see zone_meta); by default no grids.
+    With profile=True the per-stage timings are returned in meta['profile'] (a list of
+    StageProfiler records), so they survive the trip back from a worker process.
+    """
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    # Header and numeric table are parsed in a single pass (or come from the cache)
+    with profiler.stage('read'):
+        if cache is not None and _is_path(zone_file):
+            config, s = cache.read(zone_file)
+        else:
+            config, s = read_zone_source(zone_file)
+    with profiler.stage('load'):
+        data_raw = step2_load_data(zone_file, config, s=s)
+    with profiler.stage('grid'):
+        grid_data = step3_create_grid(data_raw, fill_method=fill_method)
 
     # Compute per-zone slopes
-    slope_data = step4_calculate_slopes(grid_data)
+    with profiler.stage('slopes'):
+        slope_data = step4_calculate_slopes(grid_data)
     # Use multizone-compatible step5 that preserves absolute error references
-    processed_data = step5_process_errors_multizone(grid_data, slope_data)
-
-    # For stitching, MATCH MATLAB: use per-zone processed errors with slopes removed but absolute reference preserved
-    zone = {
-        'X': processed_data['X'].copy(),
-        'Y': processed_data['Y'].copy(),
-        'Ax1Err': processed_data['Ax1Err'].copy(),
-        'Ax2Err': processed_data['Ax2Err'].copy(),
-    }
-    meta = {
-        'config': config,
-        'grid_data': grid_data,
-        'slope_data': slope_data,
-        'processed_data': processed_data,
-    }
+    with profiler.stage('step5'):
+        processed_data = step5_process_errors_multizone(grid_data, slope_data)
+
+    meta = zone_meta(config, grid_data, slope_data, processed_data, keep_meta)
+    if profile:
+        profiler.close()
+        meta['profile'] = profiler.records
+    # For stitching, MATCH MATLAB: use per-zone processed errors with slopes removed but absolute reference preserved.
+    # Stitching corrects the error planes in place, so they are copied when meta keeps processed_data;
+    # X/Y reduce to their axis vectors.
+    planes = [processed_data['Ax1Err'], processed_data['Ax2Err']]
+    if keep_meta == 'full':
+        planes = [plane.copy() for plane in planes]
+    zone = Zone(processed_data['X'][0, :].copy(), processed_data['Y'][:, 0].copy(), *planes, meta)
     return zone, meta
 
 
-def stitch_and_calibrate(zone_files, rows, cols, out_cal, out_dat, plot_path=None, user_unit_override=None, dump_cal_dir=None):
+# ----------------------------------
+# Zone handoff between processes
+# ----------------------------------
+
+ZONE_HANDOFFS = ('shared', 'pickle')
+# None is the system temp dir. Point it at a RAM-backed mount (/dev/shm) only if that
+# can hold the parsed zones of a whole run: received files stay mapped until stitched
+DEFAULT_HANDOFF_DIR = os.environ.get('STITCH2D_HANDOFF_DIR') or None
+# Smaller arrays are cheaper to pickle than to map
+HANDOFF_MIN_BYTES = 64 * 1024
+_HANDOFF_ALIGN = 64
+
+
+class _HandoffArray:
+    """Placeholder for an array that travels in the handoff file: (offset, dtype, shape)."""
+
+    __slots__ = ('offset', 'dtype', 'shape')
+
+    def __init__(self, offset, dtype, shape):
+        self.offset = offset
+        self.dtype = dtype
+        self.shape = shape
+
+    def __getstate__(self):
+        return (self.offset, self.dtype, self.shape)
+
+    def __setstate__(self, state):
+        self.offset, self.dtype, self.shape = state
+
+
+def _map_structure(obj, fn, memo):
+    """obj with every ndarray / _HandoffArray replaced by fn(it); dicts, lists, tuples and Zones are rebuilt."""
+    key = id(obj)
+    if key in memo:
+        return memo[key]
+    if isinstance(obj, (np.ndarray, _HandoffArray)):
+        out = fn(obj)
+    elif isinstance(obj, dict):
+        out = memo[key] = {}
+        out.update((k, _map_structure(v, fn, memo)) for k, v in obj.items())
+    elif isinstance(obj, Zone):
+        # Registered before its fields, so zone.meta may point back at a dict holding the zone
+        out = memo[key] = Zone(None, None, None, None)
+        for name in Zone.__slots__:
+            setattr(out, name, _map_structure(getattr(obj, name), fn, memo))
+    elif isinstance(obj, (list, tuple)):
+        out = type(obj)(_map_structure(v, fn, memo) for v in obj)
+    else:
+        out = obj
+    memo[key] = out
+    return out
+
+
+def export_zone_result(result, path, min_bytes=HANDOFF_MIN_BYTES):
+    """
+    Write the large arrays of a process_single_zone result (or any nest of dicts,
+    lists, tuples and Zones) to the handoff file path and return a small
+    descriptor: the result with those arrays replaced by placeholders. An array
+    referenced twice is written once. See receive_zone_result.
+    If the file cannot be written (e.g. the handoff directory is full) the
+    descriptor carries the result itself, which then travels pickled.
+    """
+    arrays = []
+    offsets = {}
+    size = 0
+
+    def place(arr):
+        nonlocal size
+        if arr.nbytes < min_bytes or arr.dtype.hasobject:
+            return arr
+        if id(arr) not in offsets:
+            size = -(-size // _HANDOFF_ALIGN) * _HANDOFF_ALIGN
+            offsets[id(arr)] = size
+            arrays.append((size, arr))
+            size += arr.nbytes
+        return _HandoffArray(offsets[id(arr)], arr.dtype.str, arr.shape)
+
+    skeleton = _map_structure(result, place, {})
+    if not arrays:
+        return {'path': None, 'size': 0, 'result': skeleton}
+    try:
+        with open(path, 'wb') as f:
+            for offset, arr in arrays:
+                f.seek(offset)
+                f.write(memoryview(np.ascontiguousarray(arr)).cast('B'))
+    except OSError:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return {'path': None, 'size': 0, 'result': result}
+    return {'path': path, 'size': size, 'result': skeleton}
+
+
+def receive_zone_result(descriptor):
+    """
+    Rebuild a result exported by export_zone_result. The handoff file is mapped
+    copy-on-write, so the arrays are plain writable ndarrays over the shared pages
+    (in-place stitching never touches the file). On POSIX the file is unlinked at
+    once; where a mapped file cannot be removed (Windows) it is removed when the
+    mapping is released, and ZoneHandoff.close sweeps whatever is still there.
+    """
+    import mmap
+    import weakref
+    path = descriptor['path']
+    if path is None:
+        return descriptor['result']
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), descriptor['size'], access=mmap.ACCESS_COPY)
+    try:
+        os.remove(path)
+    except PermissionError:
+        # The arrays below keep buf alive; the mapping is closed before the callback runs
+        weakref.finalize(buf, _remove_handoff_file, path)
+
+    def view(placeholder):
+        if not isinstance(placeholder, _HandoffArray):
+            return placeholder
+        dtype = np.dtype(placeholder.dtype)
+        count = int(np.prod(placeholder.shape))
+        return np.frombuffer(buf, dtype=dtype, count=count, offset=placeholder.offset).reshape(placeholder.shape)
+
+    return _map_structure(descriptor['result'], view, {})
+
+
+def _remove_handoff_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # still open elsewhere, or already swept by ZoneHandoff.close
+
+
+class ZoneHandoff:
+    """
+    Scratch directory through which pool workers hand zone results to the parent.
+
+    Pickling a (Zone, meta) result copies every grid several times over the pipe
+    (serialize, transfer, deserialize), and with keep_meta='full' meta holds the
+    grid and processed planes as well. Instead the worker writes them once to a file here (under the
+    system temp dir by default, env STITCH2D_HANDOFF_DIR) and returns a descriptor of a few hundred
+    bytes; the parent maps the file (receive_zone_result). The directory is
+    removed on close, including files of results never received.
+    """
+
+    def __init__(self, root=DEFAULT_HANDOFF_DIR):
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+        self.dir = tempfile.mkdtemp(prefix='stitch2d_handoff_', dir=root)
+        self._count = 0
+
+    def path(self):
+        """A fresh handoff file path for one result."""
+        self._count += 1
+        return os.path.join(self.dir, f'zone{self._count}.bin')
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _process_zone_handoff(zone_file, path, cache=None, fill_method='structured', profile=False, keep_meta='summary'):
+    """process_single_zone on a pool worker, returning its export_zone_result descriptor."""
+    return export_zone_result(process_single_zone(zone_file, cache=cache, fill_method=fill_method, profile=profile,
+                                                  keep_meta=keep_meta), path)
+
+
+def preprocess_zones(zone_files, jobs=1, cache=None, fill_method='structured', profile=False, handoff='shared',
+                     keep_meta='summary'):
+    """
+    Yield process_single_zone results for zone_files, in order.
+    Steps 1-5 are independent per zone, so with jobs > 1 they run in a process
+    pool; results are identical to the serial run (same code, same inputs).
+    jobs <= 0 uses one worker per CPU. handoff='shared' returns the workers' arrays
+    through mapped scratch files (ZoneHandoff), 'pickle' through the pool's pipe;
+    at most 2 * jobs zones are submitted ahead of the one being yielded.
+    keep_meta is passed to process_single_zone.
+    """
+    if handoff not in ZONE_HANDOFFS:
+        raise ValueError(f'Unknown handoff {handoff!r}; expected one of {ZONE_HANDOFFS}')
+    if jobs is not None and jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if not jobs or jobs == 1 or len(zone_files) < 2:
+        for zone_file in zone_files:
+            yield process_single_zone(zone_file, cache=cache, fill_method=fill_method, profile=profile,
+                                      keep_meta=keep_meta)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    # Open file-like objects cannot be sent to workers; read them here
+    zone_files = [z if _is_path(z) or not hasattr(z, 'read') else read_zone_source(z) for z in zone_files]
+    if handoff == 'pickle':
+        with ProcessPoolExecutor(max_workers=min(jobs, len(zone_files))) as pool:
+            yield from pool.map(partial(process_single_zone, cache=cache, fill_method=fill_method, profile=profile,
+                                        keep_meta=keep_meta), zone_files)
+        return
+    from collections import deque
+    work = partial(_process_zone_handoff, cache=cache, fill_method=fill_method, profile=profile, keep_meta=keep_meta)
+    workers = min(jobs, len(zone_files))
+    with ZoneHandoff() as shared, ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bounded window rather than pool.map, which would export every zone up front
+        pending = deque()
+        for zone_file in zone_files:
+            pending.append(pool.submit(work, zone_file, shared.path()))
+            if len(pending) > 2 * workers:
+                yield receive_zone_result(pending.popleft().result())
+        while pending:
+            yield receive_zone_result(pending.popleft().result())
+
+
+class CalibrationResult:
+    """
+    Outcome of calibrate(): stitched grids, padded calibration tables and stats, in memory.
+
+    grid_system is the dict the writers take (X, Y, Ax1Err, Ax2Err, avgCount, increments
+    and header info); the grids are also attributes. Files are only produced by the
+    write_* methods, which are what output_sinks() wires up.
+    """
+
+    def __init__(self, grid_system, VectorErr, valid_mask, Ax1cal, Ax2cal, stats, memmap_dir=None):
+        self.grid_system = grid_system
+        self.VectorErr = VectorErr
+        self.valid_mask = valid_mask
+        self.Ax1cal = Ax1cal
+        self.Ax2cal = Ax2cal
+        self.stats = stats
+        self.memmap_dir = memmap_dir  # set when the grids are np.memmap files there
+
+    @property
+    def X(self):
+        return self.grid_system['X']
+
+    @property
+    def Y(self):
+        return self.grid_system['Y']
+
+    @property
+    def Ax1Err(self):
+        return self.grid_system['Ax1Err']
+
+    @property
+    def Ax2Err(self):
+        return self.grid_system['Ax2Err']
+
+    @property
+    def avgCount(self):
+        return self.grid_system['avgCount']
+
+    def setup(self, out_cal=None, out_dat=None):
+        """Writer options, as in the multizone step1 setup dict."""
+        return {
+            'WriteCalFile': 1,
+            'OutAxis3': 0,
+            'OutAx3Value': 2,
+            'CalFile': out_cal,
+            'UserUnit': self.grid_system['UserUnit'],
+            'writeOutputFile': 1,
+            'OutFile': out_dat,
+        }
+
+    def write_cal(self, path):
+        write_cal_file(path, self.Ax1cal, self.Ax2cal, self.grid_system, self.setup(out_cal=path))
+
+    def write_cal_start2d(self, path):
+        write_cal_file_start2d(path, self.Ax1cal, self.Ax2cal, self.grid_system, self.setup(out_cal=path))
+
+    def write_accuracy(self, path):
+        write_accuracy_file(path, self.X, self.Y, self.Ax1Err, self.Ax2Err, self.VectorErr, self.valid_mask,
+                            self.grid_system, self.setup(out_dat=path))
+
+    def save_plots(self, path):
+        save_plots(path, self.X, self.Y, self.Ax1Err, self.Ax2Err, self.VectorErr)
+
+    def to_dict(self):
+        """The {'grid_system', 'stats'} dict stitch_and_calibrate returns."""
+        return {'grid_system': self.grid_system, 'stats': dict(self.stats)}
+
+    def print_summary(self):
+        stats = self.stats
+        rows, cols = self.X.shape
+        print('\n=== FINAL CALIBRATION SUMMARY ===')
+        print(f"Total zones processed: {self.grid_system['zoneCount']}")
+        print(f"Final grid size: {rows} x {cols} points")
+        num_valid = int(np.sum(self.valid_mask))
+        coverage = 100 * float(num_valid) / float(rows * cols)
+        print(f"Valid data points: {num_valid} ({coverage:.1f}% coverage)")
+        overlap_pts = int(np.sum(self.avgCount > 1))
+        print(f"Overlap points: {overlap_pts}")
+        print('Final accuracy performance:')
+        print(f"  Ax1: ±{stats['pkAx1']/2:.3f} um P-P, {stats['rmsAx1']:.3f} um RMS")
+        print(f"  Ax2: ±{stats['pkAx2']/2:.3f} um P-P, {stats['rmsAx2']:.3f} um RMS")
+        print(f"  Vector: {stats['rmsVector']:.3f} um RMS")
+        print(f"  Orthogonality: {stats['orthogonality_arcsec']:.3f} arc-seconds")
+
+
+def output_sinks(out_cal=None, out_dat=None, plot_path=None, start2d=True, artifacts=None):
+    """
+    The standard file writers as calibrate() sinks, in the order the CLI writes them:
+    .cal, accuracy .dat, legacy <out_cal stem>_start2d.cal, plot. Files go through
+    artifacts (an ArtifactManager; default: paths as given, written atomically).
+    """
+    artifacts = artifacts or ArtifactManager()
+    sinks = []
+    if out_cal:
+        def write_cal(result):
+            path = artifacts.write(out_cal, 'cal', result.write_cal)
+            print(f'Calibration file written: {path}')
+        sinks.append(('write_cal', write_cal))
+    if out_dat:
+        def write_accuracy(result):
+            path = artifacts.write(out_dat, 'accuracy', result.write_accuracy)
+            print(f'Accuracy data file written: {path}')
+        sinks.append(('write_accuracy', write_accuracy))
+    if out_cal and start2d:
+        # Also emit legacy START2D file for parity with old MATLAB script
+        legacy_cal = os.path.splitext(out_cal)[0] + '_start2d.cal'
+
+        def write_cal_start2d(result):
+            path = artifacts.write(legacy_cal, 'cal_start2d', result.write_cal_start2d)
+            print(f'Legacy START2D calibration file written: {path}')
+        sinks.append(('write_cal_start2d', write_cal_start2d))
+    if plot_path and HAS_MPL:
+        sinks.append(('plots', lambda result: artifacts.write(plot_path, 'plot', result.save_plots)))
+    elif plot_path:
+        sinks.append(('plots', lambda result: result.save_plots(plot_path)))  # prints why it is skipped
+    return sinks
+
+
+def calibrate(zones, rows, cols, user_unit_override=None, cache=None, jobs=1, fill_method='structured',
+              solver='chain', stitch_workers=1, memmap_dir=None, memmap_tile_rows=FINALIZE_TILE_ROWS,
+              profiler=None, sinks=(), dump_cal_dir=None, before_slopes=None, zone_results=None,
+              on_stitched=None, zone_handoff='shared', keep_meta='summary'):
+    """
+    Stitch rows x cols zones (row-major) and return a CalibrationResult.
+
+    zones may mix paths, file-like objects and pre-loaded (config, s) pairs or s
+    matrices (see read_zone_source). Nothing is written to disk unless asked for:
+    cache (paths only), memmap_dir and dump_cal_dir each opt in to file I/O, and
+    sinks, callables taking the result or (stage name, callable) pairs such as
+    output_sinks(), run in order once the result is complete.
+    before_slopes(X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg, avgCount) is called after
+    the zones are averaged, before global slope removal.
+    zone_results, if given, are the process_single_zone results for zones in order
+    (e.g. parsed ahead on a pool shared by several jobs); steps 1-5 are then skipped.
+    It may be a generator that blocks until each zone is available: the chain solver
+    stitches every zone as soon as it is yielded. on_stitched(zone_idx, zone) is
+    called with each stitched zone (zones are not modified after that).
+    zone_handoff is how worker processes (jobs > 1) return parsed zones (see preprocess_zones).
+    keep_meta is what each zone's meta retains for the run (see zone_meta); the
+    default keeps no per-zone grids, so memory does not grow with copies per zone.
+    """
+    zone_files = list(zones)
     if len(zone_files) != rows * cols:
         raise ValueError(f'Expected {rows*cols} zone files, got {len(zone_files)}')
+    if solver not in STITCH_SOLVERS:
+        raise ValueError(f'Unknown solver {solver!r}; expected one of {STITCH_SOLVERS}')
+    # Out-of-core mode: stitched zones are spilled and the full-travel grids are np.memmap
+    # files in a fresh run directory under memmap_dir
+    if memmap_dir is not None:
+        os.makedirs(memmap_dir, exist_ok=True)
+        memmap_dir = tempfile.mkdtemp(prefix='stitch2d_', dir=memmap_dir)
+    defer_stitch = solver == 'global' or stitch_workers > 1
+    profiler = profiler or NULL_PROFILER
 
     # Process zones in row-major order, apply stitching progressively
-    zones_corrected = []  # list of dicts with corrected zone data
-    metas = []            # parallel list of metadata
+    zones_corrected = []  # Zones with corrected error planes (each carries its meta, see keep_meta)
 
     y_meas_dir = -1
     col_master = {}
     row_master = {}
 
-    # Also track overall bounds while stitching (using corrected zone positions)
-    minX = np.inf
-    maxX = -np.inf
-    minY = np.inf
-    maxY = -np.inf
-
     # Will capture increments from the first zone
     incAx1 = None
     incAx2 = None
@@ -746,46 +2309,34 @@ def stitch_and_calibrate(zone_files, rows, cols, out_cal, out_dat, plot_path=Non
     # Capture representative system/config info from first zone
     sys_info = {}
 
+    if zone_results is None:
+        zone_results = preprocess_zones(zone_files, jobs=jobs, cache=cache, fill_method=fill_method,
+                                        profile=profiler.enabled, handoff=zone_handoff, keep_meta=keep_meta)
+    zone_results = iter(zone_results)
+
     zone_idx = 0
     for i in range(rows):
         for j in range(cols):
-            zone_file = zone_files[zone_idx]
             print('----------------------------------------')
-            print(f'Processing Zone: Row {i+1}, Col {j+1} -> {zone_file}')
-            zone_raw, meta = process_single_zone(zone_file)
+            print(f'Processing Zone: Row {i+1}, Col {j+1} -> {_source_label(zone_files[zone_idx], zone_idx)}')
+            zone_raw, meta = next(zone_results)
+            profiler.extend(meta.pop('profile', ()), zone=zone_idx)
 
             if incAx1 is None:
                 # Determine increments from first zone grid
-                incAx1 = zone_raw['X'][0, 1] - zone_raw['X'][0, 0] if zone_raw['X'].shape[1] > 1 else 1.0
-                incAx2 = zone_raw['Y'][1, 0] - zone_raw['Y'][0, 0] if zone_raw['Y'].shape[0] > 1 else 1.0
-                # System info
-                cfg = meta['config']
-                sys_info = {
-                    'SN': cfg.get('SN', ''),
-                    'Ax1Name': cfg.get('Ax1Name', ''),
-                    'Ax2Name': cfg.get('Ax2Name', ''),
-                    'Ax1Num': cfg.get('Ax1Num', 0),
-                    'Ax2Num': cfg.get('Ax2Num', 0),
-                    'Ax1Sign': cfg.get('Ax1Sign', 1),
-                    'Ax2Sign': cfg.get('Ax2Sign', 1),
-                    'UserUnit': user_unit_override if user_unit_override else cfg.get('UserUnit', 'METRIC'),
-                    'calDivisor': cfg.get('calDivisor', 1),
-                    'posUnit': cfg.get('posUnit', 'mm'),
-                    'errUnit': cfg.get('errUnit', '\\mum'),
-                    'operator': cfg.get('operator', ''),
-                    'model': cfg.get('model', ''),
-                }
-
-            if i == 0 and j == 0:
-                # First zone becomes master
-                col_master = {
-                    'X': zone_raw['X'].copy(),
-                    'Y': zone_raw['Y'].copy(),
-                    'Ax1Err': zone_raw['Ax1Err'].copy(),
-                    'Ax2Err': zone_raw['Ax2Err'].copy(),
-                }
-                row_master[(i, j)] = deepcopy(col_master)
-                slave_corrected = deepcopy(col_master)
+                incAx1 = zone_raw.x[1] - zone_raw.x[0] if len(zone_raw.x) > 1 else 1.0
+                incAx2 = zone_raw.y[1] - zone_raw.y[0] if len(zone_raw.y) > 1 else 1.0
+                sys_info = system_info(meta['config'], user_unit_override)
+
+            if defer_stitch:
+                # Stitched together once every zone is loaded
+                slave_corrected = zone_raw
+            elif i == 0 and j == 0:
+                # First zone becomes master (zones are never modified once stitched,
+                # so masters can share the corrected arrays)
+                slave_corrected = zone_raw
+                col_master = slave_corrected
+                row_master[(i, j)] = slave_corrected
             else:
                 # Determine master and stitch type
                 if j > 0:
@@ -794,225 +2345,302 @@ def stitch_and_calibrate(zone_files, rows, cols, out_cal, out_dat, plot_path=Non
                 else:
                     master = row_master[(i-1, j)]
                     stitch_type = 'row'
-                slave_corrected = apply_stitching_corrections(master, zone_raw, stitch_type, y_meas_dir, diag=bool(dump_cal_dir), dump_dir=dump_cal_dir)
-                # Update masters
-                col_master = deepcopy(slave_corrected)
+                with profiler.stage('stitch', zone=zone_idx):
+                    slave_corrected = apply_stitching_corrections(master, zone_raw, stitch_type, y_meas_dir,
+                                                                  diag=bool(dump_cal_dir), dump_dir=dump_cal_dir,
+                                                                  inplace=True)
+                # Update masters (only the previous row's first zone is ever needed again)
+                col_master = slave_corrected
                 if (i > 0) and (j == 0):
-                    row_master[(i, j)] = deepcopy(slave_corrected)
-
-            # Track bounds
-            minX = min(minX, float(np.min(slave_corrected['X'])))
-            maxX = max(maxX, float(np.max(slave_corrected['X'])))
-            minY = min(minY, float(np.min(slave_corrected['Y'])))
-            maxY = max(maxY, float(np.max(slave_corrected['Y'])))
+                    row_master = {(i, j): slave_corrected}
 
+            if on_stitched is not None and not defer_stitch:
+                on_stitched(zone_idx, slave_corrected)
+            if memmap_dir is not None and not defer_stitch:
+                with profiler.stage('spill', zone=zone_idx):
+                    slave_corrected = _spill_zone(slave_corrected, memmap_dir, zone_idx)
             zones_corrected.append(slave_corrected)
-            metas.append(meta)
             zone_idx += 1
 
-    # Allocate full grid based on bounds and increments
-    num_points_ax1 = int(round((maxX - minX) / incAx1) + 1)
-    num_points_ax2 = int(round((maxY - minY) / incAx2) + 1)
-    print(f'Full grid dimensions: {num_points_ax2} x {num_points_ax1} points')
-
-    X_full = np.zeros((num_points_ax2, num_points_ax1))
-    Y_full = np.zeros((num_points_ax2, num_points_ax1))
-    Ax1Err_full = np.zeros((num_points_ax2, num_points_ax1))
-    Ax2Err_full = np.zeros((num_points_ax2, num_points_ax1))
-    avgCount = np.zeros((num_points_ax2, num_points_ax1))
-
-    # Accumulate corrected zones into full grid
-    for z in zones_corrected:
-        start_ax1 = int(round((z['X'][0, 0] - minX) / incAx1))
-        start_ax2 = int(round((z['Y'][0, 0] - minY) / incAx2))
-        h, w = z['X'].shape
-        r_ax1 = slice(start_ax1, start_ax1 + w)
-        r_ax2 = slice(start_ax2, start_ax2 + h)
-        X_full[r_ax2, r_ax1] += z['X']
-        Y_full[r_ax2, r_ax1] += z['Y']
-        Ax1Err_full[r_ax2, r_ax1] += z['Ax1Err']
-        Ax2Err_full[r_ax2, r_ax1] += z['Ax2Err']
-        avgCount[r_ax2, r_ax1] += 1.0
-
-    valid_mask = avgCount > 0
-
-    # Average overlapped regions
-    X_avg = np.zeros_like(X_full)
-    Y_avg = np.zeros_like(Y_full)
-    Ax1Err_avg = np.zeros_like(Ax1Err_full)
-    Ax2Err_avg = np.zeros_like(Ax2Err_full)
-    X_avg[valid_mask] = X_full[valid_mask] / avgCount[valid_mask]
-    Y_avg[valid_mask] = Y_full[valid_mask] / avgCount[valid_mask]
-    Ax1Err_avg[valid_mask] = Ax1Err_full[valid_mask] / avgCount[valid_mask]
-    Ax2Err_avg[valid_mask] = Ax2Err_full[valid_mask] / avgCount[valid_mask]
-
-    # Save stitched data BEFORE slope removal for debugging (like MATLAB does)
-    try:
-        sio.savemat('python_stitched_before_slopes.mat', {
-            'X': X_avg,
-            'Y': Y_avg, 
-            'Ax1Err_before_slopes': Ax1Err_avg,
-            'Ax2Err_before_slopes': Ax2Err_avg,
-            'avgCount': avgCount
-        })
-        print('Pre-slope-removal data saved for debugging: python_stitched_before_slopes.mat')
-    except Exception as e:
-        print(f'Warning: could not save pre-slope data ({e})')
-
-    # Remove global slopes, compute orthogonality (match MATLAB step4_calculate_slopes exactly)
-    # Calculate mean straightness errors along each axis (same as MATLAB)
-    # Ax1 straightness: average error in Ax1 direction vs Ax2 position
-    Ax1_mean = np.mean(Ax1Err_avg, axis=1)  # Average across rows (Ax1 direction)
-    Ax2_mean = np.mean(Ax2Err_avg, axis=0)  # Average across columns (Ax2 direction)
-
-    # Fit linear slopes to the mean straightness errors (same as MATLAB)
-    # Ax1Coef: slope of Ax1 error vs Ax2 position (units: microns/mm)
-    Ax1Coef = np.polyfit(Y_avg[:, 0], Ax1_mean, 1)
-    # Ax2Coef: slope of Ax2 error vs Ax1 position (units: microns/mm)
-    Ax2Coef = np.polyfit(X_avg[0, :], Ax2_mean, 1)
-    print(f'Debug: Global slope coefficients - Ax1: {Ax1Coef}, Ax2: {Ax2Coef}')
-    y_meas_dir = -1
-    Ax1Line = np.polyval(Ax1Coef, Y_avg[:, 0])
-    Ax2Line = np.polyval(y_meas_dir * Ax1Coef, X_avg[0, :])
-    print(f'Debug: Slope lines at origin - Ax1Line[0]: {Ax1Line[0]:.6f}, Ax2Line[0]: {Ax2Line[0]:.6f}')
-
-    for i in range(num_points_ax1):
-        if np.any(valid_mask[:, i]):
-            Ax1Err_avg[:, i] -= Ax1Line
-    for i in range(num_points_ax2):
-        if np.any(valid_mask[i, :]):
-            Ax2Err_avg[i, :] -= Ax2Line
-
-    orthog = Ax1Coef[0] - y_meas_dir * Ax2Coef[0]
-    orthog_arcsec = np.arctan(orthog/1000) * 180/np.pi * 3600
-
-    # Zero-reference at origin if valid
-    if valid_mask[0, 0]:
-        ax1_offset = Ax1Err_avg[0, 0]
-        ax2_offset = Ax2Err_avg[0, 0]
-        print(f'Debug: Zero-referencing offsets - Ax1: {ax1_offset:.6f}, Ax2: {ax2_offset:.6f}')
-        Ax1Err_avg = Ax1Err_avg - ax1_offset
-        Ax2Err_avg = Ax2Err_avg - ax2_offset
-
-    VectorErr = np.sqrt(Ax1Err_avg**2 + Ax2Err_avg**2)
+    if solver == 'global':
+        print('----------------------------------------')
+        with profiler.stage('stitch_global'):
+            apply_global_corrections(zones_corrected, solve_global_stitch(zones_corrected, rows, cols, y_meas_dir))
+    elif stitch_workers > 1:
+        print('----------------------------------------')
+        print(f'Stitching {rows} row(s) with {stitch_workers} worker threads')
+        with profiler.stage('stitch_wavefront'):
+            stitch_wavefront(zones_corrected, rows, cols, y_meas_dir, stitch_workers,
+                             diag=bool(dump_cal_dir), dump_dir=dump_cal_dir)
+    if on_stitched is not None and defer_stitch:
+        for k, z in enumerate(zones_corrected):
+            on_stitched(k, z)
+    if memmap_dir is not None and defer_stitch:
+        with profiler.stage('spill'):
+            zones_corrected = [_spill_zone(z, memmap_dir, k) for k, z in enumerate(zones_corrected)]
+
+    # Drop the loop's references to the last zones: assemble_calibration removes each
+    # spill file as soon as its zone is accumulated
+    zone_raw = slave_corrected = col_master = row_master = None
+    return assemble_calibration(zones_corrected, sys_info, incAx1, incAx2, y_meas_dir=y_meas_dir,
+                                memmap_dir=memmap_dir, memmap_tile_rows=memmap_tile_rows, profiler=profiler,
+                                sinks=sinks, before_slopes=before_slopes)
+
+
+def system_info(config, user_unit_override=None):
+    """Header fields of the first zone that the writers need (grid_system entries)."""
+    return {
+        'SN': config.get('SN', ''),
+        'Ax1Name': config.get('Ax1Name', ''),
+        'Ax2Name': config.get('Ax2Name', ''),
+        'Ax1Num': config.get('Ax1Num', 0),
+        'Ax2Num': config.get('Ax2Num', 0),
+        'Ax1Sign': config.get('Ax1Sign', 1),
+        'Ax2Sign': config.get('Ax2Sign', 1),
+        'UserUnit': user_unit_override if user_unit_override else config.get('UserUnit', 'METRIC'),
+        'calDivisor': config.get('calDivisor', 1),
+        'posUnit': config.get('posUnit', 'mm'),
+        'errUnit': config.get('errUnit', '\\mum'),
+        'operator': config.get('operator', ''),
+        'model': config.get('model', ''),
+    }
 
-    valid_ax1_errors = Ax1Err_avg[valid_mask]
-    valid_ax2_errors = Ax2Err_avg[valid_mask]
-    valid_vector_errors = VectorErr[valid_mask]
 
-    pkAx1 = float(np.max(valid_ax1_errors) - np.min(valid_ax1_errors))
-    pkAx2 = float(np.max(valid_ax2_errors) - np.min(valid_ax2_errors))
-    pkVector = float(np.max(valid_vector_errors) - np.min(valid_vector_errors))
+def assemble_calibration(zones_corrected, sys_info, incAx1, incAx2, y_meas_dir=-1, memmap_dir=None,
+                         memmap_tile_rows=FINALIZE_TILE_ROWS, profiler=None, sinks=(), before_slopes=None):
+    """
+    Second half of calibrate(): accumulate stitched zones onto the full-travel grid,
+    finalize it, run sinks and return the CalibrationResult. zones_corrected is
+    emptied as the zones are added. Any subset of the zones can be assembled (e.g. a
+    preview of a partially measured layout); zoneCount is len(zones_corrected).
+    """
+    profiler = profiler or NULL_PROFILER
+    minX, minY, grid_shape = grid_extent(zones_corrected, incAx1, incAx2)
+    zone_count = len(zones_corrected)
+    print(f'Full grid dimensions: {grid_shape[0]} x {grid_shape[1]} points')
+    acc = {name: _new_grid(grid_shape, memmap_dir, f'{name}_full') for name in ('X', 'Y', 'Ax1Err', 'Ax2Err', 'avgCount')}
+
+    # Accumulate corrected zones into full grid, releasing each zone once it is added
+    # (indexed, not enumerate(): its reused result tuple would keep the last zone alive)
+    for k in range(zone_count):
+        z, zones_corrected[k] = zones_corrected[k], None
+        with profiler.stage('accumulate', zone=k):
+            accumulate_zone(acc, z, minX, minY, incAx1, incAx2)
+        del z
+        if memmap_dir is not None:
+            for name in ('Ax1Err', 'Ax2Err'):
+                _remove_grid_file(os.path.join(memmap_dir, f'zone{k}_{name}.npy'))
+    del zones_corrected
+    return finish_calibration(acc, sys_info, incAx1, incAx2, zone_count, y_meas_dir=y_meas_dir,
+                              memmap_dir=memmap_dir, memmap_tile_rows=memmap_tile_rows, profiler=profiler,
+                              sinks=sinks, before_slopes=before_slopes)
+
+
+def grid_extent(zones, incAx1, incAx2):
+    """(minX, minY, (rows, cols)) of the full-travel grid covering zones."""
+    minX = min(float(np.min(z.x)) for z in zones)
+    maxX = max(float(np.max(z.x)) for z in zones)
+    minY = min(float(np.min(z.y)) for z in zones)
+    maxY = max(float(np.max(z.y)) for z in zones)
+    num_points_ax1 = int(round((maxX - minX) / incAx1) + 1)
+    num_points_ax2 = int(round((maxY - minY) / incAx2) + 1)
+    return minX, minY, (num_points_ax2, num_points_ax1)
 
-    rmsAx1 = float(np.sqrt(np.mean(valid_ax1_errors**2)))
-    rmsAx2 = float(np.sqrt(np.mean(valid_ax2_errors**2)))
-    rmsVector = float(np.sqrt(np.mean(valid_vector_errors**2)))
 
-    # Build grid_system/setup for writers
+def finish_calibration(acc, sys_info, incAx1, incAx2, zone_count, y_meas_dir=-1, memmap_dir=None,
+                       memmap_tile_rows=FINALIZE_TILE_ROWS, profiler=None, sinks=(), before_slopes=None):
+    """
+    Finalize accumulation grids (X, Y, Ax1Err, Ax2Err sums and avgCount, see
+    accumulate_zone) into a CalibrationResult and run sinks. acc is left unchanged
+    unless memmap_dir is set, in which case its running sums are deleted.
+    """
+    profiler = profiler or NULL_PROFILER
+    avgCount = acc['avgCount']
+
+    def call_before_slopes(X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg):
+        if before_slopes is not None:
+            before_slopes(X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg, avgCount)
+
+    with profiler.stage('finalize'):
+        final = finalize_grid(acc, sys_info['Ax1Sign'], sys_info['Ax2Sign'], y_meas_dir,
+                              memmap_dir=memmap_dir, tile_rows=memmap_tile_rows if memmap_dir else None,
+                              before_slopes=call_before_slopes)
+    if memmap_dir is not None:
+        # The running sums are no longer needed once averaged
+        for name in ('X', 'Y', 'Ax1Err', 'Ax2Err'):
+            acc.pop(name)
+            _remove_grid_file(os.path.join(memmap_dir, f'{name}_full.npy'))
     grid_system = {
-        'X': X_avg,
-        'Y': Y_avg,
-        'Ax1Err': Ax1Err_avg,
-        'Ax2Err': Ax2Err_avg,
+        'X': final['X'],
+        'Y': final['Y'],
+        'Ax1Err': final['Ax1Err'],
+        'Ax2Err': final['Ax2Err'],
         'avgCount': avgCount,
         'incAx1': incAx1,
         'incAx2': incAx2,
-        'zoneCount': rows * cols,
+        'zoneCount': zone_count,
         **sys_info,
     }
-    setup = {
-        'WriteCalFile': 1,
-        'OutAxis3': 0,
-        'OutAx3Value': 2,
-        'CalFile': out_cal,
-        'UserUnit': grid_system['UserUnit'],
-        'writeOutputFile': 1,
-        'OutFile': out_dat,
-    }
+    result = CalibrationResult(grid_system, final['VectorErr'], final['valid_mask'], final['Ax1cal'], final['Ax2cal'],
+                               final['stats'], memmap_dir=memmap_dir)
 
-    # Generate calibration file with surrounding zeros (as in multizone_step4)
-    size_cal = Ax1Err_avg.shape
-    Ax1cal = np.zeros((size_cal[0] + 2, size_cal[1] + 2))
-    Ax2cal = np.zeros((size_cal[0] + 2, size_cal[1] + 2))
-    Ax1cal[1:-1, 1:-1] = -grid_system['Ax1Sign'] * np.round(Ax1Err_avg * 10000) / 10000
-    Ax2cal[1:-1, 1:-1] = -grid_system['Ax2Sign'] * np.round(Ax2Err_avg * 10000) / 10000
+    for sink in sinks:
+        name, sink = sink if isinstance(sink, tuple) else (getattr(sink, '__name__', 'sink'), sink)
+        with profiler.stage(name):
+            sink(result)
 
-    # Optional dump of calibration and unrounded matrices for debugging/parity checks
-    if dump_cal_dir:
-        try:
-            os.makedirs(dump_cal_dir, exist_ok=True)
-            np.savetxt(os.path.join(dump_cal_dir, 'Ax1cal.txt'), Ax1cal, fmt='%.6f')
-            np.savetxt(os.path.join(dump_cal_dir, 'Ax2cal.txt'), Ax2cal, fmt='%.6f')
-            np.save(os.path.join(dump_cal_dir, 'Ax1cal.npy'), Ax1cal)
-            np.save(os.path.join(dump_cal_dir, 'Ax2cal.npy'), Ax2cal)
-            np.savetxt(os.path.join(dump_cal_dir, 'Ax1Err_avg_unrounded.txt'), Ax1Err_avg, fmt='%.6f')
-            np.savetxt(os.path.join(dump_cal_dir, 'Ax2Err_avg_unrounded.txt'), Ax2Err_avg, fmt='%.6f')
-            np.save(os.path.join(dump_cal_dir, 'Ax1Err_avg_unrounded.npy'), Ax1Err_avg)
-            np.save(os.path.join(dump_cal_dir, 'Ax2Err_avg_unrounded.npy'), Ax2Err_avg)
-            print(f'Debug matrices written to {dump_cal_dir}')
-        except Exception as e:
-            print(f'Warning: failed to dump debug matrices: {e}')
-
-    write_cal_file(out_cal, Ax1cal, Ax2cal, grid_system, setup)
-    print(f'Calibration file written: {out_cal}')
-
-    write_accuracy_file(out_dat, X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg, VectorErr, valid_mask, grid_system, setup)
-    print(f'Accuracy data file written: {out_dat}')
-
-    # Also emit legacy START2D file for parity with old MATLAB script
-    legacy_cal = os.path.splitext(out_cal)[0] + '_start2d.cal'
-    write_cal_file_start2d(legacy_cal, Ax1cal, Ax2cal, grid_system, setup)
-    print(f'Legacy START2D calibration file written: {legacy_cal}')
-
-    if plot_path:
-        save_plots(plot_path, X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg, VectorErr)
+    result.print_summary()
+    return result
 
-    # Save .mat summary (optional, helpful for downstream)
+
+def _dump_cal_matrices(result, dump_cal_dir, artifacts):
+    """Calibration and unrounded matrices for debugging/parity checks."""
+    try:
+        for name, matrix in (('Ax1cal', result.Ax1cal), ('Ax2cal', result.Ax2cal),
+                             ('Ax1Err_avg_unrounded', result.Ax1Err), ('Ax2Err_avg_unrounded', result.Ax2Err)):
+            artifacts.write(os.path.join(dump_cal_dir, f'{name}.txt'), 'dump',
+                            lambda path: np.savetxt(path, matrix, fmt='%.6f'))
+            artifacts.write(os.path.join(dump_cal_dir, f'{name}.npy'), 'dump', lambda path: np.save(path, matrix))
+        print(f'Debug matrices written to {artifacts.path(dump_cal_dir)}')
+    except Exception as e:
+        print(f'Warning: failed to dump debug matrices: {e}')
+
+
+def _save_before_slopes(artifacts, X_avg, Y_avg, Ax1Err_avg, Ax2Err_avg, avgCount):
+    # Save stitched data BEFORE slope removal for debugging (like MATLAB does)
     try:
-        sio.savemat('stitched_multizone_summary.mat', {
+        import scipy.io as sio
+        path = artifacts.write_debug('python_stitched_before_slopes.mat', lambda path: sio.savemat(path, {
             'X': X_avg,
             'Y': Y_avg,
-            'Ax1Err': Ax1Err_avg,
-            'Ax2Err': Ax2Err_avg,
-            'VectorErr': VectorErr,
-            'avgCount': avgCount,
-            'orthogonality_arcsec': orthog_arcsec,
-            'pkAx1': pkAx1,
-            'pkAx2': pkAx2,
-            'pkVector': pkVector,
-            'rmsAx1': rmsAx1,
-            'rmsAx2': rmsAx2,
-            'rmsVector': rmsVector,
-        })
-        print('Summary MAT file written: stitched_multizone_summary.mat')
+            'Ax1Err_before_slopes': Ax1Err_avg,
+            'Ax2Err_before_slopes': Ax2Err_avg,
+            'avgCount': avgCount
+        }))
+        print(f'Pre-slope-removal data saved for debugging: {path}')
+    except Exception as e:
+        print(f'Warning: could not save pre-slope data ({e})')
+
+
+def _save_mat_summary(result, artifacts):
+    # Save .mat summary (optional, helpful for downstream)
+    if result.memmap_dir is not None:
+        print('MAT summary skipped for out-of-core grids')
+        return
+    try:
+        import scipy.io as sio
+        path = artifacts.write_debug('stitched_multizone_summary.mat', lambda path: sio.savemat(path, {
+            'X': result.X,
+            'Y': result.Y,
+            'Ax1Err': result.Ax1Err,
+            'Ax2Err': result.Ax2Err,
+            'VectorErr': result.VectorErr,
+            'avgCount': result.avgCount,
+            **result.stats,
+        }))
+        print(f'Summary MAT file written: {path}')
     except Exception as e:
         print(f'Warning: could not write MAT summary ({e})')
 
-    print('\n=== FINAL CALIBRATION SUMMARY ===')
-    print(f"Total zones processed: {rows*cols}")
-    print(f"Final grid size: {X_avg.shape[0]} x {X_avg.shape[1]} points")
-    coverage = 100 * float(np.sum(valid_mask)) / float(np.prod(X_avg.shape))
-    print(f"Valid data points: {int(np.sum(valid_mask))} ({coverage:.1f}% coverage)")
-    overlap_pts = int(np.sum(avgCount > 1))
-    print(f"Overlap points: {overlap_pts}")
-    print('Final accuracy performance:')
-    print(f"  Ax1: ±{pkAx1/2:.3f} um P-P, {rmsAx1:.3f} um RMS")
-    print(f"  Ax2: ±{pkAx2/2:.3f} um P-P, {rmsAx2:.3f} um RMS")
-    print(f"  Vector: {rmsVector:.3f} um RMS")
-    print(f"  Orthogonality: {orthog_arcsec:.3f} arc-seconds")
 
-    return {
-        'grid_system': grid_system,
-        'stats': {
-            'orthogonality_arcsec': orthog_arcsec,
-            'pkAx1': pkAx1,
-            'pkAx2': pkAx2,
-            'pkVector': pkVector,
-            'rmsAx1': rmsAx1,
-            'rmsAx2': rmsAx2,
-            'rmsVector': rmsVector,
-        }
-    }
+def file_sinks(artifacts, out_cal, out_dat, plot_path=None, dump_cal_dir=None):
+    """
+    Sinks for a file-based run: the --dump-cal matrices, output_sinks() and, when
+    artifacts.debug is set, the .mat summary.
+    """
+    sinks = []
+    if dump_cal_dir:
+        sinks.append(('dump_cal', lambda result: _dump_cal_matrices(result, dump_cal_dir, artifacts)))
+    sinks += output_sinks(out_cal, out_dat, plot_path, artifacts=artifacts)
+    if artifacts.debug:
+        sinks.append(('save_mat_summary', lambda result: _save_mat_summary(result, artifacts)))
+    return sinks
+
+
+def stitch_and_calibrate(zone_files, rows, cols, out_cal, out_dat, plot_path=None, user_unit_override=None, dump_cal_dir=None,
+                         cache=None, jobs=1, fill_method='structured', solver='chain', stitch_workers=1,
+                         memmap_dir=None, memmap_tile_rows=FINALIZE_TILE_ROWS, profiler=None, artifacts=None,
+                         zone_results=None, on_stitched=None, zone_handoff='shared', keep_meta='summary',
+                         keep_memmap=False):
+    """
+    File-based run used by the CLI: calibrate() with the .cal, .dat and legacy
+    _start2d.cal writers, the optional plot, the --dump-cal matrices and, when
+    artifacts.debug is set, the .mat dumps. Every file goes through artifacts (an
+    ArtifactManager; default: paths as given, relative to the working directory,
+    no debug artifacts). Returns CalibrationResult.to_dict().
+    Out-of-core grids under memmap_dir are deleted once the outputs are written (or
+    the run fails) unless keep_memmap is set. On POSIX the returned grids stay
+    readable while referenced; where mapped files cannot be deleted (Windows) the
+    directory is removed at interpreter exit instead.
+    """
+    profiler = profiler or NULL_PROFILER
+    artifacts = artifacts or ArtifactManager()
+    sinks = file_sinks(artifacts, out_cal, out_dat, plot_path, dump_cal_dir)
+
+    def save_before_slopes(*grids):
+        # Skipped out of core: would pull the whole grid into memory
+        if memmap_dir is None:
+            with profiler.stage('save_mat_before_slopes'):
+                _save_before_slopes(artifacts, *grids)
+
+    # calibrate() makes its own run directory inside this one
+    run_memmap_dir = None
+    if memmap_dir is not None:
+        os.makedirs(memmap_dir, exist_ok=True)
+        run_memmap_dir = tempfile.mkdtemp(prefix='stitch2d_run_', dir=memmap_dir)
+    try:
+        result = calibrate(zone_files, rows, cols, user_unit_override=user_unit_override, cache=cache, jobs=jobs,
+                           fill_method=fill_method, solver=solver, stitch_workers=stitch_workers,
+                           memmap_dir=run_memmap_dir, memmap_tile_rows=memmap_tile_rows, profiler=profiler,
+                           sinks=sinks, dump_cal_dir=dump_cal_dir,
+                           before_slopes=save_before_slopes if artifacts.debug else None, zone_results=zone_results,
+                           on_stitched=on_stitched, zone_handoff=zone_handoff, keep_meta=keep_meta)
+    except BaseException:
+        if run_memmap_dir is not None:
+            _remove_run_dir(run_memmap_dir)
+        raise
+    if run_memmap_dir is not None:
+        if keep_memmap:
+            print(f'Out-of-core grids kept in {result.memmap_dir}')
+        else:
+            _remove_run_dir(run_memmap_dir)
+    return result.to_dict()
+
+
+def job_argv(request):
+    """
+    Pipeline CLI argv for a job request: {'argv': [CLI args]}, or the options as fields
+    with '_' for '-', e.g. {'zones': [...], 'rows': 2, 'cols': 2, 'debug_artifacts': True}
+    (True adds the bare flag, False/None omit it), as stitch2d_service and
+    stitch2d_batch take them. Raises ValueError unless request is a dict whose 'argv'
+    is a list of strings, or whose fields are strings, numbers, booleans, null or
+    lists of strings and numbers.
+    """
+    if not isinstance(request, dict):
+        raise ValueError(f'expected a JSON object, got {type(request).__name__}')
+    if 'argv' in request:
+        argv = request['argv']
+        if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+            raise ValueError("'argv' must be a list of strings")
+        return list(argv)
+    argv = []
+    for key, value in request.items():
+        flag = '--' + key.replace('_', '-')
+        if value is True:
+            argv.append(flag)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, (list, tuple)) and all(_is_option_scalar(v) for v in value):
+            argv += [flag] + [str(v) for v in value]
+        elif _is_option_scalar(value):
+            argv += [flag, str(value)]
+        else:
+            raise ValueError(f'unsupported value for {key!r}: {value!r}')
+    return argv
+
+
+def _is_option_scalar(value):
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
 
 
 def parse_args(argv=None):
@@ -1022,21 +2650,68 @@ def parse_args(argv=None):
     p.add_argument('--zones', nargs='+', required=True, help='Zone data files in row-major order (len = rows*cols)')
     p.add_argument('--out-cal', default='stitched_multizone_python.cal', help='Output calibration .cal file path')
     p.add_argument('--out-dat', default='stitched_multizone_accuracy_python.dat', help='Output accuracy .dat file path')
+    p.add_argument('--out-dir', default=None,
+                   help='Write this run into a new run_<timestamp>_* directory under OUT_DIR (output paths are '
+                        'relative to it) together with a manifest.json of everything produced')
+    p.add_argument('--debug-artifacts', action='store_true',
+                   help='Also write the debug .mat dumps (python_stitched_before_slopes.mat, stitched_multizone_summary.mat)')
     p.add_argument('--plot', default=None, help='Optional path to save a PNG plot')
     p.add_argument('--user-unit', choices=['METRIC', 'ENGLISH'], default=None, help='Override UserUnit (normally read from headers)')
     p.add_argument('--dump-cal', dest='dump_cal', default=None, help='Optional directory to dump Ax1cal/Ax2cal and unrounded matrices before writing')
+    p.add_argument('--jobs', type=int, default=1, help='Worker processes for per-zone steps 1-5 (0 = one per CPU)')
+    p.add_argument('--zone-handoff', choices=ZONE_HANDOFFS, default='shared',
+                   help='How --jobs workers return parsed zones: shared: through mapped scratch files '
+                        '(env STITCH2D_HANDOFF_DIR, default the system temp dir); pickle: through the process pool pipe')
+    p.add_argument('--keep-meta', choices=META_POLICIES, default='summary',
+                   help='Per-zone results held for the run: none: header config only; summary: plus scalar '
+                        'per-zone stats; full: plus every intermediate grid (grid_data, slope_data, processed_data)')
+    p.add_argument('--solver', choices=STITCH_SOLVERS, default='chain',
+                   help='chain: stitch zone by zone along rows/first column (MATLAB order); '
+                        'global: one sparse least-squares solve over all overlaps')
+    p.add_argument('--stitch-workers', type=int, default=1,
+                   help='Threads for the chain solver: rows are stitched concurrently once their first-column zone is done')
+    p.add_argument('--memmap-dir', default=None,
+                   help='Out-of-core mode: keep the full-travel grids as np.memmap files under this directory')
+    p.add_argument('--keep-memmap', action='store_true',
+                   help='Leave the out-of-core grid files under --memmap-dir after the run (deleted by default)')
+    p.add_argument('--memmap-tile-rows', type=int, default=FINALIZE_TILE_ROWS,
+                   help='Rows per tile when finalizing out-of-core grids')
+    p.add_argument('--profile-report', default=None,
+                   help='Write per-stage wall/CPU time and tracemalloc peak (per zone and stage) to this JSON file')
+    p.add_argument('--fill-method', choices=FILL_METHODS, default='structured', help='How missing grid cells in incomplete zones are filled')
+    p.add_argument('--no-cache', action='store_true', help='Bypass the parsed zone cache (always re-parse zone files)')
+    p.add_argument('--clear-cache', action='store_true', help='Empty the parsed zone cache before running')
+    p.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Parsed zone cache directory (env STITCH2D_CACHE_DIR)')
+    p.add_argument('--cache-max-mb', type=float, default=DEFAULT_CACHE_MAX_MB, help='Parsed zone cache size cap in MB (LRU eviction)')
     return p.parse_args(argv)
 
 
-def main(argv=None):
-    args = parse_args(argv)
-    # Validate paths
+def run(args, zone_results=None, on_stitched=None):
+    """
+    Execute one CLI invocation from parsed arguments (see parse_args); used by main,
+    the stitch2d_service daemon, stitch2d_batch (which passes zone_results parsed
+    on its shared pool) and stitch2d_watch (zone_results streamed as files arrive);
+    see calibrate. Returns {'run_dir', 'artifacts', 'stats'} with absolute artifact
+    paths.
+    """
     missing = [z for z in args.zones if not os.path.exists(z)]
-    if missing:
-        print('ERROR: Missing zone files:')
-        for z in missing:
-            print(f'  - {z}')
-        return 1
+    if missing and zone_results is None:
+        raise FileNotFoundError('Missing zone files: ' + ', '.join(missing))
+
+    cache = ZoneCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    if args.clear_cache:
+        print(f'Cleared {cache.clear()} cached zone(s) from {cache.cache_dir}')
+    if args.no_cache:
+        cache = None
+    profiler = StageProfiler() if args.profile_report else None
+    if args.out_dir:
+        artifacts = ArtifactManager.create(args.out_dir, debug=args.debug_artifacts)
+        print(f'Run directory: {artifacts.run_dir}')
+    else:
+        artifacts = ArtifactManager(debug=args.debug_artifacts)
+    run_info = dict(zones=[os.path.abspath(z) for z in args.zones], rows=args.rows, cols=args.cols, jobs=args.jobs,
+                    solver=args.solver, stitch_workers=args.stitch_workers, fill_method=args.fill_method,
+                    memmap=args.memmap_dir is not None, cache=cache is not None)
 
     result = stitch_and_calibrate(
         zone_files=args.zones,
@@ -1047,7 +2722,44 @@ def main(argv=None):
         plot_path=args.plot,
         user_unit_override=args.user_unit,
         dump_cal_dir=args.dump_cal,
+        cache=cache,
+        jobs=args.jobs,
+        fill_method=args.fill_method,
+        solver=args.solver,
+        stitch_workers=args.stitch_workers,
+        memmap_dir=args.memmap_dir,
+        keep_memmap=args.keep_memmap,
+        memmap_tile_rows=args.memmap_tile_rows,
+        profiler=profiler,
+        artifacts=artifacts,
+        zone_results=zone_results,
+        on_stitched=on_stitched,
+        zone_handoff=args.zone_handoff,
+        keep_meta=args.keep_meta,
     )
+    if profiler is not None:
+        profiler.close()
+        path = artifacts.write(args.profile_report, 'profile', lambda path: profiler.write(path, **run_info))
+        print(f'Profile report written: {path}')
+    if args.out_dir:
+        print(f'Manifest written: {artifacts.write_manifest(**run_info)}')
+    return {
+        'run_dir': os.path.abspath(artifacts.run_dir),
+        'artifacts': [a['path'] for a in artifacts.artifacts],
+        'stats': {k: float(v) for k, v in result['stats'].items()},
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Validate paths
+    missing = [z for z in args.zones if not os.path.exists(z)]
+    if missing:
+        print('ERROR: Missing zone files:')
+        for z in missing:
+            print(f'  - {z}')
+        return 1
+    run(args)
     return 0
 
 
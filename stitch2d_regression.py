@@ -0,0 +1,83 @@
+"""
+Closed-form degree-1 regression for the stitch pipeline.
+
+Every fit in the pipeline is a straight line through values sampled on a zone or
+grid coordinate vector (step4 slopes, seam overlap lines, finalize's global slopes).
+np.polyfit solves each of those with a Vandermonde matrix and an SVD; here the
+coordinate sums are computed once per vector (LineBasis, cached by basis()) and a
+fit is two dot products, batched over any number of lines sampled on the same vector:
+
+    b = basis(zone.y)
+    coef = b.fit(np.stack([master_means, slave_means]))   # (2, 2): [slope, intercept] rows
+    lines = b.evaluate(coef)                               # (2, len(zone.y))
+
+Coefficients use np.polyfit's order, [slope, intercept], and agree with it to
+rounding; evaluate() is the np.polyval equivalent on the basis' own vector.
+"""
+
+import threading
+
+import numpy as np
+
+# Coordinate vectors kept by basis(); a layout has a handful of distinct ones
+BASIS_CACHE_SIZE = 64
+
+_bases = {}
+# basis() is called from the stitch_wavefront worker threads
+_bases_lock = threading.Lock()
+
+
+class LineBasis:
+    """Least-squares line fits against one coordinate vector t (sums precomputed)."""
+
+    __slots__ = ('t', 'mean', 'dt', 'sxx')
+
+    def __init__(self, t):
+        self.t = np.array(t, dtype=float)
+        self.mean = np.mean(self.t)
+        self.dt = self.t - self.mean
+        self.sxx = np.dot(self.dt, self.dt)
+
+    def slope(self, values):
+        """Least-squares slope of values (..., len(t)) vs t, batched over leading axes."""
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            return float(np.dot(self.dt, values - np.mean(values)) / self.sxx)
+        return (values - np.mean(values, axis=-1, keepdims=True)) @ self.dt / self.sxx
+
+    def fit(self, values):
+        """[slope, intercept] of values (..., len(t)) vs t: shape (..., 2), like np.polyfit(t, v, 1)."""
+        values = np.asarray(values, dtype=float)
+        mean_v = np.mean(values, axis=-1)
+        slope = (values - mean_v[..., None]) @ self.dt / self.sxx
+        return np.stack([slope, mean_v - slope * self.mean], axis=-1)
+
+    def evaluate(self, coef):
+        """Lines coef (..., 2) evaluated on t: shape (..., len(t)), like np.polyval(coef, t)."""
+        return polyval1(coef, self.t)
+
+
+def basis(t):
+    """LineBasis for coordinate vector t, reused for repeated vectors (zones share their grids)."""
+    t = np.asarray(t, dtype=float)
+    key = (t.shape, t.tobytes())
+    b = _bases.get(key)
+    if b is None:
+        b = LineBasis(t)
+        with _bases_lock:
+            if len(_bases) >= BASIS_CACHE_SIZE:
+                _bases.pop(next(iter(_bases)))
+            _bases[key] = b
+    return b
+
+
+def polyfit1(t, values):
+    """np.polyfit(t, values, 1) for values (..., len(t)), batched over leading axes."""
+    return basis(t).fit(values)
+
+
+def polyval1(coef, t):
+    """np.polyval for lines coef (..., 2) at points t: shape (..., len(t))."""
+    coef = np.asarray(coef, dtype=float)
+    t = np.asarray(t, dtype=float)
+    return coef[..., 0, None] * t + coef[..., 1, None]
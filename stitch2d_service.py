@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Warm calibration daemon for stitch2d_pipeline.
+
+A fresh `python stitch2d_pipeline.py` pays for importing numpy/scipy/matplotlib on
+every job. `serve` imports them once, runs a small in-memory warm-up calibration,
+then answers job requests over localhost HTTP or a Unix socket:
+
+    python stitch2d_service.py serve --port 8765 --out-root runs
+    python stitch2d_service.py serve --unix-socket /tmp/stitch2d.sock --workers 2
+
+    python stitch2d_service.py submit --port 8765 -- --rows 2 --cols 2 --zones CZ1.dat CZ2.dat CZ3.dat CZ4.dat
+
+Endpoints:
+    GET  /health  -> {"status": "ok", "jobs": <completed>, "workers": <n>}
+    POST /jobs    -> body {"argv": [pipeline CLI args]} or the same options as fields,
+                     e.g. {"zones": [...], "rows": 2, "cols": 2, "solver": "global"};
+                     answers {"status": "ok", "run_dir", "artifacts", "stats",
+                     "elapsed_s", "log"} or {"status": "error", "error", "log"}.
+
+Relative zone paths are resolved against the server's working directory (`submit`
+resolves them against the client's first). Unless a job sets --out-dir itself, it
+gets a fresh run directory under --out-root (see ArtifactManager), so concurrent jobs
+never share output files. Jobs may not set --jobs, --memmap-dir or --cache-dir
+(see rejected_options).
+With --workers 0 (default) jobs run in the server process one at a time; with
+--workers N they run on N warm worker processes.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import contextlib
+import http.client
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(str(Path(__file__).parent))
+
+# numpy/scipy and the pipeline are imported by the server side only, so `submit`
+# stays a lightweight client.
+
+DEFAULT_PORT = 8765
+DEFAULT_OUT_ROOT = 'stitch2d_runs'
+# Characters of pipeline output returned with each job
+LOG_TAIL_CHARS = 4000
+
+
+def rejected_options(args):
+    """
+    Pipeline options set in args that a service job may not use: --jobs would start
+    a process pool inside a warm worker, --memmap-dir and --cache-dir would let a
+    request write wherever the server can. Checked on the parsed arguments, so
+    abbreviations and --flag=value forms are caught too.
+    """
+    import stitch2d_pipeline as pipeline
+    rejected = []
+    if args.jobs != 1:
+        rejected.append('--jobs')
+    if args.memmap_dir is not None:
+        rejected.append('--memmap-dir')
+    if args.cache_dir != pipeline.DEFAULT_CACHE_DIR:
+        rejected.append('--cache-dir')
+    return rejected
+
+
+def run_job(argv, out_root=DEFAULT_OUT_ROOT):
+    """
+    Run one pipeline invocation in this process and return the response dict.
+    Pipeline output (stdout and argparse errors) is captured into 'log'.
+    """
+    import stitch2d_pipeline as pipeline
+    log = io.StringIO()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            args = pipeline.parse_args(argv)
+            rejected = rejected_options(args)
+            if rejected:
+                return {'status': 'error', 'error': f'not allowed in a service job: {", ".join(rejected)}',
+                        'log': log.getvalue()[-LOG_TAIL_CHARS:]}
+            if not args.out_dir:
+                args.out_dir = out_root
+            result = pipeline.run(args)
+    except SystemExit:
+        return {'status': 'error', 'error': 'invalid arguments', 'log': log.getvalue()[-LOG_TAIL_CHARS:]}
+    except Exception as e:
+        return {'status': 'error', 'error': f'{type(e).__name__}: {e}', 'log': log.getvalue()[-LOG_TAIL_CHARS:]}
+    return {'status': 'ok', **result, 'elapsed_s': time.perf_counter() - t0,
+            'log': log.getvalue()[-LOG_TAIL_CHARS:]}
+
+
+def _synthetic_zone(x0, num=4, pitch=10.0):
+    """Zone matrix s (Ax1TestLoc Ax2TestLoc Ax1CmdPos Ax2CmdPos Ax1RelErr Ax2RelErr) for warm-up."""
+    import numpy as np
+    ax1_loc, ax2_loc = np.meshgrid(np.arange(1, num + 1), np.arange(1, num + 1))
+    ax1_pos = x0 + (ax1_loc - 1) * pitch
+    ax2_pos = (ax2_loc - 1) * pitch
+    err = 1e-4 * np.sin(ax1_pos / 7.0 + ax2_pos / 11.0)
+    return np.column_stack([ax1_loc.ravel(), ax2_loc.ravel(), ax1_pos.ravel(), ax2_pos.ravel(),
+                            err.ravel(), -err.ravel()])
+
+
+def warm_up():
+    """Import the heavy modules and exercise every stage once on in-memory zones (no file I/O)."""
+    import scipy.io  # noqa: F401  used by the debug .mat dumps
+    import scipy.sparse  # noqa: F401  used by the global solver
+    import stitch2d_pipeline as pipeline
+    with contextlib.redirect_stdout(io.StringIO()):
+        zones = [_synthetic_zone(0.0), _synthetic_zone(20.0)]
+        result = pipeline.calibrate(zones, 1, 2)
+        pipeline.calibrate(zones, 1, 2, solver='global')
+        for _ in pipeline.format_cal_body(result.Ax1cal, result.Ax2cal):
+            pass
+
+
+class _Service:
+    """Runs jobs in process (serialised) or on a pool of warm worker processes."""
+
+    def __init__(self, workers, out_root):
+        self.out_root = out_root
+        self.workers = workers
+        self.completed = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        if workers > 0:
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+            # Start every worker now so the first jobs do not pay for the warm-up
+            list(self._pool.map(time.sleep, [0.0] * workers))
+        else:
+            warm_up()
+
+    def submit(self, argv):
+        if self._pool is not None:
+            response = self._pool.submit(run_job, argv, self.out_root).result()
+        else:
+            # redirect_stdout is process wide, so in-process jobs run one at a time
+            with self._lock:
+                response = run_job(argv, self.out_root)
+        with self._lock:
+            self.completed += 1
+        return response
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'stitch2d/1'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'status': 'error', 'error': f'unknown path {self.path}'})
+            return
+        service = self.server.service
+        self._send_json(200, {'status': 'ok', 'jobs': service.completed, 'workers': service.workers})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            self._send_json(404, {'status': 'error', 'error': f'unknown path {self.path}'})
+            return
+        import stitch2d_pipeline as pipeline
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            argv = pipeline.job_argv(request)
+        except ValueError as e:
+            self._send_json(400, {'status': 'error', 'error': f'bad request: {e}'})
+            return
+        response = self.server.service.submit(argv)
+        self._send_json(200 if response['status'] == 'ok' else 400, response)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class _ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def make_server(service, port=None, unix_socket=None, quiet=False):
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)  # stale socket from a previous run
+        server = _ThreadingUnixHTTPServer(unix_socket, _Handler)
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(args):
+    # Shut down cleanly (socket file removed, workers joined) on SIGTERM too
+    signal.signal(signal.SIGTERM, _terminate)
+    t0 = time.perf_counter()
+    service = _Service(args.workers, args.out_root)
+    server = make_server(service, port=args.port, unix_socket=args.unix_socket, quiet=args.quiet)
+    where = args.unix_socket or f'http://127.0.0.1:{server.server_address[1]}'
+    print(f'stitch2d service ready on {where} ({time.perf_counter() - t0:.2f}s warm-up, '
+          f'{args.workers or "in-process"} worker(s))', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+    return 0
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def request(method, path, payload=None, port=DEFAULT_PORT, unix_socket=None, timeout=None):
+    """Send one request to a running service and return (HTTP status, decoded JSON)."""
+    if unix_socket:
+        conn = _UnixHTTPConnection(unix_socket, timeout=timeout)
+    else:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+# Pipeline options whose values submit resolves against the client's working directory
+_CLIENT_PATH_OPTIONS = ('--zones', '--out-dir')
+# Relative to the run directory when the job sets --out-dir, else resolved by submit
+_OUTPUT_PATH_OPTIONS = ('--out-cal', '--out-dat')
+
+
+def client_argv(argv):
+    """
+    argv with the values of --zones and --out-dir (and of --out-cal / --out-dat
+    unless --out-dir is given) made absolute, so the server finds the client's files.
+    Other tokens are passed through unchanged.
+    """
+    path_options = _CLIENT_PATH_OPTIONS
+    if not any(a == '--out-dir' or a.startswith('--out-dir=') for a in argv):
+        path_options += _OUTPUT_PATH_OPTIONS
+    resolved = []
+    option = None
+    for token in argv:
+        if token.startswith('-'):
+            name, sep, value = token.partition('=')
+            option = name if name in path_options else None
+            if option and sep:
+                token = f'{name}={os.path.abspath(value)}'
+                option = None
+        elif option:
+            token = os.path.abspath(token)
+            if option != '--zones':
+                option = None  # single-valued
+        resolved.append(token)
+    return resolved
+
+
+def submit(args):
+    argv = client_argv(args.argv)
+    status, response = request('POST', '/jobs', {'argv': argv}, port=args.port, unix_socket=args.unix_socket)
+    if not args.verbose:
+        response.pop('log', None)
+    print(json.dumps(response, indent=2))
+    return 0 if status == 200 else 1
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Warm stitch2d calibration service.')
+    sub = p.add_subparsers(dest='command', required=True)
+
+    def add_endpoint(sp):
+        sp.add_argument('--port', type=int, default=DEFAULT_PORT, help='Localhost HTTP port')
+        sp.add_argument('--unix-socket', default=None, help='Listen on / connect to this Unix socket instead')
+
+    s = sub.add_parser('serve', help='Run the daemon')
+    add_endpoint(s)
+    s.add_argument('--workers', type=int, default=0,
+                   help='Warm worker processes (0 = run jobs in the server process, one at a time)')
+    s.add_argument('--out-root', default=DEFAULT_OUT_ROOT,
+                   help='Jobs without --out-dir get a run directory under this path')
+    s.add_argument('--quiet', action='store_true', help='Do not log requests')
+
+    c = sub.add_parser('submit', help='Send one job to a running daemon and print the result')
+    add_endpoint(c)
+    c.add_argument('--verbose', action='store_true', help='Include the pipeline log in the output')
+    c.add_argument('argv', nargs=argparse.REMAINDER, help='stitch2d_pipeline arguments, after --')
+    args = p.parse_args(argv)
+    if args.command == 'submit' and args.argv[:1] == ['--']:
+        args.argv = args.argv[1:]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'serve':
+        return serve(args)
+    return submit(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Persisted stitch state for incremental re-stitching.
+
+When one zone of a layout is re-measured (e.g. after a fixture bump), a full
+stitch_and_calibrate re-parses and re-stitches every zone. `init` runs the chain
+solver once and keeps what a later change needs in a state directory; `restitch`
+then re-parses only the replaced zones, re-stitches them and their dependents in the
+master chain (the rest of the row, or every row below for a first-column zone),
+takes their old contributions out of the accumulation grid, adds the new ones and
+re-finalizes.
+
+    python stitch2d_state.py init --state lot42.state --rows 4 --cols 4 --zones CZ*.dat --out-dir runs
+    python stitch2d_state.py restitch --state lot42.state --zone 2 3 CZ7_remeasured.dat --out-dir runs
+    python stitch2d_state.py restitch --state lot42.state   # re-stitch zone files changed in place
+
+Rows and columns on the command line are 1-based, as in the pipeline's
+"Processing Zone: Row i, Col j" lines. The state directory holds:
+
+    state.json        layout, header info, grid extent, per-zone source (size, sha256)
+                      and the corrections apply_stitching_corrections applied
+    zone<k>.npz       zone k after steps 1-5, before stitching (x, y, Ax1Err, Ax2Err)
+    accumulation.npz  the full-grid accumulation sums (X, Y, Ax1Err, Ax2Err, avgCount)
+
+Stitched zones are not stored: replay_stitching_corrections rebuilds them from the
+raw planes and the recorded corrections. Taking a contribution out of the running
+sums and adding the new one rounds differently from summing from scratch, so the
+unrounded grids can differ from a full rerun in the last bits (far below the 1e-4 um
+resolution of the tables); restitch --exact re-accumulates every zone (still without
+parsing or re-fitting the unchanged ones) for output byte-identical to a full rerun.
+Only the chain solver is supported.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+import stitch2d_pipeline as pipeline
+
+STATE_FORMAT_VERSION = 1
+ACC_GRIDS = ('X', 'Y', 'Ax1Err', 'Ax2Err', 'avgCount')
+
+
+def _source_info(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'bytes': st.st_size, 'sha256': pipeline._file_sha256(path)}
+
+
+class StitchState:
+    """
+    Chain-stitch state of one rows x cols layout: the unstitched zones, the
+    corrections each seam applied and the accumulation sums, in memory. build()
+    makes one from zone files, load()/save() persist it and replace() re-stitches.
+    """
+
+    def __init__(self, rows, cols, sources, raw_zones, corrections, acc, sys_info, incAx1, incAx2, minX, minY,
+                 y_meas_dir=-1, fill_method='structured', user_unit_override=None):
+        self.rows = rows
+        self.cols = cols
+        self.sources = sources          # per zone: {'path', 'bytes', 'sha256'}
+        self.raw_zones = raw_zones      # per zone: Zone after steps 1-5 (never modified)
+        self.corrections = corrections  # per zone: apply_stitching_corrections record ({} for zone 0)
+        self.acc = acc
+        self.sys_info = sys_info
+        self.incAx1 = incAx1
+        self.incAx2 = incAx2
+        self.minX = minX
+        self.minY = minY
+        self.y_meas_dir = y_meas_dir
+        self.fill_method = fill_method
+        self.user_unit_override = user_unit_override
+        self._dirty = set()             # zones whose zone<k>.npz must be rewritten
+
+    @classmethod
+    def build(cls, zone_files, rows, cols, user_unit_override=None, cache=None, jobs=1, fill_method='structured'):
+        """Parse and chain-stitch zone_files (row-major), like calibrate(solver='chain')."""
+        zone_files = list(zone_files)
+        if len(zone_files) != rows * cols:
+            raise ValueError(f'Expected {rows*cols} zone files, got {len(zone_files)}')
+        raw_zones = []
+        config = None
+        for zone, meta in pipeline.preprocess_zones(zone_files, jobs=jobs, cache=cache, fill_method=fill_method):
+            config = config or meta['config']
+            raw_zones.append(pipeline.Zone(zone.x, zone.y, zone.Ax1Err, zone.Ax2Err))
+        first = raw_zones[0]
+        incAx1 = first.x[1] - first.x[0] if len(first.x) > 1 else 1.0
+        incAx2 = first.y[1] - first.y[0] if len(first.y) > 1 else 1.0
+        minX, minY, shape = pipeline.grid_extent(raw_zones, incAx1, incAx2)
+        acc = {name: np.zeros(shape) for name in ACC_GRIDS}
+        state = cls(rows, cols, [_source_info(z) for z in zone_files], raw_zones, [{} for _ in zone_files], acc,
+                    pipeline.system_info(config, user_unit_override), incAx1, incAx2, minX, minY,
+                    fill_method=fill_method, user_unit_override=user_unit_override)
+        state._accumulate(state.all_zones(), restitch=set(state.all_zones()))
+        state._dirty = set(range(rows * cols))
+        return state
+
+    def _index(self, i, j):
+        return i * self.cols + j
+
+    def all_zones(self):
+        return [(i, j) for i in range(self.rows) for j in range(self.cols)]
+
+    def stitched_zone(self, k):
+        """Zone k as stitched, rebuilt from its raw planes and recorded corrections."""
+        return pipeline.replay_stitching_corrections(self.raw_zones[k], self.corrections[k], self.y_meas_dir)
+
+    def _iter_stitched(self, zones, restitch):
+        """
+        Yield (k, stitched Zone) for zones ((i, j) in stitch order). Zones in restitch are
+        chain-stitched again from their raw planes, recording new corrections; the others
+        are replayed from their recorded corrections. Only zones that can still be a
+        master are kept.
+        """
+        masters = {}
+        for i, j in zones:
+            k = self._index(i, j)
+            master = pipeline.chain_master(i, j)
+            if (i, j) in restitch and master is not None:
+                m = self._index(*master[0])
+                zone = self.raw_zones[k].copy()
+                pipeline.apply_stitching_corrections(masters[m] if m in masters else self.stitched_zone(m), zone,
+                                                     master[1], self.y_meas_dir, inplace=True,
+                                                     corrections=self.corrections[k])
+            else:
+                zone = self.stitched_zone(k)
+            masters[k] = zone
+            # (i, j-1) only mastered this zone; (i-1, 0) mastered (i-1, 1) and this one
+            if j > 1:
+                masters.pop(k - 1, None)
+            elif j == 0 and i > 0:
+                masters.pop(self._index(i - 1, 0), None)
+            yield k, zone
+
+    def _accumulate(self, zones, restitch=(), remove=False):
+        for _, zone in self._iter_stitched(zones, restitch):
+            pipeline.accumulate_zone(self.acc, zone, self.minX, self.minY, self.incAx1, self.incAx2, remove=remove)
+
+    def replace(self, replacements, cache=None, exact=False):
+        """
+        Swap in re-measured zones, {(i, j): zone source}, and re-stitch them and their
+        chain dependents. Returns the number of zones re-stitched. exact=True rebuilds
+        the accumulation from every zone (row-major, as calibrate) instead of updating it.
+        A new first zone also refreshes sys_info from its header, as build does.
+        """
+        dependents = set()
+        new_raw = {}
+        sys_info = self.sys_info
+        for (i, j), source in replacements.items():
+            if not (0 <= i < self.rows and 0 <= j < self.cols):
+                raise ValueError(f'Zone ({i + 1}, {j + 1}) is outside the {self.rows} x {self.cols} layout')
+            zone, meta = pipeline.process_single_zone(source, cache=cache, fill_method=self.fill_method)
+            new_raw[self._index(i, j)] = pipeline.Zone(zone.x, zone.y, zone.Ax1Err, zone.Ax2Err)
+            if self._index(i, j) == 0:
+                sys_info = pipeline.system_info(meta['config'], self.user_unit_override)
+            dependents.update(pipeline.chain_dependents(self.rows, self.cols, i, j))
+        order = sorted(dependents)
+
+        raw_zones = list(self.raw_zones)
+        for k, zone in new_raw.items():
+            raw_zones[k] = zone
+        minX, minY, shape = pipeline.grid_extent(raw_zones, self.incAx1, self.incAx2)
+        # A zone that moved the grid extent needs a fresh accumulation too
+        rebuild = exact or (minX, minY, shape) != (self.minX, self.minY, self.acc['avgCount'].shape)
+        if rebuild:
+            self.minX, self.minY = minX, minY
+            self.acc = {name: np.zeros(shape) for name in ACC_GRIDS}
+        else:
+            # Take the old contributions out while the old planes and corrections are in place
+            self._accumulate(order, remove=True)
+        self.raw_zones = raw_zones
+        self.sys_info = sys_info
+        self._dirty.update(new_raw)
+        for (i, j), source in replacements.items():
+            if pipeline._is_path(source):
+                self.sources[self._index(i, j)] = _source_info(source)
+        self._accumulate(self.all_zones() if rebuild else order, restitch=dependents)
+        return len(order)
+
+    def changed_zones(self):
+        """{(i, j): path} of zone files whose contents changed since they were stitched."""
+        changed = {}
+        for k, source in enumerate(self.sources):
+            path = source['path']
+            if not os.path.exists(path):
+                continue
+            if os.path.getsize(path) != source['bytes'] or pipeline._file_sha256(path) != source['sha256']:
+                changed[divmod(k, self.cols)] = path
+        return changed
+
+    def calibrate(self, profiler=None, sinks=()):
+        """Finalize the current accumulation into a CalibrationResult (see pipeline.finish_calibration)."""
+        return pipeline.finish_calibration(self.acc, self.sys_info, self.incAx1, self.incAx2, self.rows * self.cols,
+                                           y_meas_dir=self.y_meas_dir, profiler=profiler, sinks=sinks)
+
+    def save(self, state_dir):
+        """Write the state; only zones added or replaced since the last save are rewritten."""
+        artifacts = pipeline.ArtifactManager(state_dir)
+        for k in sorted(self._dirty):
+            z = self.raw_zones[k]
+            artifacts.write(f'zone{k}.npz', 'zone',
+                            lambda path: np.savez(path, x=z.x, y=z.y, Ax1Err=z.Ax1Err, Ax2Err=z.Ax2Err))
+        artifacts.write('accumulation.npz', 'accumulation', lambda path: np.savez(path, **self.acc))
+        info = {
+            'version': STATE_FORMAT_VERSION,
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'rows': self.rows,
+            'cols': self.cols,
+            'y_meas_dir': self.y_meas_dir,
+            'fill_method': self.fill_method,
+            'user_unit_override': self.user_unit_override,
+            'sys_info': self.sys_info,
+            'incAx1': float(self.incAx1),
+            'incAx2': float(self.incAx2),
+            'minX': self.minX,
+            'minY': self.minY,
+            'zones': [{**source, 'corrections': corrections}
+                      for source, corrections in zip(self.sources, self.corrections)],
+        }
+
+        def dump(path):
+            with open(path, 'w') as f:
+                json.dump(info, f, indent=2)
+        # state.json last: it is what load() trusts
+        artifacts.write('state.json', 'state', dump)
+        self._dirty.clear()
+
+    @classmethod
+    def load(cls, state_dir):
+        with open(os.path.join(state_dir, 'state.json')) as f:
+            info = json.load(f)
+        if info.get('version') != STATE_FORMAT_VERSION:
+            raise ValueError(f'{state_dir}: unsupported stitch state version {info.get("version")!r}')
+        raw_zones = []
+        for k in range(info['rows'] * info['cols']):
+            with np.load(os.path.join(state_dir, f'zone{k}.npz')) as z:
+                raw_zones.append(pipeline.Zone(z['x'], z['y'], z['Ax1Err'], z['Ax2Err']))
+        with np.load(os.path.join(state_dir, 'accumulation.npz')) as a:
+            acc = {name: a[name] for name in ACC_GRIDS}
+        sources = [{key: zone[key] for key in ('path', 'bytes', 'sha256')} for zone in info['zones']]
+        corrections = [zone['corrections'] for zone in info['zones']]
+        return cls(info['rows'], info['cols'], sources, raw_zones, corrections, acc, info['sys_info'],
+                   info['incAx1'], info['incAx2'], info['minX'], info['minY'], y_meas_dir=info['y_meas_dir'],
+                   fill_method=info['fill_method'], user_unit_override=info['user_unit_override'])
+
+
+def _write_outputs(state, args, run_info):
+    """Finalize the state and write the usual outputs (as stitch2d_pipeline.run)."""
+    if args.out_dir:
+        artifacts = pipeline.ArtifactManager.create(args.out_dir, debug=args.debug_artifacts)
+        print(f'Run directory: {artifacts.run_dir}')
+    else:
+        artifacts = pipeline.ArtifactManager(debug=args.debug_artifacts)
+    state.calibrate(sinks=pipeline.file_sinks(artifacts, args.out_cal, args.out_dat, args.plot))
+    if args.out_dir:
+        print(f'Manifest written: {artifacts.write_manifest(**run_info)}')
+
+
+def init(args, pargs):
+    if pargs.solver != 'chain' or pargs.stitch_workers > 1 or pargs.memmap_dir:
+        raise ValueError('stitch state supports the in-memory chain solver only '
+                         '(no --solver global, --stitch-workers or --memmap-dir)')
+    cache = None if pargs.no_cache else pipeline.ZoneCache(pargs.cache_dir,
+                                                           max_bytes=int(pargs.cache_max_mb * 1024 * 1024))
+    state = StitchState.build(pargs.zones, pargs.rows, pargs.cols, user_unit_override=pargs.user_unit, cache=cache,
+                              jobs=pargs.jobs, fill_method=pargs.fill_method)
+    state.save(args.state)
+    print(f'Stitch state written: {args.state}')
+    _write_outputs(state, pargs, dict(zones=[s['path'] for s in state.sources], rows=state.rows, cols=state.cols,
+                                      solver='chain', fill_method=state.fill_method, state=os.path.abspath(args.state)))
+
+
+def restitch(args):
+    state = StitchState.load(args.state)
+    if args.zone:
+        replacements = {(int(r) - 1, int(c) - 1): path for r, c, path in args.zone}
+    else:
+        replacements = state.changed_zones()
+    if not replacements:
+        print('No zone changed since the state was saved; nothing to re-stitch')
+        return
+    for (i, j), path in sorted(replacements.items()):
+        print(f'Replacing Zone: Row {i+1}, Col {j+1} -> {path}')
+    t0 = time.perf_counter()
+    count = state.replace(replacements, exact=args.exact)
+    print(f'Re-stitched {count} of {state.rows * state.cols} zone(s) in {time.perf_counter() - t0:.2f}s')
+    state.save(args.state)
+    _write_outputs(state, args, dict(zones=[s['path'] for s in state.sources], rows=state.rows, cols=state.cols,
+                                     solver='chain', fill_method=state.fill_method, state=os.path.abspath(args.state),
+                                     replaced=[[i + 1, j + 1] for i, j in sorted(replacements)]))
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Persisted stitch state: stitch once, re-stitch re-measured zones.')
+    sub = p.add_subparsers(dest='command', required=True)
+    i = sub.add_parser('init', help='Stitch a layout and save its state (other options are stitch2d_pipeline options)',
+                       usage='%(prog)s --state DIR --rows R --cols C --zones Z [Z ...] [pipeline options]')
+    i.add_argument('--state', required=True, help='Stitch state directory to write')
+    r = sub.add_parser('restitch', help='Replace zones, re-stitch their dependents and re-finalize')
+    r.add_argument('--state', required=True, help='Stitch state directory (updated in place)')
+    r.add_argument('--zone', nargs=3, action='append', metavar=('ROW', 'COL', 'PATH'),
+                   help='Replace zone ROW, COL (1-based) with PATH; repeatable. '
+                        'Default: every zone file whose contents changed since it was stitched')
+    r.add_argument('--exact', action='store_true',
+                   help='Re-accumulate every zone instead of updating the sums (byte-identical to a full rerun)')
+    r.add_argument('--out-cal', default='stitched_multizone_python.cal', help='Output calibration .cal file path')
+    r.add_argument('--out-dat', default='stitched_multizone_accuracy_python.dat', help='Output accuracy .dat file path')
+    r.add_argument('--out-dir', default=None, help='Write into a new run directory under OUT_DIR, with a manifest')
+    r.add_argument('--plot', default=None, help='Optional path to save a PNG plot')
+    r.add_argument('--debug-artifacts', action='store_true', help='Also write the .mat summary')
+    args, rest = p.parse_known_args(argv)
+    if args.command == 'init':
+        return args, pipeline.parse_args(rest)
+    if rest:
+        p.error(f'unrecognized arguments: {" ".join(rest)}')
+    return args, None
+
+
+def main(argv=None):
+    args, pargs = parse_args(argv)
+    try:
+        if args.command == 'init':
+            init(args, pargs)
+        else:
+            restitch(args)
+    except (OSError, ValueError) as e:
+        print(f'ERROR: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Streaming ingest: calibrate a multizone layout while it is still being measured.
+
+Zone files land one by one as each zone's measurement finishes. Instead of waiting
+for all of them, `stitch2d_watch.py` polls for the expected files, parses each one
+(steps 1-5) as soon as it has landed and stopped growing, and feeds the chain
+stitcher, which stitches every zone the moment it and its master are available.
+When the last zone lands only that zone's parse and stitch, the final accumulation
+and the writers remain, so the .cal file is ready seconds later.
+
+    python stitch2d_watch.py --settle 2 --preview partial.dat \\
+        --rows 2 --cols 2 --zones CZ1.dat CZ2.dat CZ3.dat CZ4.dat --out-dir runs
+
+Every option not listed under "watch options" is passed to stitch2d_pipeline
+(--zones names the files to wait for, in row-major order; they need not exist yet).
+Zones are stitched in row-major order, so a zone that lands early is parsed at once
+but stitched when the zones before it are in. With --preview, every stitched zone is
+also added to a running accumulation, which is finalized and written as an accuracy
+.dat after each zone.
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+import stitch2d_pipeline as pipeline
+
+ACC_GRIDS = ('X', 'Y', 'Ax1Err', 'Ax2Err', 'avgCount')
+
+
+class ZoneWatcher:
+    """
+    Waits for zone_files to land and parses them (process_single_zone) as they do.
+
+    A file counts as landed once it is non-empty and its size and mtime have not
+    changed for settle seconds (the measurement software writes it progressively).
+    A landed file that fails to parse is retried when it changes again. results()
+    yields the parse results in zone order, blocking until each one is available.
+    """
+
+    def __init__(self, zone_files, poll=0.5, settle=1.0, timeout=None, cache=None, fill_method='structured',
+                 keep_meta='summary'):
+        self.zone_files = list(zone_files)
+        self.poll = poll
+        self.settle = settle
+        self.timeout = timeout
+        self.cache = cache
+        self.fill_method = fill_method
+        self.keep_meta = keep_meta
+        self.parsed = {}     # zone index -> process_single_zone result, until yielded
+        self.landed_at = {}  # zone index -> mtime (epoch seconds) of the parsed file
+        self._stable = {}    # zone index -> ((size, mtime_ns), monotonic time first seen with it)
+        self._failed = {}    # zone index -> (size, mtime_ns) the last failed parse saw
+        self._last_activity = time.monotonic()  # a zone file appeared or changed
+
+    def _ready(self, idx, now):
+        """(size, mtime_ns) if zone idx has landed and is not a known-bad version, else None."""
+        try:
+            st = os.stat(self.zone_files[idx])
+        except FileNotFoundError:
+            return None
+        stat = (st.st_size, st.st_mtime_ns)
+        if idx not in self._stable or self._stable[idx][0] != stat:
+            self._stable[idx] = (stat, now)
+            self._last_activity = now
+        if st.st_size == 0 or now - self._stable[idx][1] < self.settle or self._failed.get(idx) == stat:
+            return None
+        return stat
+
+    def poll_once(self):
+        """Parse every zone file that has landed since the last call; returns how many."""
+        count = 0
+        now = time.monotonic()
+        for idx, path in enumerate(self.zone_files):
+            if idx in self.landed_at:
+                continue
+            stat = self._ready(idx, now)
+            if stat is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.parsed[idx] = pipeline.process_single_zone(path, cache=self.cache,
+                                                                    fill_method=self.fill_method,
+                                                                    keep_meta=self.keep_meta)
+            except Exception as e:
+                self._failed[idx] = stat
+                print(f'[watch] zone {idx + 1} ({path}) does not parse yet, waiting for it to change: {e}')
+                continue
+            self.landed_at[idx] = stat[1] / 1e9
+            count += 1
+            print(f'[watch] zone {idx + 1}/{len(self.zone_files)} landed: {path} '
+                  f'(parsed in {time.perf_counter() - t0:.2f}s)', flush=True)
+        return count
+
+    def results(self):
+        for idx in range(len(self.zone_files)):
+            while idx not in self.parsed:
+                if self.poll_once():
+                    continue
+                if self.timeout is not None and time.monotonic() - self._last_activity > self.timeout:
+                    waiting = [p for k, p in enumerate(self.zone_files) if k not in self.landed_at]
+                    raise TimeoutError(f'No zone file landed or changed for {self.timeout:g}s; still waiting for: '
+                                       + ', '.join(waiting))
+                time.sleep(self.poll)
+            yield self.parsed.pop(idx)
+
+
+class PartialGrid:
+    """
+    Running state of the stitched zones (on_stitched callback for calibrate). With
+    preview_path set, each zone is added to accumulation grids (accumulate_zone) that
+    grow to cover the zones so far, and the file is rewritten with the accuracy table
+    of the partially stitched grid (finish_calibration, which leaves acc unchanged).
+    Zones are not kept, so with --memmap-dir they stay out of memory; without a
+    preview only the count is kept.
+    """
+
+    def __init__(self, preview_path=None, user_unit_override=None):
+        self.preview_path = preview_path
+        self.user_unit_override = user_unit_override
+        self.count = 0
+        self.acc = None
+        self.sys_info = None
+        self.incAx1 = self.incAx2 = None
+        self.minX = self.minY = None
+
+    def add(self, zone_idx, zone):
+        self.count += 1
+        if not self.preview_path:
+            return
+        if self.acc is None:
+            self.incAx1 = zone.x[1] - zone.x[0] if len(zone.x) > 1 else 1.0
+            self.incAx2 = zone.y[1] - zone.y[0] if len(zone.y) > 1 else 1.0
+            self.sys_info = pipeline.system_info(zone.meta['config'], self.user_unit_override)
+        self._cover(zone)
+        pipeline.accumulate_zone(self.acc, zone, self.minX, self.minY, self.incAx1, self.incAx2)
+        self.write_preview()
+
+    def _cover(self, zone):
+        """Grow the accumulation grids (zero-padded) to take zone."""
+        minX, minY, shape = pipeline.grid_extent([zone], self.incAx1, self.incAx2)
+        if self.acc is None:
+            self.minX, self.minY = minX, minY
+            self.acc = {name: np.zeros(shape) for name in ACC_GRIDS}
+            return
+        # Grid line offsets of the zone and of the current grid within their union
+        old_rows, old_cols = self.acc['avgCount'].shape
+        zone_r = int(round((minY - self.minY) / self.incAx2))
+        zone_c = int(round((minX - self.minX) / self.incAx1))
+        top, left = min(0, zone_r), min(0, zone_c)
+        bottom, right = max(old_rows, zone_r + shape[0]), max(old_cols, zone_c + shape[1])
+        if (top, left, bottom, right) == (0, 0, old_rows, old_cols):
+            return
+        self.minX += left * self.incAx1
+        self.minY += top * self.incAx2
+        for name, old in self.acc.items():
+            grown = np.zeros((bottom - top, right - left))
+            grown[-top:old_rows - top, -left:old_cols - left] = old
+            self.acc[name] = grown
+
+    def snapshot(self):
+        """CalibrationResult for the zones stitched so far."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return pipeline.finish_calibration(self.acc, self.sys_info, self.incAx1, self.incAx2, self.count)
+
+    def write_preview(self):
+        result = self.snapshot()
+        directory, name = os.path.split(self.preview_path)
+        pipeline.ArtifactManager(directory or '.').write(name, 'preview', result.write_accuracy)
+        print(f'[watch] preview updated: {self.preview_path} ({self.count} zone(s) stitched)', flush=True)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description='Stitch zones as their files land; other options are stitch2d_pipeline options.',
+        usage='%(prog)s [watch options] --rows R --cols C --zones Z [Z ...] [pipeline options]')
+    w = p.add_argument_group('watch options')
+    w.add_argument('--poll', type=float, default=0.5, help='Seconds between checks for new zone files')
+    w.add_argument('--settle', type=float, default=1.0,
+                   help='A zone file is parsed once its size and mtime are unchanged for this many seconds')
+    w.add_argument('--timeout', type=float, default=None,
+                   help='Give up if no new zone file lands for this many seconds (default: wait forever)')
+    w.add_argument('--preview', default=None,
+                   help='Rewrite this accuracy .dat with the partially stitched grid after every stitched zone')
+    args, rest = p.parse_known_args(argv)
+    return args, pipeline.parse_args(rest)
+
+
+def main(argv=None):
+    args, pargs = parse_args(argv)
+    cache = None if pargs.no_cache else pipeline.ZoneCache(pargs.cache_dir,
+                                                           max_bytes=int(pargs.cache_max_mb * 1024 * 1024))
+    watcher = ZoneWatcher(pargs.zones, poll=args.poll, settle=args.settle, timeout=args.timeout, cache=cache,
+                          fill_method=pargs.fill_method, keep_meta=pargs.keep_meta)
+    partial = PartialGrid(args.preview, pargs.user_unit)
+    print(f'[watch] waiting for {len(pargs.zones)} zone file(s) ({pargs.rows} x {pargs.cols})', flush=True)
+    try:
+        pipeline.run(pargs, zone_results=watcher.results(), on_stitched=partial.add)
+    except (TimeoutError, KeyboardInterrupt) as e:
+        print(f'[watch] stopped with {partial.count} of {len(pargs.zones)} zone(s) stitched: '
+              f'{str(e) or "interrupted"}', file=sys.stderr)
+        return 1
+    last = max(watcher.landed_at.values())
+    print(f'[watch] final calibration ready {time.time() - last:.2f}s after the last zone file was written')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())